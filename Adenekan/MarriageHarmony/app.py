@@ -1,12 +1,28 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, abort
+from flask import Flask, request, jsonify, render_template, send_from_directory, abort, g
 import json
 import os
-from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import mimetypes
+import threading
+import time
+from datetime import datetime, date, timedelta
 import sqlite3
 import logging
+from database import DATABASE, ConnectionPool, connect
+from mailer import EmailOutbox, init_outbox
+from static_cache import AssetCache
+from blog import ResponseCache, init_blog, list_posts, get_post, render_search, MAX_SEARCH_PAGE_SIZE
+from broadcast import BroadcastJob, init_broadcasts, create_broadcast, get_broadcast, failed_deliveries
+import metrics
+from scheduling import (
+    AvailabilityIndex, AvailabilityCache, init_scheduling, parse_preference, reserve_slot, MAX_DAYS
+)
+from subscribers import SubscriberFilter, MAX_BULK_EMAILS, bulk_subscribe, is_subscribed
+from assets import MANIFEST_PATH, COMPRESSED_SUFFIXES, load_manifest, rewrite_asset_urls
+from assets import build as build_assets
+from submissions import (
+    SUBMISSION_TABLES, init_indexes, parse_limit, fetch_page, iter_rows,
+    export_ndjson, export_csv
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,10 +30,46 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
+@app.before_request
+def start_request_timer():
+    """Note when the request started for the latency histogram."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Record per-route latency; unmatched URLs share one label."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+# Shared pool of tuned SQLite connections, checked out once per request
+db_pool = ConnectionPool(DATABASE, size=int(os.environ.get('DB_POOL_SIZE', 8)))
+
+# Fixed statements; sqlite3 compiles each once per pooled connection
+INSERT_CONTACT_SQL = '''
+    INSERT INTO contact_submissions 
+    (name, email, phone, service, message, newsletter)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_BOOKING_SQL = '''
+    INSERT INTO booking_submissions 
+    (name, email, phone, service, format, preferred_date, preferred_time, message, consultation)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_NEWSLETTER_SQL = '''
+    INSERT INTO newsletter_subscriptions (email)
+    VALUES (?)
+'''
+
 # Database initialization
-def init_db():
+def init_db(db_path=DATABASE):
     """Initialize SQLite database for storing form submissions."""
-    conn = sqlite3.connect('counseling.db')
+    conn = connect(db_path)
     cursor = conn.cursor()
     
     # Contact form submissions
@@ -75,50 +127,79 @@ def init_db():
         )
     ''')
     
+    # Blog search index and listing index
+    init_blog(conn)
+    
+    # Indexes for newest-first admin listings
+    init_indexes(conn)
+    
+    # Counsellor calendars and reserved appointment slots
+    init_scheduling(conn)
+    
+    # Newsletter broadcasts and their per-recipient delivery log
+    init_broadcasts(conn)
+    
+    # Outbound email queue drained by the background dispatchers
+    init_outbox(conn)
+    
     conn.commit()
     conn.close()
 
+# Create the schema on import so WSGI servers (gunicorn app:app) get it too
+init_db()
+
 def get_db_connection():
-    """Get database connection."""
-    conn = sqlite3.connect('counseling.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the pooled database connection for the current request."""
+    if 'db_conn' not in g:
+        g.db_conn = db_pool.acquire()
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Return the request's connection to the pool."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn)
 
 # Email configuration (would use environment variables in production)
 EMAIL_CONFIG = {
-    'smtp_server': 'smtp.gmail.com',
-    'smtp_port': 587,
+    'smtp_server': os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
+    'smtp_port': int(os.environ.get('SMTP_PORT', 587)),
+    'use_tls': os.environ.get('SMTP_USE_TLS', '1') == '1',
+    'use_auth': os.environ.get('SMTP_USE_AUTH', '1') == '1',
     'email': os.environ.get('EMAIL_ADDRESS', 'info@harmonycounseling.com'),
     'password': os.environ.get('EMAIL_PASSWORD', 'your_app_password'),
     'admin_email': 'admin@harmonycounseling.com'
 }
 
+# Bloom filter of subscribed emails, loaded from the database on first use
+subscriber_filter = SubscriberFilter()
+
+outbox = EmailOutbox(
+    DATABASE,
+    EMAIL_CONFIG,
+    workers=int(os.environ.get('EMAIL_WORKERS', 2)),
+    max_attempts=int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+)
+
+@app.before_request
+def start_email_dispatchers():
+    """Start this worker's dispatchers so mail queued before a restart goes out."""
+    outbox.start()
+
 def send_email(to_email, subject, body, is_html=False):
-    """Send email notification."""
+    """Queue an email notification for background delivery."""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_CONFIG['email']
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
-        
-        server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-        server.starttls()
-        server.login(EMAIL_CONFIG['email'], EMAIL_CONFIG['password'])
-        text = msg.as_string()
-        server.sendmail(EMAIL_CONFIG['email'], to_email, text)
-        server.quit()
-        
+        outbox.enqueue(to_email, subject, body, is_html, conn=get_db_connection())
         return True
     except Exception as e:
-        logger.error(f"Email sending failed: {str(e)}")
+        logger.error(f"Email queueing failed: {str(e)}")
         return False
 
 @app.route('/')
 def index():
     """Serve the main website."""
-    return send_from_directory('.', 'index.html')
+    return asset_cache.response('index.html', request)
 
 @app.route('/api/contact', methods=['POST'])
 def handle_contact():
@@ -136,11 +217,7 @@ def handle_contact():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO contact_submissions 
-            (name, email, phone, service, message, newsletter)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+        cursor.execute(INSERT_CONTACT_SQL, (
             data['name'],
             data['email'],
             data.get('phone', ''),
@@ -150,7 +227,6 @@ def handle_contact():
         ))
         
         conn.commit()
-        conn.close()
         
         # Send notification email to admin
         admin_subject = f"New Contact Form Submission from {data['name']}"
@@ -192,6 +268,39 @@ def handle_contact():
         logger.error(f"Contact form error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Counsellor calendars and reservations, indexed in memory for the booking form
+availability = AvailabilityIndex()
+availability_cache = AvailabilityCache()
+
+@app.route('/api/availability')
+def get_availability():
+    """Free appointment slots for the next few days, optionally per service/format."""
+    try:
+        try:
+            days = max(1, min(int(request.args.get('days', 14)), MAX_DAYS))
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+                else date.today() + timedelta(days=1)
+        except ValueError:
+            return jsonify({'error': 'Invalid days or from date'}), 400
+        service = request.args.get('service') or None
+        session_format = request.args.get('format') or None
+        
+        availability.ensure_fresh(get_db_connection())
+        key = (start, days, service, session_format)
+        version = availability.version
+        slots = availability_cache.get(key, version)
+        if slots is None:
+            slots = availability.free_slots(start, days, service, session_format)
+            availability_cache.put(key, version, slots)
+        
+        response = jsonify({'slots': slots})
+        response.headers['Cache-Control'] = 'public, max-age=30'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Availability error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/booking', methods=['POST'])
 def handle_booking():
     """Handle booking form submissions."""
@@ -206,26 +315,42 @@ def handle_booking():
         
         # Save to database
         conn = get_db_connection()
-        cursor = conn.cursor()
+        preference = parse_preference(data.get('date'), data.get('time'))
+        if preference:
+            availability.ensure_fresh(conn)
         
-        cursor.execute('''
-            INSERT INTO booking_submissions 
-            (name, email, phone, service, format, preferred_date, preferred_time, message, consultation)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data['name'],
-            data['email'],
-            data['phone'],
-            data['service'],
-            data['format'],
-            data.get('date', ''),
-            data.get('time', ''),
-            data.get('message', ''),
-            data.get('consultation', False)
-        ))
+        # Booking and slot reservation commit or roll back together; the
+        # write lock is taken up front so the slot re-check can't race
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.cursor()
+            cursor.execute(INSERT_BOOKING_SQL, (
+                data['name'],
+                data['email'],
+                data['phone'],
+                data['service'],
+                data['format'],
+                data.get('date', ''),
+                data.get('time', ''),
+                data.get('message', ''),
+                data.get('consultation', False)
+            ))
+            
+            slot = None
+            if preference:
+                slot = reserve_slot(conn, availability, cursor.lastrowid, preference,
+                                    data['service'], data['format'])
+                if slot is None:
+                    conn.rollback()
+                    return jsonify({'error': 'No appointments are available at that time. Please choose another time.'}), 409
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
-        conn.commit()
-        conn.close()
+        if slot:
+            availability.add(*slot)
         
         # Send notification email to admin
         admin_subject = f"New Appointment Request from {data['name']}"
@@ -239,6 +364,7 @@ def handle_booking():
         Format: {data['format']}
         Preferred Date: {data.get('date', 'Not specified')}
         Preferred Time: {data.get('time', 'Not specified')}
+        Reserved Slot: {slot[1] if slot else 'None'}
         Free Consultation: {'Yes' if data.get('consultation') else 'No'}
         
         Additional Information:
@@ -261,6 +387,7 @@ def handle_booking():
         - Format: {data['format']}
         - Preferred Date: {data.get('date', 'Not specified')}
         - Preferred Time: {data.get('time', 'Not specified')}
+        {f"- Reserved Slot: {slot[1]}" if slot else ""}
         
         {"You've also requested a free 15-minute consultation, which we'll discuss when we contact you." if data.get('consultation') else ""}
         
@@ -272,36 +399,17 @@ def handle_booking():
         
         send_email(data['email'], user_subject, user_body)
         
-        return jsonify({'success': True, 'message': 'Booking request submitted successfully'})
+        result = {'success': True, 'message': 'Booking request submitted successfully'}
+        if slot:
+            result['slot'] = {'start': slot[1], 'end': slot[2], 'counsellor': availability.counsellor_name(slot[0])}
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"Booking form error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/newsletter', methods=['POST'])
-def handle_newsletter():
-    """Handle newsletter subscriptions."""
-    try:
-        data = request.get_json()
-        
-        if not data.get('email'):
-            return jsonify({'error': 'Email is required'}), 400
-        
-        # Save to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT INTO newsletter_subscriptions (email)
-                VALUES (?)
-            ''', (data['email'],))
-            
-            conn.commit()
-            
-            # Send welcome email
-            subject = "Welcome to Harmony Counseling Newsletter"
-            body = f"""
+NEWSLETTER_WELCOME_SUBJECT = "Welcome to Harmony Counseling Newsletter"
+NEWSLETTER_WELCOME_BODY = """
             Welcome to our community!
             
             Thank you for subscribing to the Harmony Counseling newsletter. You'll receive monthly updates with:
@@ -318,22 +426,221 @@ def handle_newsletter():
             
             If you ever wish to unsubscribe, simply reply to any newsletter email with "UNSUBSCRIBE".
             """
+
+@app.route('/api/newsletter', methods=['POST'])
+def handle_newsletter():
+    """Handle newsletter subscriptions."""
+    try:
+        data = request.get_json()
+        
+        if not data.get('email'):
+            return jsonify({'error': 'Email is required'}), 400
+        
+        conn = get_db_connection()
+        
+        # Known subscribers are answered without a write transaction
+        if subscriber_filter.might_contain(conn, data['email']) and is_subscribed(conn, data['email']):
+            return jsonify({'success': True, 'message': 'You are already subscribed to our newsletter'})
+        
+        # Save to database
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(INSERT_NEWSLETTER_SQL, (data['email'],))
             
-            send_email(data['email'], subject, body)
+            conn.commit()
+            subscriber_filter.add([data['email']])
+            
+            # Send welcome email
+            send_email(data['email'], NEWSLETTER_WELCOME_SUBJECT, NEWSLETTER_WELCOME_BODY)
             
         except sqlite3.IntegrityError:
             # Email already exists
+            conn.rollback()
+            subscriber_filter.add([data['email']])
             return jsonify({'success': True, 'message': 'You are already subscribed to our newsletter'})
         
-        finally:
-            conn.close()
-        
         return jsonify({'success': True, 'message': 'Successfully subscribed to newsletter'})
         
     except Exception as e:
         logger.error(f"Newsletter subscription error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/newsletter/bulk', methods=['POST'])
+def handle_newsletter_bulk():
+    """Subscribe a batch of emails in a single transaction."""
+    try:
+        data = request.get_json()
+        
+        emails = data.get('emails') if data else None
+        if not isinstance(emails, list) or not emails:
+            return jsonify({'error': 'emails must be a non-empty list'}), 400
+        if len(emails) > MAX_BULK_EMAILS:
+            return jsonify({'error': f'At most {MAX_BULK_EMAILS} emails per request'}), 400
+        
+        conn = get_db_connection()
+        subscribed, already, invalid = bulk_subscribe(conn, subscriber_filter, emails)
+        
+        # Welcome emails are opt-in for imports
+        if data.get('send_welcome') and subscribed:
+            outbox.enqueue_many(
+                [(email, NEWSLETTER_WELCOME_SUBJECT, NEWSLETTER_WELCOME_BODY, False) for email in subscribed],
+                conn=conn
+            )
+        
+        return jsonify({
+            'success': True,
+            'subscribed': len(subscribed),
+            'already_subscribed': len(already),
+            'invalid': invalid
+        })
+        
+    except Exception as e:
+        logger.error(f"Bulk newsletter subscription error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Broadcasts currently sending in this process, by id
+broadcast_jobs = {}
+broadcast_jobs_lock = threading.Lock()
+
+metrics.registry.gauge('email_outbox_depth', outbox.pending_count,
+                       'Emails waiting in the outbox.')
+metrics.registry.gauge('newsletter_broadcasts_running', lambda: len(broadcast_jobs),
+                       'Broadcasts currently sending in this process.')
+
+def start_broadcast_job(broadcast_id):
+    """Run a broadcast in a background thread unless it is already running."""
+    with broadcast_jobs_lock:
+        if broadcast_id in broadcast_jobs:
+            return False
+        job = BroadcastJob(DATABASE, broadcast_id, EMAIL_CONFIG,
+                           workers=int(os.environ.get('BROADCAST_WORKERS', 4)))
+        broadcast_jobs[broadcast_id] = job
+    
+    def run():
+        try:
+            job.run()
+        finally:
+            with broadcast_jobs_lock:
+                broadcast_jobs.pop(broadcast_id, None)
+    
+    threading.Thread(target=run, name=f'broadcast-{broadcast_id}', daemon=True).start()
+    return True
+
+@app.route('/api/admin/newsletter/broadcasts', methods=['POST'])
+def admin_create_broadcast():
+    """Create a newsletter issue and start sending it to all active subscribers."""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('subject') or not data.get('body'):
+            return jsonify({'error': 'subject and body are required'}), 400
+        try:
+            rate = float(data.get('rate_per_second', 5))
+            if rate <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({'error': 'rate_per_second must be a positive number'}), 400
+        
+        broadcast_id = create_broadcast(get_db_connection(), data['subject'], data['body'],
+                                        bool(data.get('is_html')), rate)
+        
+        start_broadcast_job(broadcast_id)
+        return jsonify({'success': True, 'broadcast_id': broadcast_id}), 202
+        
+    except Exception as e:
+        logger.error(f"Broadcast creation error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/admin/newsletter/broadcasts/<int:broadcast_id>')
+def admin_broadcast_status(broadcast_id):
+    """Progress of a broadcast."""
+    broadcast = get_broadcast(get_db_connection(), broadcast_id)
+    if broadcast is None:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    broadcast['running'] = broadcast_id in broadcast_jobs
+    return jsonify(broadcast)
+
+@app.route('/api/admin/newsletter/broadcasts/<int:broadcast_id>/failures')
+def admin_broadcast_failures(broadcast_id):
+    """Recipients a broadcast could not reach, after retries."""
+    conn = get_db_connection()
+    if get_broadcast(conn, broadcast_id) is None:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'failures': failed_deliveries(conn, broadcast_id, limit)})
+
+@app.route('/api/admin/newsletter/broadcasts/<int:broadcast_id>/pause', methods=['POST'])
+def admin_pause_broadcast(broadcast_id):
+    """Stop a running broadcast after its current batch."""
+    job = broadcast_jobs.get(broadcast_id)
+    if job is None:
+        return jsonify({'error': 'Broadcast is not running'}), 409
+    job.stop()
+    return jsonify({'success': True})
+
+@app.route('/api/admin/newsletter/broadcasts/<int:broadcast_id>/resume', methods=['POST'])
+def admin_resume_broadcast(broadcast_id):
+    """Continue a paused or interrupted broadcast from its checkpoint."""
+    broadcast = get_broadcast(get_db_connection(), broadcast_id)
+    if broadcast is None:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    if broadcast['status'] == 'completed':
+        return jsonify({'error': 'Broadcast already completed'}), 409
+    if not start_broadcast_job(broadcast_id):
+        return jsonify({'error': 'Broadcast is already running'}), 409
+    return jsonify({'success': True}), 202
+
+# Rendered search responses, keyed by blog version and query
+blog_search_cache = ResponseCache()
+
+@app.route('/api/blog')
+def blog_list():
+    """Newest blog posts, optionally in one category, paged with a cursor."""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        posts, next_cursor = list_posts(get_db_connection(), request.args.get('category'),
+                                        request.args.get('cursor'), limit)
+        return jsonify({'posts': posts, 'next_cursor': next_cursor})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Blog list error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/blog/<int:post_id>')
+def blog_detail(post_id):
+    """A single blog post."""
+    post = get_post(get_db_connection(), post_id)
+    if post is None:
+        return jsonify({'error': 'Post not found'}), 404
+    return jsonify(post)
+
+@app.route('/api/blog/search')
+def blog_search():
+    """Ranked full-text search with highlighted snippets and category facets."""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'Search query is required'}), 400
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_SEARCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'Invalid page or limit'}), 400
+    
+    try:
+        body = render_search(get_db_connection(), blog_search_cache, query,
+                             request.args.get('category') or None, page, limit)
+        return app.response_class(body, mimetype='application/json')
+    
+    except Exception as e:
+        logger.error(f"Blog search error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/download/<resource>')
 def handle_download(resource):
     """Handle resource downloads."""
@@ -357,50 +664,97 @@ def handle_download(resource):
 
 @app.route('/api/admin/submissions')
 def admin_submissions():
-    """Admin endpoint to view form submissions (basic implementation)."""
+    """Admin endpoint returning the first page of every submissions table."""
     try:
         conn = get_db_connection()
+        limit = parse_limit(request.args.get('limit'))
         
-        # Get contact submissions
-        contact_submissions = conn.execute('''
-            SELECT * FROM contact_submissions 
-            ORDER BY submitted_at DESC LIMIT 50
-        ''').fetchall()
-        
-        # Get booking submissions
-        booking_submissions = conn.execute('''
-            SELECT * FROM booking_submissions 
-            ORDER BY submitted_at DESC LIMIT 50
-        ''').fetchall()
+        result = {}
+        for kind in SUBMISSION_TABLES:
+            rows, next_cursor = fetch_page(conn, kind, request.args, limit=limit)
+            result[SUBMISSION_TABLES[kind]['table']] = rows
+            result[f'{kind}_next_cursor'] = next_cursor
         
-        # Get newsletter subscriptions
-        newsletter_subs = conn.execute('''
-            SELECT * FROM newsletter_subscriptions 
-            WHERE active = TRUE
-            ORDER BY subscribed_at DESC LIMIT 50
-        ''').fetchall()
+        return jsonify(result)
         
-        conn.close()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Admin endpoint error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/admin/submissions/<kind>')
+def admin_submissions_page(kind):
+    """Keyset-paginated, filterable listing of one submissions table."""
+    if kind not in SUBMISSION_TABLES:
+        return jsonify({'error': 'Unknown submission type'}), 404
+    try:
+        conn = get_db_connection()
+        limit = parse_limit(request.args.get('limit'))
+        rows, next_cursor = fetch_page(conn, kind, request.args, request.args.get('cursor'), limit)
         
         return jsonify({
-            'contact_submissions': [dict(row) for row in contact_submissions],
-            'booking_submissions': [dict(row) for row in booking_submissions],
-            'newsletter_subscriptions': [dict(row) for row in newsletter_subs]
+            'submissions': rows,
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Admin endpoint error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/admin/submissions/<kind>/export.<fmt>')
+def admin_submissions_export(kind, fmt):
+    """Stream every matching row of one table as NDJSON or CSV."""
+    if kind not in SUBMISSION_TABLES:
+        return jsonify({'error': 'Unknown submission type'}), 404
+    encoders = {
+        'ndjson': (export_ndjson, 'application/x-ndjson'),
+        'csv': (export_csv, 'text/csv')
+    }
+    if fmt not in encoders:
+        return jsonify({'error': 'Unsupported export format'}), 404
+    encode, mimetype = encoders[fmt]
+    
+    # The export outlives the request context, so it holds its own connection
+    conn = db_pool.acquire()
+    try:
+        columns, rows = iter_rows(conn, kind, request.args)
+    except Exception as e:
+        db_pool.release(conn)
+        logger.error(f"Admin export error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    def generate():
+        try:
+            yield from encode(columns, rows)
+        finally:
+            db_pool.release(conn)
+    
+    response = app.response_class(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}_submissions.{fmt}'
+    return response
+
 @app.route('/api/health')
 def health_check():
-    """Health check endpoint."""
+    """Health check endpoint with rolling latency percentiles (seconds)."""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'latency': {
+            'requests': metrics.registry.percentiles('http_request_duration_seconds'),
+            'sqlite': metrics.registry.percentiles('sqlite_query_duration_seconds'),
+            'smtp': metrics.registry.percentiles('smtp_send_duration_seconds')
+        }
     })
 
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of request, SQLite, SMTP and queue metrics."""
+    return app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -412,68 +766,94 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 # SEO and Meta endpoints
-@app.route('/sitemap.xml')
-def sitemap():
-    """Generate sitemap for SEO."""
-    sitemap_xml = '''<?xml version="1.0" encoding="UTF-8"?>
+INDEX_PATH = os.path.join(app.root_path, 'index.html')
+
+def build_index():
+    """Read the main website HTML, pointing it at fingerprinted assets."""
+    with open(INDEX_PATH, encoding='utf-8') as f:
+        return rewrite_asset_urls(f.read(), load_manifest())
+
+def build_sitemap():
+    """Build the sitemap, dated from the last edit of the site content."""
+    lastmod = datetime.fromtimestamp(os.path.getmtime(INDEX_PATH)).strftime('%Y-%m-%d')
+    return '''<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
     <url>
         <loc>https://harmonycounseling.com/</loc>
-        <lastmod>{}</lastmod>
+        <lastmod>{0}</lastmod>
         <changefreq>weekly</changefreq>
         <priority>1.0</priority>
     </url>
     <url>
         <loc>https://harmonycounseling.com/#about</loc>
-        <lastmod>{}</lastmod>
+        <lastmod>{0}</lastmod>
         <changefreq>monthly</changefreq>
         <priority>0.8</priority>
     </url>
     <url>
         <loc>https://harmonycounseling.com/#services</loc>
-        <lastmod>{}</lastmod>
+        <lastmod>{0}</lastmod>
         <changefreq>monthly</changefreq>
         <priority>0.9</priority>
     </url>
     <url>
         <loc>https://harmonycounseling.com/#contact</loc>
-        <lastmod>{}</lastmod>
+        <lastmod>{0}</lastmod>
         <changefreq>monthly</changefreq>
         <priority>0.7</priority>
     </url>
-</urlset>'''.format(
-        datetime.now().strftime('%Y-%m-%d'),
-        datetime.now().strftime('%Y-%m-%d'),
-        datetime.now().strftime('%Y-%m-%d'),
-        datetime.now().strftime('%Y-%m-%d')
-    )
-    
-    response = app.response_class(
-        response=sitemap_xml,
-        status=200,
-        mimetype='application/xml'
-    )
-    return response
+</urlset>'''.format(lastmod)
 
-@app.route('/robots.txt')
-def robots():
-    """Generate robots.txt for SEO."""
-    robots_txt = '''User-agent: *
+def build_robots():
+    """Build robots.txt."""
+    return '''User-agent: *
 Allow: /
 Disallow: /api/admin/
 
 Sitemap: https://harmonycounseling.com/sitemap.xml'''
-    
-    response = app.response_class(
-        response=robots_txt,
-        status=200,
-        mimetype='text/plain'
-    )
+
+# Bodies are built and compressed once here, then rebuilt only when
+# index.html changes on disk
+asset_cache = AssetCache(app.response_class)
+asset_cache.register('index.html', build_index, 'text/html', sources=[INDEX_PATH, MANIFEST_PATH])
+asset_cache.register('sitemap.xml', build_sitemap, 'application/xml',
+                     sources=[INDEX_PATH], cache_control='public, max-age=3600')
+asset_cache.register('robots.txt', build_robots, 'text/plain',
+                     cache_control='public, max-age=86400')
+
+@app.route('/static/dist/<path:filename>')
+def fingerprinted_asset(filename):
+    """Serve a built asset forever-cacheable, preferring a precompressed copy."""
+    dist_dir = os.path.join(app.static_folder, 'dist')
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in COMPRESSED_SUFFIXES.items():
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(dist_dir, filename + suffix)):
+            response = send_from_directory(dist_dir, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist_dir, filename, mimetype=mimetype)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
     return response
 
+@app.route('/sitemap.xml')
+def sitemap():
+    """Serve the sitemap for SEO."""
+    return asset_cache.response('sitemap.xml', request)
+
+@app.route('/robots.txt')
+def robots():
+    """Serve robots.txt for SEO."""
+    return asset_cache.response('robots.txt', request)
+
 if __name__ == '__main__':
-    # Initialize database
-    init_db()
+    # Fingerprint and precompress static files, then refresh cached pages
+    build_assets()
+    asset_cache.invalidate()
+    
+    # Start delivering queued emails
+    outbox.start()
     
     # Create static directories if they don't exist
     os.makedirs('static/css', exist_ok=True)
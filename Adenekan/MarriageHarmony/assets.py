@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for the Harmony Counseling website.
+
+The build step minifies the stylesheet and script, names each output after
+a hash of its contents and writes .gz/.br siblings next to it in
+static/dist, along with a manifest mapping source paths to hashed names.
+Because a hashed file never changes, the server can cache it forever.
+
+Run ``python assets.py`` after editing files in static/css or static/js.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Source files (relative to static/) that go through the pipeline
+ASSET_FILES = ['css/style.css', 'js/script.js']
+
+# Encodings written next to every built file, in server preference order
+COMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace around CSS punctuation."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Conservative JS minifier: drops indentation, blank and comment lines.
+
+    Lines inside multi-line template literals are kept verbatim.
+    """
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(asset_files=ASSET_FILES):
+    """Minify, fingerprint and precompress every asset; returns the manifest."""
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {}
+    for path in asset_files:
+        with open(os.path.join(STATIC_DIR, path), encoding='utf-8') as f:
+            source = f.read()
+        name, ext = os.path.splitext(os.path.basename(path))
+        body = MINIFIERS.get(ext, lambda text: text)(source).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        hashed_name = f'{name}.{digest}{ext}'
+
+        # Drop outputs from earlier builds of the same source
+        for existing in os.listdir(DIST_DIR):
+            if re.fullmatch(rf'{re.escape(name)}\.[0-9a-f]{{12}}{re.escape(ext)}(\.gz|\.br)?', existing):
+                os.remove(os.path.join(DIST_DIR, existing))
+
+        target = os.path.join(DIST_DIR, hashed_name)
+        with open(target, 'wb') as f:
+            f.write(body)
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(body, 9))
+        if brotli is not None:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(body))
+        manifest[path] = f'dist/{hashed_name}'
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest():
+    """Read the manifest written by ``build``; empty if it was never run."""
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def rewrite_asset_urls(html, manifest):
+    """Point ``static/...`` references in HTML at their fingerprinted names."""
+    for source, hashed in manifest.items():
+        html = html.replace(f'static/{source}', f'static/{hashed}')
+    return html
+
+
+if __name__ == '__main__':
+    for source, hashed in build().items():
+        print(f'{source} -> {hashed}')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Booking throughput benchmark for the Harmony Counseling API.
+Posts bookings concurrently through the Flask test client, first with the
+old access pattern (a fresh rollback-journal connection per request) and then
+with the pooled WAL connections, and reports requests per second for each.
+Every booking asks for a different future slot inside the default
+counsellor's hours, so each request takes the full reservation path; any
+response other than 200 aborts the run.
+
+The run never touches counseling.db or a real mail server: the app is
+imported against a scratch database, and the email dispatchers are not
+started, so confirmation mails are only queued in each case's own outbox
+(the cost a request pays) and never sent.
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+if __name__ == '__main__':
+    # Must be set before app is imported, which creates its schema there
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'import.db')
+
+import app as site
+from database import ConnectionPool
+
+BOOKING = {
+    'name': 'Benchmark Client',
+    'email': 'bench@example.com',
+    'phone': '555-0100',
+    'service': 'couples',
+    'format': 'online',
+    'message': 'Load test booking',
+    'consultation': True
+}
+
+# The default counsellor works 09:00-19:00 on weekdays (see scheduling.py)
+SLOT_HOURS = range(9, 19)
+
+
+def future_slots(count):
+    """``count`` distinct ``(date, time)`` weekday slots, starting two days out."""
+    slots = []
+    day = date.today() + timedelta(days=2)
+    while len(slots) < count:
+        if day.weekday() < 5:
+            slots.extend((day.isoformat(), f'{hour:02d}:00') for hour in SLOT_HOURS)
+        day += timedelta(days=1)
+    return slots[:count]
+
+
+def run_case(label, pool, total, threads):
+    """POST ``total`` bookings from ``threads`` workers and print throughput."""
+    site.db_pool = pool
+    # The availability index still holds the previous case's reservations
+    conn = pool.acquire()
+    try:
+        site.availability.load(conn)
+    finally:
+        pool.release(conn)
+    per_thread = total // threads
+    slots = future_slots(per_thread * threads)
+    failures = []
+
+    def worker(offset):
+        client = site.app.test_client()
+        for day, slot_time in slots[offset:offset + per_thread]:
+            if failures:
+                return
+            response = client.post('/api/booking', json=dict(BOOKING, date=day, time=slot_time))
+            if response.status_code != 200:
+                failures.append(f"{day} {slot_time}: {response.status_code} {response.get_data(as_text=True)}")
+                return
+
+    workers = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    pool.close()
+    if failures:
+        raise SystemExit(f"{label}: booking failed, aborting benchmark ({failures[0]})")
+
+    done = per_thread * threads
+    print(f"{label:<10} {done} requests in {elapsed:.2f}s -> {done / elapsed:8.1f} req/s")
+    return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    # Queue mail as usual, but never deliver it (app.outbox would drain DATABASE_PATH)
+    site.outbox.start = lambda: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: new connection per request, default rollback journal
+        legacy_db = os.path.join(tmp, 'legacy.db')
+        site.init_db(legacy_db)
+        with contextlib.closing(sqlite3.connect(legacy_db)) as conn:
+            conn.execute('PRAGMA journal_mode=DELETE')
+        before = run_case('before', ConnectionPool(legacy_db, size=0, tuned=False),
+                          args.requests, args.threads)
+
+        # After: pooled, WAL-mode connections with cached statements
+        pooled_db = os.path.join(tmp, 'pooled.db')
+        site.init_db(pooled_db)
+        after = run_case('after', ConnectionPool(pooled_db, size=args.threads),
+                         args.requests, args.threads)
+
+    print(f"speedup    {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Blog listing and full-text search.
+
+``blog_posts_fts`` is an FTS5 index over the blog posts, kept in sync by
+triggers, so search is ranked with BM25 and never falls back to
+``LIKE '%...%'`` scans. Listings read only a covering index. The same
+triggers bump a version number in ``blog_meta`` that keys the LRU cache of
+rendered search responses, so cached results are dropped as soon as any
+post changes, in any worker.
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from submissions import encode_cursor, decode_cursor
+
+# Column weights for bm25(): title, category, content, excerpt
+BM25_WEIGHTS = (10.0, 4.0, 1.0, 3.0)
+
+SEARCH_PAGE_SIZE = 10
+MAX_SEARCH_PAGE_SIZE = 50
+
+LISTING_COLUMNS = 'id, title, category, excerpt, image_url, published_at'
+
+
+def init_blog(conn):
+    """Create the FTS index, sync triggers, version counter and listing index."""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_blog_listing
+        ON blog_posts (active, published_at, id, title, category, excerpt, image_url)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO blog_meta (id, version) VALUES (1, 0)')
+
+    created = conn.execute('''
+        SELECT COUNT(*) FROM sqlite_master WHERE name = 'blog_posts_fts'
+    ''').fetchone()[0] == 0
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS blog_posts_fts USING fts5(
+            title, category, content, excerpt,
+            content='blog_posts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.executescript('''
+        CREATE TRIGGER IF NOT EXISTS blog_posts_ai AFTER INSERT ON blog_posts BEGIN
+            INSERT INTO blog_posts_fts (rowid, title, category, content, excerpt)
+            VALUES (new.id, new.title, new.category, new.content, new.excerpt);
+            UPDATE blog_meta SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS blog_posts_ad AFTER DELETE ON blog_posts BEGIN
+            INSERT INTO blog_posts_fts (blog_posts_fts, rowid, title, category, content, excerpt)
+            VALUES ('delete', old.id, old.title, old.category, old.content, old.excerpt);
+            UPDATE blog_meta SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS blog_posts_au AFTER UPDATE ON blog_posts BEGIN
+            INSERT INTO blog_posts_fts (blog_posts_fts, rowid, title, category, content, excerpt)
+            VALUES ('delete', old.id, old.title, old.category, old.content, old.excerpt);
+            INSERT INTO blog_posts_fts (rowid, title, category, content, excerpt)
+            VALUES (new.id, new.title, new.category, new.content, new.excerpt);
+            UPDATE blog_meta SET version = version + 1 WHERE id = 1;
+        END;
+    ''')
+    if created:
+        # Index posts that existed before the FTS table
+        conn.execute("INSERT INTO blog_posts_fts (blog_posts_fts) VALUES ('rebuild')")
+
+
+def blog_version(conn):
+    """Counter bumped by the triggers on every blog change."""
+    return conn.execute('SELECT version FROM blog_meta WHERE id = 1').fetchone()[0]
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 query: quoted terms, last one as a prefix."""
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def list_posts(conn, category=None, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """Newest active posts from the covering index, keyset paginated."""
+    conditions = ['active = TRUE']
+    params = []
+    if category:
+        conditions.append('category = ?')
+        params.append(category)
+    if cursor:
+        conditions.append('(published_at, id) < (?, ?)')
+        params.extend(decode_cursor(cursor))
+    rows = conn.execute(f'''
+        SELECT {LISTING_COLUMNS} FROM blog_posts INDEXED BY idx_blog_listing
+        WHERE {' AND '.join(conditions)}
+        ORDER BY published_at DESC, id DESC LIMIT ?
+    ''', params + [limit + 1]).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], 'published_at')
+    return [dict(row) for row in rows], next_cursor
+
+
+def get_post(conn, post_id):
+    """One active post with its full content, or None."""
+    row = conn.execute('''
+        SELECT id, title, category, content, excerpt, image_url, published_at
+        FROM blog_posts WHERE id = ? AND active = TRUE
+    ''', (post_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def search_posts(conn, text, category=None, page=1, limit=SEARCH_PAGE_SIZE):
+    """BM25-ranked matches with highlighted snippets and category facets."""
+    match = fts_query(text)
+    if match is None:
+        return {'results': [], 'facets': {}, 'total': 0}
+
+    category_clause = ' AND p.category = ?' if category else ''
+    params = [match] + ([category] if category else [])
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    rows = conn.execute(f'''
+        SELECT p.id, p.title, p.category, p.image_url, p.published_at,
+               highlight(blog_posts_fts, 0, '<mark>', '</mark>') AS title_highlight,
+               snippet(blog_posts_fts, 2, '<mark>', '</mark>', '…', 24) AS snippet,
+               bm25(blog_posts_fts, {weights}) AS score
+        FROM blog_posts_fts JOIN blog_posts p ON p.id = blog_posts_fts.rowid
+        WHERE blog_posts_fts MATCH ? AND p.active = TRUE{category_clause}
+        ORDER BY score LIMIT ? OFFSET ?
+    ''', params + [limit, (page - 1) * limit]).fetchall()
+
+    # Facets ignore the category filter so the UI can offer the other choices
+    facets = {
+        row['category']: row['hits'] for row in conn.execute('''
+            SELECT p.category, COUNT(*) AS hits
+            FROM blog_posts_fts JOIN blog_posts p ON p.id = blog_posts_fts.rowid
+            WHERE blog_posts_fts MATCH ? AND p.active = TRUE
+            GROUP BY p.category ORDER BY hits DESC
+        ''', (match,))
+    }
+    total = facets.get(category, 0) if category else sum(facets.values())
+    return {'results': [dict(row) for row in rows], 'facets': facets, 'total': total}
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered JSON bodies."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def render_search(conn, cache, text, category, page, limit):
+    """Search response body, served from ``cache`` while the blog is unchanged."""
+    key = (blog_version(conn), text.strip().lower(), category, page, limit)
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(search_posts(conn, text, category, page, limit))
+        cache.put(key, body)
+    return body
@@ -0,0 +1,297 @@
+"""
+Newsletter broadcast engine.
+
+A broadcast sends one issue to every active subscriber. Subscribers are
+streamed from SQLite in keyset batches, the body template is compiled once
+and only the ``$email`` placeholder is filled in per recipient (any other
+``$`` is sent as written), and a fixed pool of sender threads delivers over
+persistent SMTP sessions behind a shared rate limiter. Transient SMTP
+errors are retried a few times; every recipient's outcome is recorded, and
+the last fully processed subscriber id is checkpointed so an interrupted
+broadcast resumes where it stopped.
+"""
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from string import Template
+from database import connect
+from mailer import SMTPSession
+
+logger = logging.getLogger(__name__)
+
+# Subscribers read from the database per batch
+BATCH_SIZE = 500
+
+# Tries per recipient before a transient SMTP error is recorded as a failure
+SEND_ATTEMPTS = 3
+RETRY_DELAY = 2          # seconds before the first retry, doubled after each
+
+# How often the reader checks that sender threads are still alive
+SENDER_CHECK_INTERVAL = 1
+
+
+def init_broadcasts(conn):
+    """Create the broadcast and per-recipient delivery tables."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS newsletter_broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            is_html BOOLEAN DEFAULT FALSE,
+            rate_per_second REAL NOT NULL DEFAULT 5,
+            status TEXT NOT NULL DEFAULT 'pending',
+            checkpoint_id INTEGER NOT NULL DEFAULT 0,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS newsletter_deliveries (
+            broadcast_id INTEGER NOT NULL,
+            subscriber_id INTEGER NOT NULL,
+            email TEXT NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (broadcast_id, subscriber_id)
+        )
+    ''')
+
+
+def create_broadcast(conn, subject, body, is_html=False, rate_per_second=5):
+    """Store a new broadcast and return its id."""
+    cursor = conn.execute('''
+        INSERT INTO newsletter_broadcasts (subject, body, is_html, rate_per_second)
+        VALUES (?, ?, ?, ?)
+    ''', (subject, body, is_html, rate_per_second))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def get_broadcast(conn, broadcast_id):
+    """Return a broadcast row as a dict, or None."""
+    row = conn.execute('SELECT * FROM newsletter_broadcasts WHERE id = ?', (broadcast_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def failed_deliveries(conn, broadcast_id, limit=100):
+    """Recipients a broadcast could not be delivered to, with the last error."""
+    rows = conn.execute('''
+        SELECT subscriber_id, email, error, attempted_at FROM newsletter_deliveries
+        WHERE broadcast_id = ? AND status = 'failed'
+        ORDER BY subscriber_id LIMIT ?
+    ''', (broadcast_id, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+class RateLimiter:
+    """Token bucket shared by all sender threads."""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = float(rate_per_second)
+        self.capacity = burst or max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a send is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BroadcastJob:
+    """Sends one broadcast; safe to run again to resume after a stop or crash."""
+
+    def __init__(self, db_path, broadcast_id, smtp_config, workers=4):
+        self.db_path = db_path
+        self.broadcast_id = broadcast_id
+        self.smtp_config = smtp_config
+        self.workers = workers
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Pause after the in-flight batch; ``run`` can be called again later."""
+        self._stopping.set()
+
+    def _pending_batch(self, conn, after_id):
+        # Recipients already recorded for this broadcast are skipped on resume
+        return conn.execute('''
+            SELECT s.id, s.email FROM newsletter_subscriptions s
+            LEFT JOIN newsletter_deliveries d
+                ON d.broadcast_id = ? AND d.subscriber_id = s.id
+            WHERE s.active = TRUE AND s.id > ? AND d.subscriber_id IS NULL
+            ORDER BY s.id LIMIT ?
+        ''', (self.broadcast_id, after_id, BATCH_SIZE)).fetchall()
+
+    def _deliver(self, session, limiter, email, message):
+        """Send one message, retrying transient errors; returns the last error or None."""
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            limiter.acquire()
+            try:
+                session.send(email, message)
+                return None
+            except smtplib.SMTPRecipientsRefused as e:
+                # The relay rejected the address; retrying will not help
+                return str(e)
+            except Exception as e:
+                session.close()
+                error = str(e)
+                if attempt < SEND_ATTEMPTS:
+                    delay = RETRY_DELAY * 2 ** (attempt - 1)
+                    logger.warning(f"Broadcast {self.broadcast_id} to {email} failed, retrying in {delay}s: {error}")
+                    time.sleep(delay)
+        return error
+
+    def _sender(self, tasks, results, limiter, template, broadcast):
+        session = SMTPSession(self.smtp_config)
+        subtype = 'html' if broadcast['is_html'] else 'plain'
+        try:
+            while True:
+                item = tasks.get()
+                if item is None:
+                    tasks.task_done()
+                    break
+                subscriber_id, email = item
+                try:
+                    msg = MIMEText(template.safe_substitute(email=email), subtype)
+                    msg['From'] = self.smtp_config['email']
+                    msg['To'] = email
+                    msg['Subject'] = broadcast['subject']
+                    error = self._deliver(session, limiter, email, msg.as_string())
+                    status = 'sent' if error is None else 'failed'
+                    results.append((self.broadcast_id, subscriber_id, email, status, error))
+                except Exception as e:
+                    results.append((self.broadcast_id, subscriber_id, email, 'failed', str(e)))
+                finally:
+                    tasks.task_done()
+        except Exception:
+            logger.exception(f"Broadcast {self.broadcast_id} sender crashed")
+        finally:
+            session.close()
+
+    @staticmethod
+    def _put(tasks, item, senders):
+        """``tasks.put`` that returns False instead of blocking once every sender has died."""
+        while True:
+            try:
+                tasks.put(item, timeout=SENDER_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                if not any(thread.is_alive() for thread in senders):
+                    return False
+
+    @staticmethod
+    def _join(tasks, senders):
+        """``tasks.join`` that returns False instead of blocking once every sender has died."""
+        with tasks.all_tasks_done:
+            while tasks.unfinished_tasks:
+                if not any(thread.is_alive() for thread in senders):
+                    return False
+                tasks.all_tasks_done.wait(SENDER_CHECK_INTERVAL)
+        return True
+
+    def _record(self, conn, results, checkpoint_id):
+        sent = sum(1 for result in results if result[3] == 'sent')
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO newsletter_deliveries
+                (broadcast_id, subscriber_id, email, status, error)
+                VALUES (?, ?, ?, ?, ?)
+            ''', results)
+            conn.execute('''
+                UPDATE newsletter_broadcasts
+                SET checkpoint_id = ?, sent_count = sent_count + ?, failed_count = failed_count + ?
+                WHERE id = ?
+            ''', (checkpoint_id, sent, len(results) - sent, self.broadcast_id))
+
+    def _set_status(self, conn, status):
+        with conn:
+            if status == 'running':
+                conn.execute('''
+                    UPDATE newsletter_broadcasts
+                    SET status = ?, started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                    WHERE id = ?
+                ''', (status, self.broadcast_id))
+            elif status == 'completed':
+                conn.execute('''
+                    UPDATE newsletter_broadcasts SET status = ?, completed_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (status, self.broadcast_id))
+            else:
+                conn.execute('UPDATE newsletter_broadcasts SET status = ? WHERE id = ?',
+                             (status, self.broadcast_id))
+
+    def run(self):
+        """Deliver to every remaining subscriber, one batch at a time."""
+        conn = connect(self.db_path)
+        try:
+            broadcast = get_broadcast(conn, self.broadcast_id)
+            if broadcast is None or broadcast['status'] == 'completed':
+                return
+            template = Template(broadcast['body'])
+            limiter = RateLimiter(broadcast['rate_per_second'])
+            # Bounded so the reader never runs far ahead of the senders
+            tasks = queue.Queue(maxsize=self.workers * 4)
+            # One result list per sender, so appends never contend
+            outcomes = [[] for _ in range(self.workers)]
+            senders = [
+                threading.Thread(target=self._sender, args=(tasks, outcome, limiter, template, broadcast),
+                                 name=f'broadcast-{self.broadcast_id}-{i}', daemon=True)
+                for i, outcome in enumerate(outcomes)
+            ]
+            for thread in senders:
+                thread.start()
+
+            self._set_status(conn, 'running')
+            checkpoint_id = broadcast['checkpoint_id']
+            try:
+                while not self._stopping.is_set():
+                    batch = self._pending_batch(conn, checkpoint_id)
+                    if not batch:
+                        break
+                    for row in batch:
+                        if not self._put(tasks, (row['id'], row['email']), senders):
+                            raise RuntimeError('all sender threads died')
+                    # Wait for the whole batch so the checkpoint never skips a recipient
+                    if not self._join(tasks, senders):
+                        raise RuntimeError('all sender threads died')
+                    checkpoint_id = batch[-1]['id']
+                    results = [result for outcome in outcomes for result in outcome]
+                    for outcome in outcomes:
+                        outcome.clear()
+                    self._record(conn, results, checkpoint_id)
+            finally:
+                for _ in senders:
+                    if not self._put(tasks, None, senders):
+                        break
+                for thread in senders:
+                    thread.join()
+
+            if self._stopping.is_set():
+                self._set_status(conn, 'paused')
+                logger.info(f"Broadcast {self.broadcast_id} paused at subscriber {checkpoint_id}")
+            else:
+                self._set_status(conn, 'completed')
+                logger.info(f"Broadcast {self.broadcast_id} completed")
+        except Exception as e:
+            logger.error(f"Broadcast {self.broadcast_id} failed: {str(e)}")
+            self._set_status(conn, 'paused')
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,155 @@
+"""
+SQLite access layer for the Harmony Counseling website.
+
+Connections are opened once, tuned for concurrent web traffic (WAL journal,
+relaxed fsync, larger page cache, memory-mapped reads) and then reused by
+later requests instead of paying connection setup on every hit.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import metrics
+
+DATABASE = os.environ.get('DATABASE_PATH', 'counseling.db')
+
+# Statements run on every new connection. WAL lets readers proceed while a
+# booking is being written, and NORMAL sync is durable in WAL mode.
+TUNING_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-8000',        # ~8 MB page cache
+    'PRAGMA mmap_size=67108864',      # 64 MB memory-mapped I/O
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA foreign_keys=ON',
+)
+
+# Size of sqlite3's per-connection prepared statement cache. The form
+# handlers use fixed SQL text, so their INSERTs are compiled once per
+# connection and reused from this cache afterwards.
+STATEMENT_CACHE_SIZE = 256
+
+
+def _operation(sql):
+    """Leading keyword of a statement, used as the metrics label."""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records statement execution time."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', time.perf_counter() - start,
+                            operation=_operation(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', time.perf_counter() - start,
+                            operation=_operation(sql))
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements and commits are timed."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', time.perf_counter() - start,
+                            operation='COMMIT')
+
+
+def connect(db_path=DATABASE, tuned=True, **kwargs):
+    """Open a timed connection with Row results and, by default, the tuning pragmas."""
+    conn = sqlite3.connect(db_path, timeout=30, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=TimedConnection, **kwargs)
+    conn.row_factory = sqlite3.Row
+    if tuned:
+        for pragma in TUNING_PRAGMAS:
+            conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """A bounded pool of reusable SQLite connections.
+
+    Connections are created on demand up to ``size`` and handed back with
+    ``release()``. A ``size`` of 0 disables pooling: every ``acquire()``
+    opens a fresh connection and ``release()`` closes it.
+    """
+
+    def __init__(self, db_path=DATABASE, size=8, tuned=True):
+        self.db_path = db_path
+        self.size = size
+        self.tuned = tuned
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        return connect(self.db_path, tuned=self.tuned, check_same_thread=False)
+
+    def acquire(self):
+        """Take an idle connection, opening a new one if the pool is not full."""
+        if self.size <= 0:
+            return self._open()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=30)
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        if self.size <= 0:
+            conn.close()
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is replaced rather than recycled
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
@@ -0,0 +1,298 @@
+"""
+Outbound email queue for the Harmony Counseling website.
+
+Form handlers only insert a row into the SQLite ``email_outbox`` table and
+return. A small pool of background dispatcher threads drains the outbox,
+each one keeping its own authenticated SMTP session open between messages,
+and retries failed deliveries with exponential backoff.
+"""
+
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from database import connect
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def init_outbox(conn):
+    """Create the outbox table and its index on an open connection."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            is_html BOOLEAN DEFAULT FALSE,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            claimed_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+        ON email_outbox (status, next_attempt_at)
+    ''')
+
+
+class SMTPSession:
+    """A lazily opened SMTP connection that is reused across messages."""
+
+    def __init__(self, config, max_idle=60, max_messages=100):
+        self.config = config
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self._server = None
+        self._last_used = 0
+        self._sent = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'], timeout=30)
+        if self.config.get('use_tls', True):
+            server.starttls()
+        if self.config.get('use_auth', True):
+            server.login(self.config['email'], self.config['password'])
+        self._server = server
+        self._sent = 0
+
+    def _ensure_connected(self):
+        if self._server is not None:
+            idle = time.monotonic() - self._last_used
+            if self._sent >= self.max_messages:
+                self.close()
+            elif idle > self.max_idle:
+                # Relays drop idle clients; probe before trusting the socket
+                try:
+                    self._server.noop()
+                except smtplib.SMTPException:
+                    self.close()
+        if self._server is None:
+            self._connect()
+
+    def send(self, to_email, message):
+        """Send a message, reconnecting once if the relay hung up on us."""
+        start = time.perf_counter()
+        for attempt in range(2):
+            self._ensure_connected()
+            try:
+                self._server.sendmail(self.config['email'], to_email, message)
+                break
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if attempt:
+                    raise
+        self._last_used = time.monotonic()
+        self._sent += 1
+        metrics.observe('smtp_send_duration_seconds', time.perf_counter() - start)
+
+    def close(self):
+        """Close the underlying connection, ignoring errors from a dead socket."""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+class EmailOutbox:
+    """SQLite-backed outbox drained by a pool of dispatcher threads."""
+
+    def __init__(self, db_path, config, workers=2, max_attempts=5,
+                 base_delay=30, max_delay=3600, poll_interval=5, stale_after=300):
+        self.db_path = db_path
+        self.config = config
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._threads = []
+        self._pid = None          # process the dispatchers were started in
+
+    def _connect(self):
+        return connect(self.db_path, isolation_level=None)
+
+    def enqueue(self, to_email, subject, body, is_html=False, conn=None):
+        """Store a message for background delivery and wake a dispatcher.
+
+        Pass ``conn`` to reuse an already open connection; it is committed
+        before returning.
+        """
+        self.start()
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO email_outbox (to_email, subject, body, is_html)
+                VALUES (?, ?, ?, ?)
+            ''', (to_email, subject, body, is_html))
+            conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        self._wakeup.set()
+
+    def enqueue_many(self, messages, conn=None):
+        """Store ``(to_email, subject, body, is_html)`` tuples in one transaction."""
+        self.start()
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO email_outbox (to_email, subject, body, is_html)
+                    VALUES (?, ?, ?, ?)
+                ''', messages)
+        finally:
+            if own_conn:
+                conn.close()
+        self._wakeup.set()
+
+    def start(self):
+        """Recover abandoned claims and start the dispatcher threads.
+
+        Cheap once the dispatchers run, so it is called on every enqueue.
+        Threads do not survive a fork, so each worker process (e.g. under
+        gunicorn) starts its own set the first time it is called there.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            conn = self._connect()
+            try:
+                init_outbox(conn)
+                conn.execute('''
+                    UPDATE email_outbox SET status = 'pending'
+                    WHERE status = 'sending' AND claimed_at < ?
+                ''', (time.time() - self.stale_after,))
+            finally:
+                conn.close()
+            self._stopping.clear()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-dispatcher-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = pid
+        logger.info(f"Started {self.workers} email dispatcher(s) in process {pid}")
+
+    def stop(self, timeout=10):
+        """Ask the dispatchers to finish their current message and exit."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def pending_count(self):
+        """Number of messages still waiting to be delivered."""
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT COUNT(*) FROM email_outbox WHERE status IN ('pending', 'sending')
+            ''').fetchone()
+            return row[0]
+        finally:
+            conn.close()
+
+    def _claim(self, conn):
+        """Atomically move the oldest due message from pending to sending."""
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('''
+                SELECT * FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id LIMIT 1
+            ''', (now,)).fetchone()
+            if row is not None:
+                conn.execute('''
+                    UPDATE email_outbox SET status = 'sending', claimed_at = ?
+                    WHERE id = ?
+                ''', (now, row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _mark_sent(self, conn, row):
+        conn.execute('''
+            UPDATE email_outbox
+            SET status = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE id = ?
+        ''', (row['id'],))
+
+    def _mark_failed(self, conn, row, error, permanent=False):
+        attempts = row['attempts'] + 1
+        if permanent or attempts >= self.max_attempts:
+            conn.execute('''
+                UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ?
+                WHERE id = ?
+            ''', (attempts, error, row['id']))
+            logger.error(f"Email {row['id']} to {row['to_email']} failed permanently: {error}")
+            return
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        conn.execute('''
+            UPDATE email_outbox
+            SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        ''', (attempts, time.time() + delay, error, row['id']))
+        logger.warning(f"Email {row['id']} to {row['to_email']} failed, retrying in {delay}s: {error}")
+
+    def _build_message(self, row):
+        msg = MIMEMultipart()
+        msg['From'] = self.config['email']
+        msg['To'] = row['to_email']
+        msg['Subject'] = row['subject']
+        msg.attach(MIMEText(row['body'], 'html' if row['is_html'] else 'plain'))
+        return msg.as_string()
+
+    def _run(self):
+        conn = self._connect()
+        session = SMTPSession(self.config)
+        try:
+            while not self._stopping.is_set():
+                try:
+                    row = self._claim(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"Email outbox claim failed: {str(e)}")
+                    row = None
+                if row is None:
+                    # Nothing due; idle connections are re-checked on next use
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                try:
+                    session.send(row['to_email'], self._build_message(row))
+                except smtplib.SMTPRecipientsRefused as e:
+                    self._mark_failed(conn, row, str(e), permanent=True)
+                except Exception as e:
+                    session.close()
+                    self._mark_failed(conn, row, str(e))
+                else:
+                    self._mark_sent(conn, row)
+        finally:
+            session.close()
+            conn.close()
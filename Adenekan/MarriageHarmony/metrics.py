@@ -0,0 +1,137 @@
+"""
+Lightweight in-process metrics for the Harmony Counseling API.
+
+Histograms keep cumulative Prometheus-style buckets for scraping plus a
+rolling window of recent samples for p50/p95/p99 in the health check.
+Everything lives in one module-level registry so the database, mailer and
+request middleware can record into it without being wired together.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) shared by every latency histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Samples older than this drop out of the rolling percentiles
+WINDOW_SECONDS = 300
+WINDOW_MAX_SAMPLES = 2048
+
+
+class Histogram:
+    """Cumulative bucket counts plus a bounded window of recent samples."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=WINDOW_MAX_SAMPLES)
+
+    def observe(self, value, now):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append((now, value))
+
+    def window(self, now):
+        """Samples from the last ``WINDOW_SECONDS``."""
+        cutoff = now - WINDOW_SECONDS
+        while self.recent and self.recent[0][0] < cutoff:
+            self.recent.popleft()
+        return [value for _, value in self.recent]
+
+
+def percentiles(values, quantiles=(0.5, 0.95, 0.99)):
+    """Nearest-rank percentiles of ``values``, or None if there are none."""
+    values = sorted(values)
+    if not values:
+        return None
+    return {f'p{int(q * 100)}': values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+
+class Registry:
+    """Named histograms keyed by label tuples, plus callback gauges."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        """Record one sample in the histogram ``name`` with ``labels``."""
+        key = tuple(sorted(labels.items()))
+        now = time.monotonic()
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value, now)
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def gauge(self, name, callback, help_text=''):
+        """Register a gauge whose value is read from ``callback`` at scrape time."""
+        self._gauges[name] = callback
+        self._help[name] = help_text
+
+    def percentiles(self, name, **labels):
+        """Rolling percentiles for one series, or across all series if no labels."""
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            series = self._histograms.get(name, {})
+            if labels:
+                selected = [series.get(tuple(sorted(labels.items())))]
+            else:
+                selected = series.values()
+            for histogram in selected:
+                if histogram is not None:
+                    values.extend(histogram.window(now))
+        return percentiles(values)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                for key, histogram in sorted(series.items()):
+                    labels = ','.join(f'{k}="{_escape(v)}"' for k, v in key)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        bucket_labels = f'{labels},le="{bound}"' if labels else f'le="{bound}"'
+                        lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                    suffix = f'{{{labels}}}' if labels else ''
+                    lines.append(f'{name}_sum{suffix} {histogram.total}')
+                    lines.append(f'{name}_count{suffix} {histogram.count}')
+        for name, callback in sorted(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if self._help.get(name):
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+registry.describe('http_request_duration_seconds', 'API request latency by route.')
+registry.describe('sqlite_query_duration_seconds', 'Time spent executing SQLite statements.')
+registry.describe('smtp_send_duration_seconds', 'Time spent handing one message to the SMTP relay.')
+
+observe = registry.observe
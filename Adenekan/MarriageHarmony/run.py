@@ -6,11 +6,16 @@ Runs the Flask application with proper configuration.
 
 import os
 import sys
-from app import app, init_db
+from app import app, outbox, asset_cache
+from assets import build as build_assets
 
 if __name__ == '__main__':
-    # Initialize database
-    init_db()
+    # Fingerprint and precompress static files, then refresh cached pages
+    build_assets()
+    asset_cache.invalidate()
+    
+    # Start delivering queued emails
+    outbox.start()
     
     # Get port from environment or default to 5000
     port = int(os.environ.get('PORT', 5000))
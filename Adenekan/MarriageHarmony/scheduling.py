@@ -0,0 +1,278 @@
+"""
+Appointment availability for the booking form.
+
+Each counsellor has a weekly calendar of working hours (optionally limited
+to certain services and session formats) and a list of reserved slots.
+``AvailabilityIndex`` keeps both in memory, with every counsellor's
+reservations in a sorted list, so free slots for the next few days are
+computed with bisect lookups instead of scanning bookings. The database
+stays the source of truth: reservations are re-checked inside the booking
+transaction and the index reloads itself periodically to pick up writes
+from other workers.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Every session occupies one slot of this length
+SLOT_MINUTES = 60
+
+# Bookings need at least this much notice
+MIN_NOTICE = timedelta(hours=12)
+
+# Longest window the availability endpoint will compute
+MAX_DAYS = 60
+
+# Named time preferences offered by the booking form, as [start, end) hours
+TIME_BUCKETS = {
+    'morning': (9, 12),
+    'afternoon': (12, 17),
+    'evening': (17, 19),
+}
+
+SLOT_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def init_scheduling(conn):
+    """Create the calendar tables and seed a default counsellor if empty."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS counsellors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+    # weekday: 0 = Monday; services/formats: comma-separated, NULL = any
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS counsellor_hours (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            counsellor_id INTEGER NOT NULL REFERENCES counsellors (id),
+            weekday INTEGER NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            services TEXT,
+            formats TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS slot_reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            counsellor_id INTEGER NOT NULL REFERENCES counsellors (id),
+            booking_id INTEGER REFERENCES booking_submissions (id),
+            starts_at TEXT NOT NULL,
+            ends_at TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (counsellor_id, starts_at)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_slot_reservations_ends
+        ON slot_reservations (ends_at)
+    ''')
+
+    if conn.execute('SELECT COUNT(*) FROM counsellors').fetchone()[0] == 0:
+        cursor = conn.execute("INSERT INTO counsellors (name) VALUES ('Dr. Sarah Johnson')")
+        counsellor_id = cursor.lastrowid
+        hours = [(weekday, '09:00', '19:00', None) for weekday in range(5)]
+        hours.append((5, '10:00', '14:00', 'virtual'))
+        conn.executemany('''
+            INSERT INTO counsellor_hours (counsellor_id, weekday, start_time, end_time, formats)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(counsellor_id,) + row for row in hours])
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _split(value):
+    return frozenset(part.strip() for part in value.split(',')) if value else None
+
+
+def parse_preference(date_text, time_text):
+    """Turn the form's date/time into ``(date, start_minute, end_minute)``.
+
+    ``time_text`` may be an exact ``HH:MM`` slot or one of ``TIME_BUCKETS``.
+    Returns None when the preference can't be mapped to slots (no date,
+    "weekend", free text).
+    """
+    try:
+        day = datetime.strptime(date_text or '', '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    if time_text in TIME_BUCKETS:
+        start, end = TIME_BUCKETS[time_text]
+        return day, start * 60, end * 60
+    try:
+        start = _minutes(time_text)
+    except (AttributeError, ValueError):
+        return None
+    return day, start, start + SLOT_MINUTES
+
+
+class AvailabilityIndex:
+    """In-memory weekly hours plus sorted reservations per counsellor."""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.version = 0
+        self._hours = {}          # weekday -> [(counsellor_id, start_min, end_min, services, formats)]
+        self._names = {}
+        self._starts = {}         # counsellor_id -> sorted reservation starts
+        self._ends = {}           # counsellor_id -> ends, parallel to _starts
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def load(self, conn):
+        """Replace the index contents with the current database state."""
+        hours = {}
+        names = {}
+        for row in conn.execute('''
+            SELECT h.counsellor_id, h.weekday, h.start_time, h.end_time, h.services, h.formats, c.name
+            FROM counsellor_hours h JOIN counsellors c ON c.id = h.counsellor_id
+            WHERE c.active = TRUE
+        '''):
+            hours.setdefault(row['weekday'], []).append((
+                row['counsellor_id'], _minutes(row['start_time']), _minutes(row['end_time']),
+                _split(row['services']), _split(row['formats'])
+            ))
+            names[row['counsellor_id']] = row['name']
+
+        starts = {}
+        ends = {}
+        for row in conn.execute('''
+            SELECT counsellor_id, starts_at, ends_at FROM slot_reservations
+            WHERE ends_at > ? ORDER BY counsellor_id, starts_at
+        ''', (datetime.now().strftime(SLOT_FORMAT),)):
+            starts.setdefault(row['counsellor_id'], []).append(row['starts_at'])
+            ends.setdefault(row['counsellor_id'], []).append(row['ends_at'])
+
+        with self._lock:
+            self._hours = hours
+            self._names = names
+            self._starts = starts
+            self._ends = ends
+            self._loaded_at = time.monotonic()
+            self.version += 1
+
+    def ensure_fresh(self, conn):
+        """Reload if the index was never loaded or is older than ``ttl``."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.load(conn)
+
+    def is_free(self, counsellor_id, starts_at, ends_at):
+        """True if no reservation of the counsellor overlaps [starts_at, ends_at)."""
+        with self._lock:
+            starts = self._starts.get(counsellor_id, [])
+            ends = self._ends.get(counsellor_id, [])
+            i = bisect.bisect_left(starts, ends_at)
+            # Only the reservation starting just before ends_at can overlap,
+            # since slots of one counsellor never overlap each other
+            return i == 0 or ends[i - 1] <= starts_at
+
+    def add(self, counsellor_id, starts_at, ends_at):
+        """Record a committed reservation."""
+        with self._lock:
+            starts = self._starts.setdefault(counsellor_id, [])
+            ends = self._ends.setdefault(counsellor_id, [])
+            i = bisect.bisect_left(starts, starts_at)
+            starts.insert(i, starts_at)
+            ends.insert(i, ends_at)
+            self.version += 1
+
+    def candidates(self, day, start_minute, end_minute, service=None, session_format=None):
+        """Free ``(counsellor_id, starts_at, ends_at)`` slots on one day, earliest first."""
+        earliest = datetime.now() + MIN_NOTICE
+        slots = []
+        with self._lock:
+            for counsellor_id, open_min, close_min, services, formats in self._hours.get(day.weekday(), []):
+                if service and services is not None and service not in services:
+                    continue
+                if session_format and session_format != 'either' and formats is not None \
+                        and session_format not in formats:
+                    continue
+                # First slot on the counsellor's grid starting inside the window
+                minute = open_min + max(0, -(-(start_minute - open_min) // SLOT_MINUTES)) * SLOT_MINUTES
+                while minute + SLOT_MINUTES <= close_min and minute < end_minute:
+                    start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+                    if start >= earliest:
+                        starts_at = start.strftime(SLOT_FORMAT)
+                        ends_at = (start + timedelta(minutes=SLOT_MINUTES)).strftime(SLOT_FORMAT)
+                        if self.is_free(counsellor_id, starts_at, ends_at):
+                            slots.append((counsellor_id, starts_at, ends_at))
+                    minute += SLOT_MINUTES
+        slots.sort(key=lambda slot: slot[1])
+        return slots
+
+    def free_slots(self, start_day, days, service=None, session_format=None):
+        """Free slot start times over ``days`` days with how many counsellors can take each."""
+        result = []
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            counts = {}
+            for _, starts_at, _ in self.candidates(day, 0, 24 * 60, service, session_format):
+                counts[starts_at] = counts.get(starts_at, 0) + 1
+            result.extend({'start': starts_at, 'counsellors': count}
+                          for starts_at, count in sorted(counts.items()))
+        return result
+
+    def counsellor_name(self, counsellor_id):
+        return self._names.get(counsellor_id)
+
+
+def reserve_slot(conn, index, booking_id, preference, service, session_format):
+    """Reserve the earliest free slot matching ``preference`` for a booking.
+
+    Must be called inside the booking's write transaction. Each candidate is
+    re-checked against the database, so a stale index can only cause a
+    retry, never a double booking. Returns ``(counsellor_id, starts_at,
+    ends_at)`` or None if nothing is free.
+    """
+    day, start_minute, end_minute = preference
+    for counsellor_id, starts_at, ends_at in index.candidates(day, start_minute, end_minute,
+                                                              service, session_format):
+        clash = conn.execute('''
+            SELECT 1 FROM slot_reservations
+            WHERE counsellor_id = ? AND starts_at < ? AND ends_at > ?
+        ''', (counsellor_id, ends_at, starts_at)).fetchone()
+        if clash:
+            continue
+        conn.execute('''
+            INSERT INTO slot_reservations (counsellor_id, booking_id, starts_at, ends_at)
+            VALUES (?, ?, ?, ?)
+        ''', (counsellor_id, booking_id, starts_at, ends_at))
+        return counsellor_id, starts_at, ends_at
+    return None
+
+
+class AvailabilityCache:
+    """Rendered availability responses, dropped whenever the index changes."""
+
+    def __init__(self, ttl=30, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._version = version
+                return None
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            return None
+
+    def put(self, key, version, value):
+        with self._lock:
+            if version != self._version:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic(), value)
@@ -108,6 +108,10 @@ document.getElementById('bookingForm').addEventListener('submit', function(e) {
     })
     .then(response => response.json())
     .then(result => {
+        if (result.error) {
+            showMessage(result.error, 'error');
+            return;
+        }
         showMessage('Your appointment request has been submitted! We\'ll contact you within 24 hours to confirm your session.', 'success');
         this.reset();
     })
@@ -326,6 +330,48 @@ if (bookingDateInput) {
     bookingDateInput.min = tomorrow.toISOString().split('T')[0];
 }
 
+// Disable preferred times with no free appointments on the chosen date
+const TIME_BUCKET_HOURS = {
+    morning: [9, 12],
+    afternoon: [12, 17],
+    evening: [17, 19]
+};
+
+function updateAvailableTimes() {
+    const date = bookingDateInput.value;
+    const timeSelect = document.getElementById('booking-time');
+    const options = Array.from(timeSelect.options).filter(option => option.value in TIME_BUCKET_HOURS);
+    if (!date) {
+        options.forEach(option => option.disabled = false);
+        return;
+    }
+    const params = new URLSearchParams({
+        from: date,
+        days: 1,
+        service: document.getElementById('booking-service').value,
+        format: document.getElementById('booking-format').value
+    });
+    fetch(`/api/availability?${params}`)
+        .then(response => response.json())
+        .then(result => {
+            const hours = (result.slots || []).map(slot => parseInt(slot.start.slice(11, 13), 10));
+            options.forEach(option => {
+                const [start, end] = TIME_BUCKET_HOURS[option.value];
+                option.disabled = !hours.some(hour => hour >= start && hour < end);
+                if (option.disabled && option.selected) {
+                    timeSelect.value = '';
+                }
+            });
+        })
+        .catch(() => options.forEach(option => option.disabled = false));
+}
+
+if (bookingDateInput) {
+    ['booking-date', 'booking-service', 'booking-format'].forEach(id => {
+        document.getElementById(id).addEventListener('change', updateAvailableTimes);
+    });
+}
+
 // Google Maps Integration (placeholder)
 function initMap() {
     // This would integrate with Google Maps API
@@ -0,0 +1,121 @@
+"""
+In-memory cache of prebuilt response bodies.
+
+Small, hot, rarely changing responses (the home page, sitemap.xml,
+robots.txt) are built once, compressed once and then served from memory
+with strong ETags and Last-Modified validators so repeat visitors and
+crawlers get a 304. Entries rebuild themselves when a source file changes.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# How often (seconds) source files are stat()ed for changes
+CHECK_INTERVAL = 2
+
+
+class CachedAsset:
+    """One prebuilt body with its compressed variants and validators."""
+
+    def __init__(self, name, builder, mimetype, sources=(), cache_control='no-cache'):
+        self.name = name
+        self.builder = builder
+        self.mimetype = mimetype
+        self.sources = list(sources)
+        self.cache_control = cache_control
+        self.variants = {}
+        self.etag = None
+        self.last_modified = None
+        self._mtimes = None
+        self._checked_at = 0
+
+    def _source_mtimes(self):
+        # A missing source counts as mtime 0 so creating it triggers a rebuild
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else 0
+                     for path in self.sources)
+
+    def build(self):
+        """Render the body and precompute every encoding and validator."""
+        mtimes = self._source_mtimes()
+        body = self.builder()
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        variants = {'identity': body, 'gzip': gzip.compress(body, 9)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+        self.variants = variants
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = max(mtimes) if mtimes else time.time()
+        self._mtimes = mtimes
+        self._checked_at = time.monotonic()
+
+    def is_stale(self):
+        """True if a source file changed since the last build."""
+        now = time.monotonic()
+        if now - self._checked_at < CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        try:
+            return self._source_mtimes() != self._mtimes
+        except OSError:
+            return False
+
+
+class AssetCache:
+    """Registry of ``CachedAsset`` entries that builds responses from memory."""
+
+    def __init__(self, response_class):
+        self.response_class = response_class
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, builder, mimetype, sources=(), cache_control='no-cache'):
+        """Add an asset and build it immediately."""
+        asset = CachedAsset(name, builder, mimetype, sources, cache_control)
+        asset.build()
+        self._assets[name] = asset
+        return asset
+
+    def invalidate(self, name=None):
+        """Force one asset (or all of them) to rebuild now."""
+        names = [name] if name else list(self._assets)
+        with self._lock:
+            for key in names:
+                self._assets[key].build()
+
+    def _current(self, name):
+        asset = self._assets[name]
+        if asset.is_stale():
+            with self._lock:
+                asset.build()
+        return asset
+
+    def response(self, name, request):
+        """Serve an asset, picking an encoding and honouring conditional headers."""
+        asset = self._current(name)
+
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        response = self.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = asset.cache_control
+        response.headers['Last-Modified'] = formatdate(asset.last_modified, usegmt=True)
+        # Each encoding is a distinct representation and needs its own strong tag
+        etag = asset.etag if encoding == 'identity' else f'{asset.etag}-{encoding}'
+        response.set_etag(etag)
+        return response.make_conditional(request)
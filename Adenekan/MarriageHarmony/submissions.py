@@ -0,0 +1,174 @@
+"""
+Query helpers for the admin submissions API.
+
+Each submissions table is read newest first with keyset (cursor) pagination
+on ``(timestamp, id)`` so every page is an index range scan, no matter how
+far back the admin pages. Exports iterate the same query in chunks and
+never hold a whole table in memory.
+"""
+
+import base64
+import csv
+import io
+import json
+
+# Per-table settings: timestamp column, allowed equality filters and any
+# fixed condition.
+SUBMISSION_TABLES = {
+    'contact': {
+        'table': 'contact_submissions',
+        'time_column': 'submitted_at',
+        'filters': ('service',),
+        'where': None
+    },
+    'booking': {
+        'table': 'booking_submissions',
+        'time_column': 'submitted_at',
+        'filters': ('service', 'format'),
+        'where': None
+    },
+    'newsletter': {
+        'table': 'newsletter_subscriptions',
+        'time_column': 'subscribed_at',
+        'filters': (),
+        'where': 'active = TRUE'
+    }
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+
+
+def init_indexes(conn):
+    """Create the indexes that back the newest-first scans and filters."""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_contact_submitted
+        ON contact_submissions (submitted_at, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_contact_service_submitted
+        ON contact_submissions (service, submitted_at, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_booking_submitted
+        ON booking_submissions (submitted_at, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_booking_service_submitted
+        ON booking_submissions (service, submitted_at, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_newsletter_active_subscribed
+        ON newsletter_subscriptions (active, subscribed_at, id)
+    ''')
+
+
+def encode_cursor(row, time_column):
+    """Opaque cursor pointing just past ``row``."""
+    raw = json.dumps([row[time_column], row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError on garbage."""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return timestamp, int(row_id)
+
+
+def build_query(kind, args, cursor=None, limit=None):
+    """Build the SELECT for a table from request filters.
+
+    ``args`` is a mapping of query parameters (``service``, ``format``,
+    ``since``, ``until``). Returns ``(sql, params)``.
+    """
+    spec = SUBMISSION_TABLES[kind]
+    time_column = spec['time_column']
+    conditions = []
+    params = []
+
+    if spec['where']:
+        conditions.append(spec['where'])
+    for name in spec['filters']:
+        if args.get(name):
+            conditions.append(f'{name} = ?')
+            params.append(args[name])
+    if args.get('since'):
+        conditions.append(f'{time_column} >= ?')
+        params.append(args['since'])
+    if args.get('until'):
+        # Inclusive of the whole "until" day
+        conditions.append(f"{time_column} < date(?, '+1 day')")
+        params.append(args['until'])
+    if cursor:
+        conditions.append(f'({time_column}, id) < (?, ?)')
+        params.extend(decode_cursor(cursor))
+
+    sql = f"SELECT * FROM {spec['table']}"
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {time_column} DESC, id DESC'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def parse_limit(value):
+    """Clamp a ``limit`` query parameter to the allowed page size."""
+    try:
+        limit = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('Invalid limit')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def fetch_page(conn, kind, args, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of rows plus the cursor for the next page (or None)."""
+    # Ask for one extra row to know whether another page exists
+    sql, params = build_query(kind, args, cursor, limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], SUBMISSION_TABLES[kind]['time_column'])
+    return [dict(row) for row in rows], next_cursor
+
+
+def iter_rows(conn, kind, args):
+    """Run the unpaginated query; returns the column names and a row iterator."""
+    sql, params = build_query(kind, args)
+    cursor = conn.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+
+    def rows():
+        while True:
+            chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield from chunk
+
+    return columns, rows()
+
+
+def export_ndjson(columns, rows):
+    """Encode rows as newline-delimited JSON."""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def export_csv(columns, rows):
+    """Encode rows as CSV with a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(tuple(row))
+        if buffer.tell() >= 8192:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
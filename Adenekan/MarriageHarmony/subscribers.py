@@ -0,0 +1,177 @@
+"""
+Newsletter subscription helpers.
+
+An in-process Bloom filter holds every subscribed address so most signups
+can be classified without touching SQLite: a "no" from the filter is
+definite and goes straight to the insert, while a "maybe" is confirmed with
+a single indexed lookup. Bulk imports are checked and inserted set-wise in
+one transaction.
+"""
+
+import hashlib
+import math
+import re
+import threading
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Largest number of addresses accepted by one bulk request
+MAX_BULK_EMAILS = 10000
+
+# Size of the IN (...) lists used to confirm Bloom filter hits
+LOOKUP_CHUNK_SIZE = 500
+
+INSERT_SUBSCRIPTION_SQL = '''
+    INSERT OR IGNORE INTO newsletter_subscriptions (email)
+    VALUES (?)
+'''
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class SubscriberFilter:
+    """Bloom filter of subscribed emails, loaded lazily from the database.
+
+    The filter is per process, so another worker may have added an address
+    it has not seen; callers must still tolerate a duplicate on insert.
+    """
+
+    def __init__(self, error_rate=0.001, min_capacity=10000):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self._bloom = None
+        self._lock = threading.Lock()
+
+    def _load(self, conn):
+        total = conn.execute('SELECT COUNT(*) FROM newsletter_subscriptions').fetchone()[0]
+        # Leave headroom so campaign imports don't push the error rate up
+        bloom = BloomFilter(max(self.min_capacity, total * 2), self.error_rate)
+        cursor = conn.execute('SELECT email FROM newsletter_subscriptions')
+        while True:
+            rows = cursor.fetchmany(LOOKUP_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                bloom.add(row[0])
+        return bloom
+
+    def _ensure_loaded(self, conn):
+        with self._lock:
+            if self._bloom is None or self._bloom.count > self._bloom.capacity:
+                self._bloom = self._load(conn)
+            return self._bloom
+
+    def might_contain(self, conn, email):
+        """False means definitely not subscribed."""
+        return email in self._ensure_loaded(conn)
+
+    def maybe_subscribed(self, conn, emails):
+        """The subset of ``emails`` that may already be subscribed."""
+        bloom = self._ensure_loaded(conn)
+        return [email for email in emails if email in bloom]
+
+    def add(self, emails):
+        """Record newly committed subscriptions."""
+        with self._lock:
+            if self._bloom is not None:
+                for email in emails:
+                    self._bloom.add(email)
+
+    def reset(self):
+        """Drop the filter; it is reloaded on next use."""
+        with self._lock:
+            self._bloom = None
+
+
+def is_subscribed(conn, email):
+    """Confirm a subscription with an indexed lookup."""
+    row = conn.execute('SELECT 1 FROM newsletter_subscriptions WHERE email = ?', (email,)).fetchone()
+    return row is not None
+
+
+def existing_subscribers(conn, emails, max_id=None):
+    """Return the subset of ``emails`` already in the table, in chunked lookups.
+
+    With ``max_id``, only rows up to that id count as existing.
+    """
+    found = set()
+    id_clause = ' AND id <= ?' if max_id is not None else ''
+    for i in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        chunk = emails[i:i + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        params = chunk + [max_id] if max_id is not None else chunk
+        rows = conn.execute(f'''
+            SELECT email FROM newsletter_subscriptions WHERE email IN ({placeholders}){id_clause}
+        ''', params).fetchall()
+        found.update(row[0] for row in rows)
+    return found
+
+
+def bulk_subscribe(conn, subscriber_filter, emails):
+    """Subscribe many addresses in one transaction.
+
+    Returns ``(subscribed, already_subscribed, invalid)`` lists; only the
+    addresses in ``subscribed`` were written.
+    """
+    unique = []
+    seen = set()
+    invalid = []
+    for email in emails:
+        email = email.strip() if isinstance(email, str) else ''
+        if not EMAIL_PATTERN.match(email):
+            invalid.append(email)
+        elif email not in seen:
+            seen.add(email)
+            unique.append(email)
+
+    maybe_known = subscriber_filter.maybe_subscribed(conn, unique)
+    known = existing_subscribers(conn, maybe_known) if maybe_known else set()
+    candidates = [email for email in unique if email not in known]
+    if not candidates:
+        return [], unique, invalid
+
+    # Take the write lock up front so the id high-water mark is exact
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM newsletter_subscriptions').fetchone()[0]
+        before = conn.total_changes
+        conn.executemany(INSERT_SUBSCRIPTION_SQL, [(email,) for email in candidates])
+        inserted = conn.total_changes - before
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    subscriber_filter.add(candidates)
+
+    raced = set()
+    if inserted < len(candidates):
+        # INSERT OR IGNORE skipped rows another worker added since the lookup
+        raced = existing_subscribers(conn, candidates, max_id=last_id)
+
+    already = [email for email in unique if email in known or email in raced]
+    subscribed = [email for email in candidates if email not in raced]
+    return subscribed, already, invalid
@@ -0,0 +1,85 @@
+import os
+import socket
+import tempfile
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+# Must be set before database.py reads it; keeps the suite off counseling.db
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+
+
+class Relay:
+    """SMTP handler that records deliveries and can refuse some of them.
+
+    ``failures`` is the number of upcoming messages answered with a
+    temporary error; addresses in ``refused`` are rejected outright.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.attempts = []
+        self.failures = 0
+        self.refused = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return '550 5.1.1 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts.append(time.monotonic())
+        if self.failures:
+            self.failures -= 1
+            return '451 4.3.0 Try again later'
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def relay():
+    handler = Relay()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def smtp_config(relay):
+    return {
+        'smtp_server': '127.0.0.1',
+        'smtp_port': relay[1],
+        'use_tls': False,
+        'use_auth': False,
+        'email': 'info@harmonycounseling.com',
+    }
+
+
+@pytest.fixture(scope='session')
+def site():
+    """The app module on the test database; queued mail is never sent."""
+    import app as site
+    site.outbox.start = lambda: None
+    return site
+
+
+@pytest.fixture
+def client(site):
+    return site.app.test_client()
+
+
+@pytest.fixture
+def conn(site):
+    from database import connect
+    conn = connect(site.DATABASE)
+    yield conn
+    conn.close()
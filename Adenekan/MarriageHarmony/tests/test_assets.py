@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import os
+
+import pytest
+
+import assets
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """A throwaway static/ folder with one stylesheet and one script."""
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css' / 'style.css').write_text('/* theme */\nbody {\n  color: red;\n}\n')
+    (tmp_path / 'js' / 'script.js').write_text('// greet\nconst a = `x\n  y`;\n    go();\n')
+    monkeypatch.setattr(assets, 'STATIC_DIR', str(tmp_path))
+    monkeypatch.setattr(assets, 'DIST_DIR', str(tmp_path / 'dist'))
+    monkeypatch.setattr(assets, 'MANIFEST_PATH', str(tmp_path / 'dist' / 'manifest.json'))
+    return tmp_path
+
+
+def test_minifiers():
+    assert assets.minify_css('/* c */ a > b { color: red ; margin: 0; }') == 'a>b{color:red;margin:0}'
+    # Template literal lines keep their indentation
+    assert assets.minify_js('// c\n  let s = `a\n    b`;\n\n  f();\n') == 'let s = `a\n    b`;\nf();\n'
+
+
+def test_build_fingerprints_and_precompresses(static_dir):
+    manifest = assets.build()
+    assert manifest == assets.load_manifest()
+    hashed = static_dir / manifest['css/style.css']
+    body = hashed.read_bytes()
+    assert body == b'body{color:red}'
+    assert hashed.name == f'style.{hashlib.sha256(body).hexdigest()[:12]}.css'
+    assert gzip.decompress((static_dir / (manifest['css/style.css'] + '.gz')).read_bytes()) == body
+
+    # Rebuilding after an edit leaves only the new outputs
+    (static_dir / 'css' / 'style.css').write_text('p { margin: 0 }')
+    rebuilt = assets.build()
+    assert rebuilt['css/style.css'] != manifest['css/style.css']
+    assert sorted(name for name in os.listdir(static_dir / 'dist') if name.startswith('style.')) == sorted(
+        os.path.basename(rebuilt['css/style.css']) + suffix for suffix in ('', '.gz'))
+
+
+def test_html_points_at_hashed_names():
+    html = '<link href="static/css/style.css"><script src="static/js/script.js"></script>'
+    manifest = {'css/style.css': 'dist/style.abc.css'}
+    assert assets.rewrite_asset_urls(html, manifest) == (
+        '<link href="static/dist/style.abc.css"><script src="static/js/script.js"></script>')
+
+
+def test_built_assets_are_served_precompressed_and_immutable(site, client, static_dir, monkeypatch):
+    monkeypatch.setattr(site.app, 'static_folder', str(static_dir))
+    url = '/static/' + assets.build()['js/script.js']
+
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert 'Content-Encoding' not in plain.headers
+    for response in (zipped, plain):
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert response.mimetype == 'text/javascript'
+        response.close()
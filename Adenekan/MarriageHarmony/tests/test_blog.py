@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from blog import ResponseCache, blog_version, fts_query, init_blog, list_posts, render_search, search_posts
+from database import connect
+
+POSTS = [
+    # title, category, content, published_at
+    ('Rebuilding trust', 'marriage', 'Small daily habits matter.', '2026-01-01'),
+    ('Money talks', 'finance', 'Couples argue about money; trust grows from budgets.', '2026-01-02'),
+    ('Café conversations', 'communication', 'Listening first.', '2026-01-03'),
+    ('Trust exercises', 'marriage', 'Retired post.', '2026-01-04'),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = connect(str(tmp_path / 'blog.db'))
+    conn.execute('''
+        CREATE TABLE blog_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            category TEXT NOT NULL,
+            content TEXT NOT NULL,
+            excerpt TEXT,
+            image_url TEXT,
+            published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+    # Posts written before the index existed are picked up by its rebuild
+    conn.executemany('INSERT INTO blog_posts (title, category, content, published_at) VALUES (?, ?, ?, ?)',
+                     POSTS[:2])
+    init_blog(conn)
+    conn.executemany('INSERT INTO blog_posts (title, category, content, published_at) VALUES (?, ?, ?, ?)',
+                     POSTS[2:])
+    conn.execute("UPDATE blog_posts SET active = FALSE WHERE title = 'Trust exercises'")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def titles(result):
+    return [row['title'] for row in result['results']]
+
+
+def test_fts_query_quotes_terms_and_prefixes_the_last():
+    assert fts_query('trust OR "money') == '"trust" "OR" "money"*'
+    assert fts_query(' -*() ') is None
+
+
+def test_title_matches_rank_first_and_inactive_posts_are_hidden(db):
+    result = search_posts(db, 'trust')
+    assert titles(result) == ['Rebuilding trust', 'Money talks']
+    assert result['facets'] == {'marriage': 1, 'finance': 1}
+    assert '<mark>trust</mark>' in result['results'][0]['title_highlight']
+
+
+def test_prefixes_diacritics_and_categories(db):
+    assert titles(search_posts(db, 'cafe')) == ['Café conversations']
+    assert titles(search_posts(db, 'budg')) == ['Money talks']
+    result = search_posts(db, 'trust', category='finance')
+    assert (titles(result), result['total']) == (['Money talks'], 1)
+    assert set(result['facets']) == {'marriage', 'finance'}
+
+
+def test_edits_reach_the_index_and_drop_cached_results(db):
+    cache = ResponseCache()
+    version = blog_version(db)
+    before = json.loads(render_search(db, cache, 'listening', None, 1, 10))
+    assert titles(before) == ['Café conversations']
+
+    db.execute("UPDATE blog_posts SET content = 'Speak softly.' WHERE title = 'Café conversations'")
+    db.commit()
+    assert blog_version(db) == version + 1
+    assert json.loads(render_search(db, cache, 'listening', None, 1, 10))['total'] == 0
+
+    db.execute("DELETE FROM blog_posts WHERE title = 'Money talks'")
+    db.commit()
+    assert titles(search_posts(db, 'budgets')) == []
+
+
+def test_listing_pages_newest_first(db):
+    first, cursor = list_posts(db, limit=2)
+    second, last = list_posts(db, cursor=cursor, limit=2)
+    assert [post['title'] for post in first + second] == ['Café conversations', 'Money talks', 'Rebuilding trust']
+    assert last is None
+    assert [post['title'] for post in list_posts(db, category='marriage')[0]] == ['Rebuilding trust']
+
+
+@pytest.mark.parametrize('query', ['q=', 'q=trust&page=x', 'q=trust&limit=none'])
+def test_search_endpoint_rejects_bad_parameters(client, query):
+    assert client.get(f'/api/blog/search?{query}').status_code == 400
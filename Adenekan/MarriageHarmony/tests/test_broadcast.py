@@ -0,0 +1,86 @@
+from email import message_from_bytes
+
+import pytest
+
+import broadcast
+from broadcast import BroadcastJob, init_broadcasts, create_broadcast, get_broadcast, failed_deliveries
+from database import connect
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(broadcast, 'RETRY_DELAY', 0)
+    monkeypatch.setattr(broadcast, 'SENDER_CHECK_INTERVAL', 0.05)
+    path = str(tmp_path / 'broadcast.db')
+    conn = connect(path)
+    conn.execute('''
+        CREATE TABLE newsletter_subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+    init_broadcasts(conn)
+    conn.executemany('INSERT INTO newsletter_subscriptions (email) VALUES (?)',
+                     [('a@example.com',), ('b@example.com',), ('c@example.com',)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def new_broadcast(db_path, body):
+    conn = connect(db_path)
+    try:
+        return create_broadcast(conn, 'Spring issue', body, rate_per_second=1000)
+    finally:
+        conn.close()
+
+
+def stored(db_path, broadcast_id):
+    conn = connect(db_path)
+    try:
+        return get_broadcast(conn, broadcast_id), failed_deliveries(conn, broadcast_id)
+    finally:
+        conn.close()
+
+
+def test_literal_dollar_signs_are_sent_as_written(relay, smtp_config, db_path):
+    handler, _ = relay
+    broadcast_id = new_broadcast(db_path, 'Save $50 this month, $email! ${email} costs $$0.')
+    BroadcastJob(db_path, broadcast_id, smtp_config, workers=2).run()
+
+    bodies = {envelope.rcpt_tos[0]: message_from_bytes(envelope.content).get_payload(decode=True).decode().rstrip()
+              for envelope in handler.messages}
+    assert bodies['a@example.com'] == 'Save $50 this month, a@example.com! a@example.com costs $0.'
+    assert len(bodies) == 3
+    row, failures = stored(db_path, broadcast_id)
+    assert (row['status'], row['sent_count'], row['failed_count']) == ('completed', 3, 0)
+    assert failures == []
+
+
+def test_transient_errors_are_retried_and_failures_reported(relay, smtp_config, db_path):
+    handler, _ = relay
+    handler.refused.add('b@example.com')
+    handler.failures = broadcast.SEND_ATTEMPTS - 1
+    broadcast_id = new_broadcast(db_path, 'Hello $email')
+    BroadcastJob(db_path, broadcast_id, smtp_config, workers=1).run()
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == ['a@example.com', 'c@example.com']
+    row, failures = stored(db_path, broadcast_id)
+    assert (row['status'], row['sent_count'], row['failed_count']) == ('completed', 2, 1)
+    assert [failure['email'] for failure in failures] == ['b@example.com']
+    assert 'No such user' in failures[0]['error']
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_dead_senders_do_not_block_the_broadcast(smtp_config, db_path, monkeypatch):
+    def crash(self, *args):
+        raise RuntimeError('sender crashed')
+    monkeypatch.setattr(BroadcastJob, '_sender', crash)
+    broadcast_id = new_broadcast(db_path, 'Hello $email')
+
+    with pytest.raises(RuntimeError, match='all sender threads died'):
+        BroadcastJob(db_path, broadcast_id, smtp_config, workers=2).run()
+    row, _ = stored(db_path, broadcast_id)
+    assert (row['status'], row['checkpoint_id']) == ('paused', 0)
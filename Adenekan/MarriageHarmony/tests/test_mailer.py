@@ -0,0 +1,81 @@
+import time
+from email import message_from_bytes
+
+import pytest
+
+from database import connect
+from mailer import EmailOutbox
+
+BASE_DELAY = 0.2
+
+
+@pytest.fixture
+def outbox(smtp_config, tmp_path):
+    box = EmailOutbox(str(tmp_path / 'outbox.db'), smtp_config, workers=1, max_attempts=3,
+                      base_delay=BASE_DELAY, poll_interval=0.05)
+    yield box
+    box.stop()
+
+
+def row(box, email_id=1):
+    conn = connect(box.db_path)
+    try:
+        return conn.execute('SELECT * FROM email_outbox WHERE id = ?', (email_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.02)
+    pytest.fail('timed out waiting for the outbox')
+
+
+def test_enqueue_delivers(relay, outbox):
+    handler, _ = relay
+    outbox.enqueue('client@example.com', 'Booking received', 'See you soon')
+    outbox.enqueue_many([('a@example.com', 'Hello', '<p>Hi</p>', True),
+                         ('b@example.com', 'Hello', '<p>Hi</p>', True)])
+
+    wait_for(lambda: outbox.pending_count() == 0)
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == \
+        ['a@example.com', 'b@example.com', 'client@example.com']
+    first = message_from_bytes(handler.messages[0].content)
+    assert first['Subject'] == 'Booking received'
+    assert first['From'] == 'info@harmonycounseling.com'
+    stored = row(outbox)
+    assert stored['status'] == 'sent'
+    assert stored['attempts'] == 1
+
+
+def test_retries_with_backoff(relay, outbox):
+    handler, _ = relay
+    handler.failures = 2
+    outbox.enqueue('client@example.com', 'Reminder', 'Tomorrow at 10:00')
+
+    wait_for(lambda: row(outbox)['status'] == 'sent')
+    assert len(handler.attempts) == 3
+    assert len(handler.messages) == 1
+    # Delays double after each failure: BASE_DELAY, then 2 * BASE_DELAY
+    first_gap = handler.attempts[1] - handler.attempts[0]
+    second_gap = handler.attempts[2] - handler.attempts[1]
+    assert first_gap >= BASE_DELAY * 0.9
+    assert second_gap >= 2 * BASE_DELAY * 0.9
+    assert row(outbox)['attempts'] == 3
+
+
+def test_gives_up_after_max_attempts(relay, outbox):
+    handler, _ = relay
+    handler.failures = 10
+    outbox.enqueue('client@example.com', 'Reminder', 'Tomorrow at 10:00')
+
+    wait_for(lambda: row(outbox)['status'] == 'failed')
+    stored = row(outbox)
+    assert stored['attempts'] == outbox.max_attempts
+    assert 'Try again later' in stored['last_error']
+    assert len(handler.attempts) == outbox.max_attempts
+    assert handler.messages == []
+    assert outbox.pending_count() == 0
@@ -0,0 +1,57 @@
+import metrics
+from database import connect
+from metrics import Registry, percentiles
+
+
+def test_percentiles_use_nearest_rank():
+    assert percentiles([]) is None
+    assert percentiles(range(1, 101)) == {'p50': 51, 'p95': 96, 'p99': 100}
+
+
+def test_render_writes_cumulative_buckets_and_gauges():
+    registry = Registry()
+    registry.describe('job_seconds', 'Job time.')
+    for value in (0.002, 0.002, 0.3, 20):
+        registry.observe('job_seconds', value, kind='a"b')
+    registry.gauge('queue_depth', lambda: 7, 'Waiting jobs.')
+    registry.gauge('broken', lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+    assert '# HELP job_seconds Job time.' in lines
+    assert 'job_seconds_bucket{kind="a\\"b",le="0.0025"} 2' in lines
+    assert 'job_seconds_bucket{kind="a\\"b",le="0.5"} 3' in lines
+    assert 'job_seconds_bucket{kind="a\\"b",le="+Inf"} 4' in lines
+    assert 'job_seconds_count{kind="a\\"b"} 4' in lines
+    assert lines[-1] == 'queue_depth 7'
+    assert not any(line.startswith('broken') for line in lines)
+
+
+def test_old_samples_leave_the_window(monkeypatch):
+    registry = Registry()
+    clock = iter([0, 1, metrics.WINDOW_SECONDS + 0.5])
+    monkeypatch.setattr(metrics.time, 'monotonic', lambda: next(clock))
+    registry.observe('job_seconds', 5.0)
+    registry.observe('job_seconds', 1.0)
+    assert registry.percentiles('job_seconds') == {'p50': 1.0, 'p95': 1.0, 'p99': 1.0}
+
+
+def test_sqlite_statements_are_timed_by_operation(tmp_path):
+    conn = connect(str(tmp_path / 'timed.db'))
+    conn.execute('CREATE TABLE t (x)')
+    conn.execute('pragma user_version')
+    conn.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+    conn.commit()
+    conn.close()
+    for operation in ('CREATE', 'PRAGMA', 'INSERT', 'COMMIT'):
+        assert metrics.registry.percentiles('sqlite_query_duration_seconds', operation=operation)
+
+
+def test_requests_are_recorded_per_route(client):
+    client.get('/api/health')
+    client.get('/no-such-page')
+    text = client.get('/api/metrics').data.decode()
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert '# TYPE email_outbox_depth gauge' in text
+    health = client.get('/api/health').get_json()
+    assert set(health['latency']['requests']) == {'p50', 'p95', 'p99'}
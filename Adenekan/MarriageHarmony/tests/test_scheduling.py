@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+
+from scheduling import parse_preference
+
+# A Monday two weeks out; the default counsellor works 09:00-19:00 on weekdays
+MONDAY = date.today() + timedelta(days=14 - date.today().weekday())
+
+
+def book(client, day, time, session_format='in-person', **fields):
+    return client.post('/api/booking', json={
+        'name': 'Ada', 'email': 'ada@example.com', 'phone': '555-0100', 'service': 'couples',
+        'format': session_format, 'date': day.isoformat(), 'time': time, **fields})
+
+
+def bookings(conn):
+    return conn.execute('SELECT COUNT(*) FROM booking_submissions').fetchone()[0]
+
+
+def free_starts(client, day):
+    data = client.get(f'/api/availability?from={day.isoformat()}&days=1').get_json()
+    return [slot['start'][-5:] for slot in data['slots']]
+
+
+def test_preferences():
+    assert parse_preference('2030-01-07', 'morning') == (date(2030, 1, 7), 9 * 60, 12 * 60)
+    assert parse_preference('2030-01-07', '14:30') == (date(2030, 1, 7), 14 * 60 + 30, 15 * 60 + 30)
+    assert parse_preference('2030-01-07', 'weekend') is None
+    assert parse_preference('', 'morning') is None
+
+
+def test_a_taken_slot_is_a_409_and_stores_nothing(client, conn):
+    assert '10:00' in free_starts(client, MONDAY)
+    response = book(client, MONDAY, '10:00')
+    assert response.status_code == 200
+    assert response.get_json()['slot']['start'] == f'{MONDAY.isoformat()} 10:00'
+    # The cached availability for that day is dropped with the booking
+    assert '10:00' not in free_starts(client, MONDAY)
+
+    count = bookings(conn)
+    response = book(client, MONDAY, '10:00')
+    assert response.status_code == 409
+    assert bookings(conn) == count
+
+
+def test_reservations_from_other_workers_are_rechecked(client, conn):
+    tuesday = MONDAY + timedelta(days=1)
+    free_starts(client, tuesday)
+    # Another worker reserves 09:00 after this worker's index was loaded
+    conn.execute("INSERT INTO slot_reservations (counsellor_id, starts_at, ends_at) VALUES (1, ?, ?)",
+                 (f'{tuesday.isoformat()} 09:00', f'{tuesday.isoformat()} 10:00'))
+    conn.commit()
+
+    response = book(client, tuesday, 'morning')
+    assert response.get_json()['slot']['start'] == f'{tuesday.isoformat()} 10:00'
+
+
+@pytest.mark.parametrize('session_format, status', [('in-person', 409), ('virtual', 200)])
+def test_working_hours_can_be_limited_to_a_format(client, session_format, status):
+    saturday = MONDAY + timedelta(days=5 + (7 if session_format == 'virtual' else 0))
+    assert book(client, saturday, '11:00', session_format).status_code == status
+
+
+def test_bookings_without_a_slot_preference_are_kept(client, conn):
+    count = bookings(conn)
+    response = book(client, MONDAY, 'weekend')
+    assert response.status_code == 200
+    assert 'slot' not in response.get_json()
+    assert bookings(conn) == count + 1
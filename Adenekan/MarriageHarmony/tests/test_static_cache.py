@@ -0,0 +1,50 @@
+import gzip
+import os
+
+from flask import Flask, request
+
+import static_cache
+from static_cache import AssetCache
+
+
+def test_conditional_requests_get_a_304(client):
+    first = client.get('/robots.txt')
+    assert first.status_code == 200
+    assert b'Disallow: /api/admin/' in first.data
+    assert first.headers['Cache-Control'] == 'public, max-age=86400'
+    assert first.headers['Vary'] == 'Accept-Encoding'
+
+    assert client.get('/robots.txt', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert client.get('/robots.txt', headers={'If-None-Match': '"stale"'}).status_code == 200
+    since = client.get('/robots.txt', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = client.get('/sitemap.xml', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+    # A gzip tag does not validate the identity body
+    response = client.get('/sitemap.xml', headers={'Accept-Encoding': 'identity',
+                                                    'If-None-Match': zipped.headers['ETag']})
+    assert response.status_code == 200
+
+
+def test_assets_rebuild_when_a_source_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_cache, 'CHECK_INTERVAL', 0)
+    source = tmp_path / 'page.html'
+    source.write_text('one')
+    app = Flask(__name__)
+    cache = AssetCache(app.response_class)
+    cache.register('page', source.read_text, 'text/html', sources=[str(source)])
+
+    with app.test_request_context():
+        before = cache.response('page', request)
+        source.write_text('two')
+        os.utime(source, (0, os.path.getmtime(source) + 10))
+        after = cache.response('page', request)
+    assert (before.get_data(), after.get_data()) == (b'one', b'two')
+    assert before.headers['ETag'] != after.headers['ETag']
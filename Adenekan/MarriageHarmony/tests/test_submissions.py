@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture
+def contacts(conn):
+    """Five contact submissions, two of them sharing a timestamp; newest first."""
+    conn.execute('DELETE FROM contact_submissions')
+    rows = [('Ada', 'couples', '2026-01-01 09:00:00'), ('Ben', 'individual', '2026-01-02 09:00:00'),
+            ('Cy', 'couples', '2026-01-02 09:00:00'), ('Di', 'couples', '2026-01-03 09:00:00'),
+            ('Ed', 'individual', '2026-01-04 09:00:00')]
+    conn.executemany('INSERT INTO contact_submissions (name, email, service, message, submitted_at) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     [(name, f'{name.lower()}@example.com', service, 'Hello', at) for name, service, at in rows])
+    conn.commit()
+    return ['Ed', 'Di', 'Cy', 'Ben', 'Ada']
+
+
+def pages(client, query):
+    names, cursor = [], None
+    while True:
+        url = f'/api/admin/submissions/contact?{query}' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        names.append([row['name'] for row in data['submissions']])
+        cursor = data['next_cursor']
+        if cursor is None:
+            return names
+
+
+def test_cursors_walk_every_row_once_newest_first(client, contacts):
+    assert pages(client, 'limit=2') == [['Ed', 'Di'], ['Cy', 'Ben'], ['Ada']]
+
+
+def test_filters_apply_to_every_page(client, contacts):
+    assert pages(client, 'limit=1&service=couples') == [['Di'], ['Cy'], ['Ada']]
+    assert pages(client, 'since=2026-01-02&until=2026-01-03') == [['Di', 'Cy', 'Ben']]
+
+
+def test_overview_returns_the_first_page_of_each_table(client, contacts):
+    data = client.get('/api/admin/submissions?limit=3').get_json()
+    assert [row['name'] for row in data['contact_submissions']] == ['Ed', 'Di', 'Cy']
+    assert data['contact_next_cursor'] is not None
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/admin/submissions/contact?cursor=not-a-cursor', 400),
+    ('/api/admin/submissions/contact?limit=many', 400),
+    ('/api/admin/submissions/payments', 404),
+    ('/api/admin/submissions/contact/export.xml', 404),
+])
+def test_bad_requests_are_rejected(client, contacts, url, status):
+    assert client.get(url).status_code == status
+
+
+def test_exports_stream_every_matching_row(client, contacts):
+    response = client.get('/api/admin/submissions/contact/export.ndjson?service=individual')
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line)['name'] for line in response.data.decode().splitlines()] == ['Ed', 'Ben']
+
+    response = client.get('/api/admin/submissions/contact/export.csv')
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row['name'] for row in rows] == contacts
+    assert 'attachment; filename=contact_submissions.csv' == response.headers['Content-Disposition']
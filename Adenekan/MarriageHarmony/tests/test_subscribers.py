@@ -0,0 +1,79 @@
+import pytest
+
+from database import connect
+from subscribers import BloomFilter, SubscriberFilter, bulk_subscribe
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = connect(str(tmp_path / 'subscribers.db'))
+    conn.execute('''
+        CREATE TABLE newsletter_subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+    conn.execute("INSERT INTO newsletter_subscriptions (email) VALUES ('old@example.com')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def lookups(conn):
+    """Statements that confirm filter hits against the table."""
+    statements = []
+    conn.set_trace_callback(lambda sql: statements.append(sql) if 'IN (' in sql else None)
+    return statements
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f'user{i}@example.com')
+    assert all(f'user{i}@example.com' in bloom for i in range(1000))
+    false_positives = sum(f'other{i}@example.com' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_bulk_subscribe_dedups_and_classifies(db):
+    subscriber_filter = SubscriberFilter()
+    emails = ['new@example.com', ' new@example.com', 'old@example.com', 'not-an-email', None, 'two@example.com']
+    subscribed, already, invalid = bulk_subscribe(db, subscriber_filter, emails)
+    assert subscribed == ['new@example.com', 'two@example.com']
+    assert already == ['old@example.com']
+    assert invalid == ['not-an-email', '']
+    assert db.execute('SELECT COUNT(*) FROM newsletter_subscriptions').fetchone()[0] == 3
+
+    # The filter now knows every address, so a repeat writes nothing
+    assert bulk_subscribe(db, subscriber_filter, emails)[:2] == ([], ['new@example.com', 'old@example.com',
+                                                                      'two@example.com'])
+
+
+def test_new_addresses_skip_the_confirming_lookup(db):
+    subscriber_filter = SubscriberFilter()
+    statements = lookups(db)
+    subscribed, _, _ = bulk_subscribe(db, subscriber_filter, [f'fresh{i}@example.com' for i in range(50)])
+    assert len(subscribed) == 50
+    assert statements == []
+
+
+def test_rows_added_by_another_worker_are_reported_as_existing(db, tmp_path):
+    subscriber_filter = SubscriberFilter()
+    subscriber_filter.might_contain(db, 'warm@example.com')
+    # Another process subscribes an address this worker's filter has not seen
+    other = connect(str(tmp_path / 'subscribers.db'))
+    other.execute("INSERT INTO newsletter_subscriptions (email) VALUES ('raced@example.com')")
+    other.commit()
+    other.close()
+
+    subscribed, already, _ = bulk_subscribe(db, subscriber_filter, ['raced@example.com', 'mine@example.com'])
+    assert (subscribed, already) == (['mine@example.com'], ['raced@example.com'])
+
+
+def test_bulk_endpoint_validates_the_batch(client):
+    assert client.post('/api/newsletter/bulk', json={'emails': []}).status_code == 400
+    assert client.post('/api/newsletter/bulk', json={'emails': 'a@example.com'}).status_code == 400
+    response = client.post('/api/newsletter/bulk', json={'emails': ['bulk@example.com', 'bulk@example.com', 'x']})
+    assert response.get_json() == {'success': True, 'subscribed': 1, 'already_subscribed': 0, 'invalid': ['x']}
@@ -11,8 +11,10 @@ class Base(DeclarativeBase):
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 
-# Create the app
-app = Flask(__name__)
+# Create the app; some copies of the site keep their templates under static/
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_FOLDER = 'templates' if os.path.isdir(os.path.join(BASE_DIR, 'templates')) else 'static/templates'
+app = Flask(__name__, template_folder=TEMPLATE_FOLDER)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
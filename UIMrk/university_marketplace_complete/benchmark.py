@@ -0,0 +1,321 @@
+"""
+Latency, throughput and query benchmark for the marketplace pages.
+
+Seeds a throwaway SQLite database with a configurable catalogue, then
+measures every main page twice:
+
+* through the Flask test client, one request at a time, recording latency
+  and the SQL statements each request runs;
+* over HTTP against a threaded local server, with several concurrent
+  clients, recording latency and throughput under load.
+
+Results can be saved as a baseline and compared on later runs. A page
+regresses if it runs more statements than before or its median latency
+grows by more than ``--tolerance``; the script then exits non-zero.
+
+    python benchmark.py --products 10000 --save-baseline bench.json
+    python benchmark.py --products 10000 --baseline bench.json
+"""
+
+import argparse
+import http.cookiejar
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == '__main__':
+    # Must be set before the app module creates its engine
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+
+from werkzeug.serving import make_server
+from main import app
+from app import db
+from models import Seller, Product, PurchaseRequest
+from inbox import init_inbox
+from query_budget import StatementCounter
+
+DEPARTMENTS = ('Computer Science', 'Engineering', 'Medicine', 'Law', 'Economics', 'Biology')
+CATEGORIES = ('Books', 'Electronics', 'Clothing', 'Furniture', 'Stationery', 'Sports')
+WORDS = ('calculus', 'textbook', 'laptop', 'charger', 'desk', 'lamp', 'jacket', 'chemistry',
+         'notes', 'calculator', 'headphones', 'backpack', 'chair', 'novel', 'kettle', 'bicycle')
+
+# Inserts per executemany while seeding
+SEED_BATCH = 2000
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), SEED_BATCH):
+        db.session.bulk_insert_mappings(model, rows[start:start + SEED_BATCH])
+    db.session.commit()
+
+
+def seed(sellers, products, requests, rng):
+    """Fill the database with random sellers, products and purchase requests."""
+    _insert(Seller, [{
+        'name': f'Seller {i}',
+        'department': rng.choice(DEPARTMENTS),
+        'email': f'seller{i}@example.edu',
+        'phone': '08000000000',
+        'bio': 'Student seller.',
+        'rating': round(rng.uniform(0, 5), 1),
+    } for i in range(sellers)])
+    seller_ids = [row.id for row in db.session.query(Seller.id)]
+
+    _insert(Product, [{
+        'seller_id': rng.choice(seller_ids),
+        'name': ' '.join(rng.sample(WORDS, 2)).title(),
+        'description': ' '.join(rng.choices(WORDS, k=12)),
+        'price': rng.randint(500, 200000),
+        'category': rng.choice(CATEGORIES),
+        'condition': rng.choice(('New', 'Like New', 'Good', 'Fair')),
+    } for _ in range(products)])
+    products_by_id = dict(db.session.query(Product.id, Product.seller_id))
+    product_ids = list(products_by_id)
+
+    statuses = ('pending', 'pending', 'accepted', 'declined', 'completed', 'cancelled')
+    request_rows = []
+    for _ in range(requests):
+        product_id = rng.choice(product_ids)
+        request_rows.append({
+            'seller_id': products_by_id[product_id],
+            'product_id': product_id,
+            'buyer_name': 'Buyer',
+            'buyer_email': 'buyer@example.edu',
+            'message': 'Is this still available?',
+            'status': rng.choice(statuses),
+        })
+    _insert(PurchaseRequest, request_rows)
+    # Seeded rows bypass the per-seller counters; rebuild them
+    init_inbox()
+    return products_by_id
+
+
+def scenarios(products_by_id, rng):
+    """``name -> function(rng) returning (method, path, form data)``."""
+    product_ids = list(products_by_id)
+
+    def product_path(prefix):
+        def build(rng):
+            product_id = rng.choice(product_ids)
+            return 'GET', f'{prefix}/{products_by_id[product_id]}?product_id={product_id}', None
+        return build
+
+    def seller_profile(rng):
+        return 'GET', f'/seller/{products_by_id[rng.choice(product_ids)]}', None
+
+    def submit_contact(rng):
+        product_id = rng.choice(product_ids)
+        return 'POST', '/submit_contact', {
+            'seller_id': products_by_id[product_id],
+            'product_id': product_id,
+            'buyer_name': 'Load Test',
+            'buyer_email': 'load@example.edu',
+            'message': 'Benchmark inquiry',
+        }
+
+    return {
+        'index': lambda rng: ('GET', '/', None),
+        'search': lambda rng: ('GET', f'/?search={rng.choice(WORDS)}', None),
+        'category': lambda rng: ('GET', f'/?category={rng.choice(CATEGORIES)}', None),
+        'seller_profile': seller_profile,
+        'contact_seller': product_path('/contact_seller'),
+        'submit_contact': submit_contact,
+        'admin': lambda rng: ('GET', '/admin', None),
+    }
+
+
+def _summary(latencies, elapsed, statements=None, errors=0):
+    result = {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+    if statements is not None:
+        result['statements'] = round(statistics.mean(statements), 1)
+    return result
+
+
+def bench_client(pages, iterations, rng):
+    """Sequential requests through the test client, with SQL statement counts."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    results = {}
+    for name, build in pages.items():
+        for _ in range(3):
+            _client_request(client, *build(rng))
+        latencies, statements = [], []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            method, path, data = build(rng)
+            with StatementCounter(db.engine) as counter:
+                begin = time.perf_counter()
+                _client_request(client, method, path, data)
+                latencies.append(time.perf_counter() - begin)
+            statements.append(counter.count)
+        results[name] = _summary(latencies, time.perf_counter() - started, statements)
+    return results
+
+
+def _client_request(client, method, path, data):
+    response = client.open(path, method=method, data=data)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {path} returned {response.status_code}')
+
+
+def _admin_cookie(base_url):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    form = urllib.parse.urlencode({'username': 'admin', 'password': 'admin123'}).encode()
+    opener.open(base_url + '/admin/login', form).read()
+    return '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar)
+
+
+def bench_http(pages, requests_per_page, concurrency, rng):
+    """Concurrent requests over HTTP against a threaded local server."""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    cookie = _admin_cookie(base_url)
+    no_redirect = urllib.request.build_opener(_NoRedirect)
+
+    def fetch(request):
+        method, path, data = request
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(base_url + path, data=body, method=method, headers={'Cookie': cookie})
+        begin = time.perf_counter()
+        try:
+            with no_redirect.open(req) as response:
+                response.read()
+        except urllib.error.URLError:
+            return None
+        return time.perf_counter() - begin
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, build in pages.items():
+                batch = [build(rng) for _ in range(requests_per_page)]
+                started = time.perf_counter()
+                timings = list(pool.map(fetch, batch))
+                latencies = [timing for timing in timings if timing is not None]
+                if not latencies:
+                    raise RuntimeError(f'Every HTTP request for {name} failed')
+                results[name] = _summary(latencies, time.perf_counter() - started,
+                                         errors=len(timings) - len(latencies))
+    finally:
+        server.shutdown()
+    return results
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Time the POST itself, not the page it redirects to."""
+
+    def http_error_302(self, req, fp, code, msg, headers):
+        return fp
+
+    http_error_301 = http_error_303 = http_error_307 = http_error_302
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every regression against ``baseline``."""
+    regressions = []
+    for mode in ('client', 'http'):
+        for name, current in results.get(mode, {}).items():
+            previous = baseline.get(mode, {}).get(name)
+            if not previous:
+                continue
+            if 'statements' in previous and current['statements'] > previous['statements']:
+                regressions.append(f"{mode}/{name}: {previous['statements']} -> {current['statements']} statements")
+            if current['errors'] > previous.get('errors', 0):
+                regressions.append(f"{mode}/{name}: {previous.get('errors', 0)} -> {current['errors']} errors")
+            if current['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p50 {previous['p50_ms']} -> {current['p50_ms']} ms")
+    return regressions
+
+
+def print_table(title, results):
+    print(f'\n{title}')
+    print(f'{"page":<16}{"requests":>10}{"errors":>8}{"p50 ms":>10}{"p99 ms":>10}{"req/s":>10}{"SQL/req":>10}')
+    for name, row in results.items():
+        print(f'{name:<16}{row["requests"]:>10}{row["errors"]:>8}{row["p50_ms"]:>10}{row["p99_ms"]:>10}'
+              f'{row["rps"]:>10}{row.get("statements", "-"):>10}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sellers', type=int, default=500)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=5000, help='purchase requests to seed')
+    parser.add_argument('--iterations', type=int, default=50, help='test-client requests per page')
+    parser.add_argument('--http-requests', type=int, default=200, help='HTTP requests per page (0 to skip)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--save-baseline', help='write the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed p50 slowdown (0.5 = 50%%)')
+    args = parser.parse_args(argv)
+
+    # Per-statement DEBUG logging and per-request access logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    # The first request runs init_database() and creates the tables
+    client.get('/')
+
+    with app.app_context():
+        started = time.perf_counter()
+        products_by_id = seed(args.sellers, args.products, args.requests, rng)
+        print(f'Seeded {args.sellers} sellers, {args.products} products and '
+              f'{args.requests} requests in {time.perf_counter() - started:.1f}s')
+        pages = scenarios(products_by_id, rng)
+        results = {'config': {key: getattr(args, key) for key in ('sellers', 'products', 'requests')}}
+        results['client'] = bench_client(pages, args.iterations, rng)
+        print_table(f'Test client, sequential ({args.iterations} requests per page)', results['client'])
+        if args.http_requests:
+            results['http'] = bench_http(pages, args.http_requests, args.concurrency, rng)
+            print_table(f'HTTP, {args.concurrency} concurrent clients', results['http'])
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nSaved baseline to {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print(f"\nWarning: baseline was recorded with {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\nRegressions:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('\nNo regressions against the baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
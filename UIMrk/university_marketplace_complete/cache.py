@@ -0,0 +1,181 @@
+"""
+Application cache for data read on every marketplace page.
+
+The university branding row and the category facet list change only when an
+admin edits them, yet every template render needs them. They are cached as
+plain dicts and lists and refreshed by write-through from the routes that
+change them. Entries always live in process memory. If ``CACHE_URL`` points
+at Redis, entries are also shared there, so a write in one gunicorn worker
+reaches the others within ``LOCAL_TTL`` seconds. Any backend error falls back
+to the database; the cache never takes a page down.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import func
+from app import db
+from models import Seller, Product, University
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# How long each entry may be served before it is reloaded from the database
+UNIVERSITY_TTL = 300
+FACETS_TTL = 60
+
+# With a shared backend, how long a worker trusts its own copy
+LOCAL_TTL = 5
+
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe in-process store with per-entry expiry."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return MISSING
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisCache:
+    """Shared store for multi-worker deployments; values are JSON encoded."""
+
+    def __init__(self, url, prefix='marketplace:'):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class TieredCache:
+    """Process-local entries in front of an optional shared backend."""
+
+    def __init__(self, shared=None):
+        self.local = LocalCache()
+        self.shared = shared
+
+    def _local_ttl(self, ttl):
+        return min(ttl, LOCAL_TTL) if self.shared else ttl
+
+    def get_or_load(self, key, loader, ttl):
+        """Cached value for ``key``, calling ``loader`` on a miss."""
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        if self.shared:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed: {str(e)}")
+            if value is not MISSING:
+                self.local.set(key, value, self._local_ttl(ttl))
+                return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def set(self, key, value, ttl):
+        """Store ``value`` in every layer."""
+        self.local.set(key, value, self._local_ttl(ttl))
+        if self.shared:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {str(e)}")
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"Shared cache delete failed: {str(e)}")
+
+
+def _shared_backend():
+    url = os.environ.get('CACHE_URL')
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("CACHE_URL is set but the redis package is not installed; using in-process cache only")
+        return None
+    return RedisCache(url)
+
+
+cache = TieredCache(_shared_backend())
+
+
+def _load_university():
+    university = University.query.first()
+    if university is None:
+        return None
+    return {
+        'id': university.id,
+        'name': university.name,
+        'logo_url': university.logo_url,
+        'primary_color': university.primary_color,
+        'secondary_color': university.secondary_color,
+        'accent_color': university.accent_color,
+    }
+
+
+def _load_facets():
+    rows = (
+        db.session.query(Product.category, func.count(Product.id))
+        .join(Product.seller)
+        .filter(Seller.is_active == True, Product.is_available == True)
+        .group_by(Product.category)
+        .order_by(Product.category)
+    )
+    return [[category, count] for category, count in rows]
+
+
+def university_branding():
+    """The university settings as a dict (templates read it like the model)."""
+    return cache.get_or_load('university', _load_university, UNIVERSITY_TTL)
+
+
+def category_facets():
+    """``[category, product count]`` pairs for listed products, by name."""
+    return cache.get_or_load('category_facets', _load_facets, FACETS_TTL)
+
+
+def refresh_university():
+    """Write the current university row through to the cache."""
+    cache.set('university', _load_university(), UNIVERSITY_TTL)
+
+
+def refresh_facets():
+    """Write the current category facets through to the cache."""
+    cache.set('category_facets', _load_facets(), FACETS_TTL)
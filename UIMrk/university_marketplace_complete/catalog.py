@@ -0,0 +1,183 @@
+"""
+Product listing queries for the marketplace pages.
+
+Product cards show a handful of product columns plus the seller's name,
+avatar, department and rating. The queries here load only those columns
+and attach each product's seller in the same statement (or one extra
+batched statement), so rendering a page never lazy-loads a seller per card.
+
+Listings are paginated by keyset: the cursor carries the sort value and id
+of the last row shown, and the next page starts strictly after it. The
+newest and price sorts are backed by composite indexes (see ``models.py``),
+so a page costs the same however deep into the catalogue it is. ``top_rated``
+orders by the seller's rating, a column of another table, so each of its
+pages sorts the matching products.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, case, func, tuple_
+from sqlalchemy.orm import contains_eager, joinedload, load_only, with_expression
+from app import db
+from models import Seller, Product, SellerRequestStats
+from search import rank_order
+
+# Rows per page
+LISTING_PAGE_SIZE = 24
+PROFILE_PAGE_SIZE = 12
+ADMIN_PAGE_SIZE = 50
+
+# Public sort options: (column, descending, value of a loaded product)
+SORT_OPTIONS = {
+    'newest': (Product.created_at, True, lambda product: product.created_at),
+    'price_low': (Product.price, False, lambda product: product.price),
+    'price_high': (Product.price, True, lambda product: product.price),
+    'top_rated': (Seller.rating, True, lambda product: product.seller.rating),
+}
+DEFAULT_SORT = 'newest'
+
+# Columns read by the product cards in index.html and admin.html
+PRODUCT_CARD_COLUMNS = (
+    Product.id, Product.seller_id, Product.name, Product.description, Product.price,
+    Product.category, Product.condition, Product.image_url, Product.is_available,
+    Product.created_at, Product.updated_at,
+)
+SELLER_CARD_COLUMNS = (
+    Seller.id, Seller.name, Seller.department, Seller.profile_image_url, Seller.rating,
+    Seller.created_at, Seller.updated_at,
+)
+
+
+def product_cards():
+    """Available products of active sellers, each with its seller already loaded."""
+    return (
+        db.session.query(Product)
+        .join(Product.seller)
+        .filter(Seller.is_active == True, Product.is_available == True)
+        .options(
+            load_only(*PRODUCT_CARD_COLUMNS),
+            contains_eager(Product.seller).load_only(*SELLER_CARD_COLUMNS),
+        )
+    )
+
+
+def admin_products():
+    """Products with their sellers, for the admin dashboard."""
+    return (
+        db.session.query(Product)
+        .join(Product.seller)
+        .options(
+            load_only(*PRODUCT_CARD_COLUMNS),
+            contains_eager(Product.seller).load_only(*SELLER_CARD_COLUMNS),
+        )
+    )
+
+
+def admin_sellers():
+    """Sellers with their product count (read from the seller_id index) and request counters."""
+    product_count = (
+        db.session.query(func.count(Product.id))
+        .filter(Product.seller_id == Seller.id)
+        .correlate(Seller)
+        .scalar_subquery()
+    )
+    return Seller.query.options(
+        with_expression(Seller.product_count, product_count),
+        joinedload(Seller.request_stats),
+    )
+
+
+def encode_cursor(value, row_id):
+    """Opaque cursor for the row after which the next page starts."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, column):
+    """``(value, id)`` from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, column, descending, id_column, cursor=None, limit=LISTING_PAGE_SIZE, value=None):
+    """One page of ``query`` ordered by ``column`` then id, and the next page's cursor.
+
+    ``value`` reads the sort value from a row when ``column`` is not one of
+    the row's own attributes.
+    """
+    after = decode_cursor(cursor, column)
+    if after is not None:
+        key = tuple_(column, id_column)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        sort_value = value(last) if value else getattr(last, column.key)
+        next_cursor = encode_cursor(sort_value, last.id)
+    return rows, next_cursor
+
+
+def product_page(query, sort=DEFAULT_SORT, cursor=None, limit=LISTING_PAGE_SIZE):
+    """A page of products in one of the public ``SORT_OPTIONS``."""
+    column, descending, value = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])
+    return keyset_page(query, column, descending, Product.id, cursor, limit, value)
+
+
+def seller_products(seller_id):
+    """Available products of one seller."""
+    return Product.query.filter_by(seller_id=seller_id, is_available=True)
+
+
+def ranked_page(query, ids, cursor=None, limit=LISTING_PAGE_SIZE):
+    """A page of products kept in the order of ``ids`` (search relevance)."""
+    try:
+        start = max(0, int(cursor or 0))
+    except ValueError:
+        start = 0
+    page_ids = ids[start:start + limit]
+    if not page_ids:
+        return [], None
+    rows = query.filter(Product.id.in_(page_ids)).order_by(rank_order(page_ids)).all()
+    next_cursor = str(start + limit) if start + limit < len(ids) else None
+    return rows, next_cursor
+
+
+def admin_stats():
+    """Totals for the admin dashboard cards."""
+    sellers, active_sellers = db.session.query(
+        func.count(Seller.id), func.count(case((Seller.is_active == True, 1)))
+    ).one()
+    # Request totals come from the per-seller counters, not the requests table
+    purchase_requests, pending_requests = db.session.query(
+        func.coalesce(func.sum(
+            SellerRequestStats.pending_count + SellerRequestStats.accepted_count
+            + SellerRequestStats.declined_count + SellerRequestStats.completed_count
+            + SellerRequestStats.cancelled_count
+        ), 0),
+        func.coalesce(func.sum(SellerRequestStats.pending_count), 0),
+    ).one()
+    return {
+        'sellers': sellers,
+        'active_sellers': active_sellers,
+        'products': db.session.query(func.count(Product.id)).scalar(),
+        'purchase_requests': purchase_requests,
+        'pending_requests': pending_requests,
+    }
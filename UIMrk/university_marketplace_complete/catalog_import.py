@@ -0,0 +1,272 @@
+"""
+Bulk import of sellers and products from CSV, JSON or JSON Lines.
+
+Rows are read from the file as a stream and handled in chunks. Each chunk is
+validated in Python, its seller emails are resolved with one ``IN`` query,
+and its valid rows are written with ``bulk_insert_mappings`` (one
+executemany per table) and committed together. A bad row is reported with
+its line number and skipped; it never aborts the rest of the file. Search
+index triggers fire for the inserted rows as usual, and the category facets
+are refreshed once at the end.
+
+A row is a seller when it has no ``seller_email`` (or ``type`` is
+``seller``) and a product otherwise. Products name their seller by
+``seller_email``; the seller may already exist or appear earlier in the
+file. The same import runs from ``/admin/import`` and from the command line:
+
+    flask --app main import-catalog inventory.csv
+"""
+
+import csv
+import io
+import json
+import logging
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from app import app, db
+from models import Seller, Product, init_database
+from search import init_search
+from cache import refresh_facets
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written per transaction
+CHUNK_SIZE = 500
+
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 200
+
+FORMATS = ('csv', 'json', 'jsonl', 'ndjson')
+
+SELLER_FIELDS = ('name', 'department', 'email', 'phone')
+PRODUCT_FIELDS = ('seller_email', 'name', 'description', 'price', 'category')
+
+
+class ImportReport:
+    """Counts and per-row errors of one import."""
+
+    def __init__(self):
+        self.rows = 0
+        self.sellers_created = 0
+        self.products_created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'sellers_created': self.sellers_created,
+            'products_created': self.products_created,
+            'error_count': self.error_count,
+            'errors': [{'line': line, 'message': message} for line, message in self.errors]
+        }
+
+
+def file_format(filename):
+    """The import format of ``filename`` from its extension, or None."""
+    if not filename or '.' not in filename:
+        return None
+    ext = filename.rsplit('.', 1)[1].lower()
+    return ext if ext in FORMATS else None
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, row dict)`` from a text stream; a bad JSON Lines row yields its error."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt in ('jsonl', 'ndjson'):
+        for line, text in enumerate(stream, 1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as e:
+                    yield line, e
+    else:
+        # A plain JSON document has to be parsed whole; uploads are capped by MAX_CONTENT_LENGTH
+        data = json.load(stream)
+        if isinstance(data, dict):
+            sellers, products = data.get('sellers', []), data.get('products', [])
+            if not isinstance(sellers, list) or not isinstance(products, list):
+                raise ValueError('"sellers" and "products" must be lists')
+            # Entries that are not objects are passed on and reported per row
+            data = ([dict(row, type='seller') if isinstance(row, dict) else row for row in sellers]
+                    + [dict(row, type='product') if isinstance(row, dict) else row for row in products])
+        elif not isinstance(data, list):
+            raise ValueError('expected a list of rows or an object with "sellers" and "products"')
+        for line, row in enumerate(data, 1):
+            yield line, row
+
+
+def _clean(row):
+    if not isinstance(row, dict):
+        return None
+    return {str(key).strip().lower(): str(value).strip() if value is not None else ''
+            for key, value in row.items() if key is not None}
+
+
+def _row_type(row):
+    kind = row.get('type', '').lower()
+    if kind in ('seller', 'product'):
+        return kind
+    return 'product' if row.get('seller_email') else 'seller'
+
+
+def _missing(row, fields):
+    return [field for field in fields if not row.get(field)]
+
+
+def _import_chunk(chunk, report, seller_ids):
+    """Validate and insert one chunk; ``seller_ids`` maps email to (id, is_active)."""
+    sellers, products = [], []
+    for line, raw in chunk:
+        if isinstance(raw, ValueError):
+            report.error(line, f"Invalid JSON: {str(raw)}")
+            continue
+        row = _clean(raw)
+        if row is None:
+            report.error(line, 'Row is not an object.')
+            continue
+        kind = _row_type(row)
+        missing = _missing(row, SELLER_FIELDS if kind == 'seller' else PRODUCT_FIELDS)
+        if missing:
+            report.error(line, f"Missing {', '.join(missing)}.")
+        elif kind == 'seller':
+            sellers.append((line, row))
+        else:
+            try:
+                row['price'] = float(row['price'])
+            except ValueError:
+                report.error(line, f"Invalid price: {row['price']}.")
+                continue
+            if row['price'] < 0:
+                report.error(line, 'Price cannot be negative.')
+                continue
+            products.append((line, row))
+
+    # One lookup for every email this chunk mentions that is not known yet
+    emails = {row['email'] for _, row in sellers} | {row['seller_email'] for _, row in products}
+    unknown = emails - seller_ids.keys()
+    if unknown:
+        for seller_id, email, is_active in (
+            db.session.query(Seller.id, Seller.email, Seller.is_active).filter(Seller.email.in_(unknown))
+        ):
+            seller_ids[email] = (seller_id, is_active)
+
+    new_sellers = {}
+    for line, row in sellers:
+        if row['email'] in seller_ids or row['email'] in new_sellers:
+            report.error(line, f"A seller with email {row['email']} already exists.")
+            continue
+        new_sellers[row['email']] = (line, {
+            'name': row['name'],
+            'department': row['department'],
+            'email': row['email'],
+            'phone': row['phone'],
+            'bio': row.get('bio', ''),
+            'profile_image_url': row.get('profile_image_url', ''),
+        })
+
+    new_products = []
+    for line, row in products:
+        email = row['seller_email']
+        if email not in seller_ids and email not in new_sellers:
+            report.error(line, f"No seller with email {email}.")
+        elif email in seller_ids and not seller_ids[email][1]:
+            report.error(line, f"Seller {email} is inactive.")
+        else:
+            new_products.append((line, email, {
+                'name': row['name'],
+                'description': row['description'],
+                'price': row['price'],
+                'category': row['category'],
+                'condition': row.get('condition') or 'Good',
+                'image_url': row.get('image_url', ''),
+            }))
+
+    try:
+        if new_sellers:
+            db.session.bulk_insert_mappings(Seller, [seller for _, seller in new_sellers.values()])
+            # Ids of the sellers just inserted, for their products in this chunk
+            for seller_id, email in (
+                db.session.query(Seller.id, Seller.email).filter(Seller.email.in_(list(new_sellers)))
+            ):
+                seller_ids[email] = (seller_id, True)
+        if new_products:
+            for _, email, product in new_products:
+                product['seller_id'] = seller_ids[email][0]
+            db.session.bulk_insert_mappings(Product, [product for _, _, product in new_products])
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        for email in new_sellers:
+            seller_ids.pop(email, None)
+        logger.error(f"Catalogue import chunk failed: {str(e)}")
+        for line in sorted([line for line, _ in new_sellers.values()] + [line for line, _, _ in new_products]):
+            report.error(line, 'Not imported: the database rejected this batch.')
+        return
+    report.sellers_created += len(new_sellers)
+    report.products_created += len(new_products)
+
+
+def import_catalog(stream, fmt, chunk_size=CHUNK_SIZE):
+    """Import every row of a text stream in ``fmt``; returns an ``ImportReport``."""
+    report = ImportReport()
+    seller_ids = {}
+    chunk = []
+    rows = read_rows(stream, fmt)
+    while True:
+        try:
+            item = next(rows, None)
+        except (csv.Error, ValueError) as e:
+            # The file cannot be read past this point
+            report.error(report.rows + 1, f"Unreadable {fmt.upper()}: {str(e)}")
+            item = None
+        if item is not None:
+            report.rows += 1
+            chunk.append(item)
+        if chunk and (item is None or len(chunk) >= chunk_size):
+            _import_chunk(chunk, report, seller_ids)
+            chunk = []
+        if item is None:
+            break
+    report.errors.sort()
+    if report.products_created or report.sellers_created:
+        refresh_facets()
+    return report
+
+
+def import_upload(file):
+    """Import an uploaded file; returns an ``ImportReport``, or None for an unknown format."""
+    fmt = file_format(file.filename)
+    if fmt is None:
+        return None
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+    return import_catalog(stream, fmt)
+
+
+@app.cli.command('import-catalog')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True)
+def import_catalog_command(path, fmt, chunk_size):
+    """Import sellers and products from a CSV, JSON or JSON Lines file."""
+    fmt = fmt or file_format(path)
+    if fmt is None:
+        raise click.UsageError('Unknown file type; pass --format.')
+    init_database()
+    init_search()
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_catalog(stream, fmt, chunk_size)
+    click.echo(f"{report.rows} rows: {report.sellers_created} sellers and "
+               f"{report.products_created} products created, {report.error_count} errors")
+    for line, message in report.errors:
+        click.echo(f"  line {line}: {message}", err=True)
+    if report.error_count > len(report.errors):
+        click.echo(f"  ... {report.error_count - len(report.errors)} more", err=True)
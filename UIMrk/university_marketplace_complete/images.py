@@ -0,0 +1,164 @@
+"""
+Upload pipeline for seller and product photos.
+
+Uploads are streamed to disk and named by the SHA-256 of their content, so
+the same photo uploaded twice is stored once and every URL can be cached
+forever. A small worker pool then renders WebP and JPEG thumbnails at the
+sizes the templates display, so a 40px avatar no longer ships a full-size
+camera photo. The ``thumbnail`` template filter picks the right file for a
+size, falling back to the original until the thumbnails exist.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import has_request_context, request
+from app import app
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# Display sizes used by the templates: avatars, profile photos, product cards
+SIZES = {
+    'avatar': (40, 40),
+    'profile': (150, 150),
+    'card': (300, 200),
+}
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+THUMBNAIL_QUALITY = 82
+
+# Pillow's decompression-bomb limit for uploads
+MAX_PIXELS = 40_000_000
+
+CHUNK_SIZE = 64 * 1024
+
+UPLOAD_URL = '/static/uploads/'
+STORED_NAME = re.compile(r'^([0-9a-f]{64})(?:-\d+x\d+)?\.\w+$')
+
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('IMAGE_WORKERS', 2)),
+                              thread_name_prefix='thumbnails')
+
+if Image is not None:
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+
+def upload_folder():
+    return app.config['UPLOAD_FOLDER']
+
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def thumbnail_name(digest, size, fmt):
+    width, height = SIZES[size]
+    return f"{digest}-{width}x{height}.{fmt}"
+
+
+def store_upload(file):
+    """Save an uploaded image under its content hash and queue its thumbnails.
+
+    Returns the public URL of the original, or None if the file is not an
+    allowed image type.
+    """
+    if not file or not allowed_file(file.filename):
+        return None
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    folder = upload_folder()
+    os.makedirs(folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        name = f"{digest.hexdigest()}.{ext}"
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    executor.submit(generate_thumbnails, path, digest.hexdigest())
+    return UPLOAD_URL + name
+
+
+def generate_thumbnails(path, digest):
+    """Write every missing size and format of one stored original."""
+    if Image is None:
+        return
+    folder = os.path.dirname(path)
+    missing = [
+        (size, fmt, os.path.join(folder, thumbnail_name(digest, size, fmt)))
+        for size in SIZES for fmt in THUMBNAIL_FORMATS
+    ]
+    missing = [target for target in missing if not os.path.exists(target[2])]
+    if not missing:
+        return
+    try:
+        with Image.open(path) as original:
+            # Let the JPEG decoder downscale while decoding, keeping enough
+            # pixels for the largest size
+            width, height = max(SIZES.values(), key=lambda d: d[0] * d[1])
+            original.draft('RGB', (width * 2, height * 2))
+            image = ImageOps.exif_transpose(original).convert('RGB')
+        thumbs = {}
+        for size, fmt, target in missing:
+            if size not in thumbs:
+                thumbs[size] = ImageOps.fit(image, SIZES[size], Image.LANCZOS)
+            # Uploads of the same photo may race here; each writes its own temp file
+            fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.thumb-')
+            with os.fdopen(fd, 'wb') as out:
+                thumbs[size].save(out, THUMBNAIL_FORMATS[fmt], quality=THUMBNAIL_QUALITY, optimize=True)
+            os.replace(temp_path, target)
+    except Exception as e:
+        logger.error(f"Thumbnail generation failed for {path}: {str(e)}")
+
+
+_ready = set()
+
+
+def thumbnail_url(url, size, fmt='jpg'):
+    """URL of the ``size`` thumbnail of a stored upload, else ``url`` unchanged.
+
+    External URLs and legacy uploads are returned as they are, as is an
+    upload whose thumbnails are still being generated.
+    """
+    if not url or not url.startswith(UPLOAD_URL) or size not in SIZES:
+        return url
+    match = STORED_NAME.match(url[len(UPLOAD_URL):])
+    if not match:
+        return url
+    name = thumbnail_name(match.group(1), size, fmt)
+    if name not in _ready:
+        if not os.path.exists(os.path.join(upload_folder(), name)):
+            return url
+        _ready.add(name)
+    return UPLOAD_URL + name
+
+
+@app.template_filter('thumbnail')
+def thumbnail_filter(url, size):
+    accept = request.headers.get('Accept', '') if has_request_context() else ''
+    return thumbnail_url(url, size, 'webp' if 'image/webp' in accept else 'jpg')
+
+
+def is_immutable(path):
+    """True for upload URLs whose name is a content hash."""
+    return path.startswith(UPLOAD_URL) and STORED_NAME.match(path[len(UPLOAD_URL):]) is not None
@@ -0,0 +1,176 @@
+"""
+Purchase-request inbox and status workflow.
+
+Requests move from ``pending`` to ``accepted`` or ``declined`` and then to
+``completed``, and can be ``cancelled`` while still open. Each seller has a
+``SellerRequestStats`` row with a count per status and the total time taken
+to accept or decline (a cancellation is not a response). The row is adjusted in the same transaction as every new request and
+every transition, so the dashboard reads per-seller load without COUNT(*)
+scans over ``purchase_requests``. Transitions are applied to many requests
+at once with a single UPDATE.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, text
+from sqlalchemy.orm import contains_eager
+from app import db
+from models import Seller, Product, PurchaseRequest, SellerRequestStats
+
+STATUSES = ('pending', 'accepted', 'declined', 'completed', 'cancelled')
+
+# Statuses that are a seller's answer; only these count towards response time
+RESPONSES = ('accepted', 'declined')
+
+# Allowed moves: new status -> statuses it can be reached from
+TRANSITIONS = {
+    'accepted': ('pending',),
+    'declined': ('pending',),
+    'completed': ('accepted',),
+    'cancelled': ('pending', 'accepted'),
+}
+
+# Most requests handled by one bulk action
+MAX_BULK_IDS = 500
+
+
+def _counter(status):
+    return getattr(SellerRequestStats, f'{status}_count')
+
+
+def _stats_from_requests(seller_ids=None):
+    """``SellerRequestStats`` rows counted from the requests themselves, one per seller."""
+    totals = defaultdict(dict)
+    rows = (
+        db.session.query(PurchaseRequest.seller_id, PurchaseRequest.status, func.count(PurchaseRequest.id))
+        .group_by(PurchaseRequest.seller_id, PurchaseRequest.status)
+    )
+    answered = (
+        db.session.query(PurchaseRequest.seller_id, PurchaseRequest.created_at, PurchaseRequest.responded_at)
+        .filter(PurchaseRequest.responded_at.isnot(None))
+    )
+    if seller_ids is None:
+        seller_ids = [seller_id for seller_id, in db.session.query(Seller.id)]
+    else:
+        rows = rows.filter(PurchaseRequest.seller_id.in_(seller_ids))
+        answered = answered.filter(PurchaseRequest.seller_id.in_(seller_ids))
+    for seller_id, status, count in rows:
+        status = status if status in STATUSES else 'pending'
+        totals[seller_id][status] = totals[seller_id].get(status, 0) + count
+    responses = defaultdict(lambda: [0, 0.0])
+    for seller_id, created_at, responded_at in answered:
+        responses[seller_id][0] += 1
+        responses[seller_id][1] += (responded_at - created_at).total_seconds()
+    stats = []
+    for seller_id in seller_ids:
+        counts = totals.get(seller_id, {})
+        response_count, response_seconds = responses[seller_id]
+        stats.append(SellerRequestStats(
+            seller_id=seller_id,
+            response_count=response_count,
+            response_seconds=response_seconds,
+            **{f'{status}_count': counts.get(status, 0) for status in STATUSES}
+        ))
+    return stats
+
+
+def init_inbox():
+    """Backfill the per-seller counters once, for requests made before they existed."""
+    if db.session.query(SellerRequestStats.seller_id).first() is not None:
+        return
+    db.session.add_all(_stats_from_requests())
+    db.session.commit()
+
+
+def _adjust(seller_id, changes):
+    """Apply ``{column: delta}`` to one seller's counters.
+
+    A seller without a counters row gets one counted from their requests,
+    which already include the change being recorded.
+    """
+    updated = (
+        SellerRequestStats.query.filter_by(seller_id=seller_id)
+        .update({column: column + delta for column, delta in changes.items()},
+                synchronize_session=False)
+    )
+    if not updated:
+        db.session.flush()
+        db.session.add_all(_stats_from_requests([seller_id]))
+        db.session.flush()
+
+
+def record_new_request(purchase_request):
+    """Count a just-added request; call before committing it."""
+    _adjust(purchase_request.seller_id, {SellerRequestStats.pending_count: 1})
+
+
+def transition(request_ids, new_status, now=None):
+    """Move every eligible request in ``request_ids`` to ``new_status``.
+
+    Requests whose current status does not allow the move are left alone.
+    Returns how many were changed. The caller commits.
+    """
+    if new_status not in TRANSITIONS:
+        raise ValueError(f"Unknown status: {new_status}")
+    request_ids = list(request_ids)[:MAX_BULK_IDS]
+    if not request_ids:
+        return 0
+    now = now or datetime.utcnow()
+    allowed_from = TRANSITIONS[new_status]
+    query = PurchaseRequest.query.filter(
+        PurchaseRequest.id.in_(request_ids), PurchaseRequest.status.in_(allowed_from)
+    )
+    # Keep a concurrent action from counting the same request twice
+    if db.engine.dialect.name == 'sqlite':
+        # A no-op write takes SQLite's write lock before the rows are read
+        db.session.execute(text('UPDATE purchase_requests SET id = id WHERE 0'))
+    else:
+        query = query.with_for_update()
+    rows = query.with_entities(
+        PurchaseRequest.id, PurchaseRequest.seller_id, PurchaseRequest.status,
+        PurchaseRequest.created_at, PurchaseRequest.responded_at
+    ).all()
+    if not rows:
+        return 0
+
+    changes = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        seller_changes = changes[row.seller_id]
+        seller_changes[_counter(row.status)] -= 1
+        seller_changes[_counter(new_status)] += 1
+        if new_status in RESPONSES and row.responded_at is None:
+            seller_changes[SellerRequestStats.response_count] += 1
+            seller_changes[SellerRequestStats.response_seconds] += (now - row.created_at).total_seconds()
+
+    values = {PurchaseRequest.status: new_status}
+    if new_status in RESPONSES:
+        values[PurchaseRequest.responded_at] = func.coalesce(PurchaseRequest.responded_at, now)
+    changed = (
+        PurchaseRequest.query
+        .filter(PurchaseRequest.id.in_([row.id for row in rows]),
+                PurchaseRequest.status.in_(allowed_from))
+        .update(values, synchronize_session=False)
+    )
+    for seller_id, seller_changes in changes.items():
+        _adjust(seller_id, seller_changes)
+    return changed
+
+
+def inbox_query(seller_id=None, product_id=None, status=None):
+    """Requests matching the inbox filters, with product and seller names loaded."""
+    query = (
+        db.session.query(PurchaseRequest)
+        .join(PurchaseRequest.seller)
+        .outerjoin(PurchaseRequest.product)
+        .options(
+            contains_eager(PurchaseRequest.seller).load_only(Seller.id, Seller.name),
+            contains_eager(PurchaseRequest.product).load_only(Product.id, Product.name, Product.price),
+        )
+    )
+    if seller_id:
+        query = query.filter(PurchaseRequest.seller_id == seller_id)
+    if product_id:
+        query = query.filter(PurchaseRequest.product_id == product_id)
+    if status:
+        query = query.filter(PurchaseRequest.status == status)
+    return query
@@ -0,0 +1,31 @@
+"""
+SQL statement counting for the marketplace pages.
+
+``StatementCounter`` records every statement sent to the database while a
+block runs. ``tests/test_query_budget.py`` uses it to check that no page's
+statement count grows with the catalogue, and ``benchmark.py`` reports it
+per request.
+"""
+
+from sqlalchemy import event
+
+
+class StatementCounter:
+    """Counts statements sent to the database while the block runs."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
@@ -0,0 +1,88 @@
+"""
+Buyer reviews of sellers.
+
+A buyer can review a seller once per completed purchase request, through a
+signed link that the admin sends from the inbox (buyers have no accounts).
+Each seller keeps a running sum and count of review scores. A new review
+updates both, and ``Seller.rating``, with one UPDATE in the same
+transaction that inserts the review, so listings read the average as a
+plain column instead of running AVG() over the reviews table.
+"""
+
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy.exc import IntegrityError
+from app import app, db
+from models import Seller, PurchaseRequest, Review
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+PROFILE_REVIEWS = 5
+
+
+def _serializer():
+    return URLSafeSerializer(app.secret_key, salt='purchase-review')
+
+
+def review_token(purchase_request):
+    """Token for the review link of one purchase request."""
+    return _serializer().dumps([purchase_request.id, purchase_request.buyer_email])
+
+
+def load_review_token(token):
+    """The purchase request a review token was issued for, or None."""
+    try:
+        request_id, buyer_email = _serializer().loads(token)
+    except (BadSignature, ValueError, TypeError):
+        return None
+    purchase_request = db.session.get(PurchaseRequest, request_id)
+    if purchase_request is None or purchase_request.buyer_email != buyer_email:
+        return None
+    return purchase_request
+
+
+def has_review(purchase_request):
+    return db.session.query(Review.id).filter_by(purchase_request_id=purchase_request.id).first() is not None
+
+
+def add_review(purchase_request, rating, comment=None):
+    """Record a review and fold it into the seller's rating; the caller commits.
+
+    Raises ValueError if the request is not completed, was already reviewed,
+    or the rating is out of range.
+    """
+    if purchase_request.status != 'completed':
+        raise ValueError('Only completed purchases can be reviewed.')
+    if not MIN_RATING <= rating <= MAX_RATING:
+        raise ValueError(f'Rating must be between {MIN_RATING} and {MAX_RATING}.')
+    review = Review(
+        purchase_request_id=purchase_request.id,
+        seller_id=purchase_request.seller_id,
+        product_id=purchase_request.product_id,
+        reviewer_name=purchase_request.buyer_name,
+        rating=rating,
+        comment=comment or None
+    )
+    db.session.add(review)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        raise ValueError('This purchase has already been reviewed.')
+    # SET expressions read the row's old values, so the average includes this review
+    Seller.query.filter_by(id=purchase_request.seller_id).update({
+        Seller.rating_sum: Seller.rating_sum + rating,
+        Seller.rating_count: Seller.rating_count + 1,
+        Seller.rating: (Seller.rating_sum + rating) * 1.0 / (Seller.rating_count + 1),
+    }, synchronize_session=False)
+    return review
+
+
+def recent_reviews(seller_id, limit=PROFILE_REVIEWS):
+    """Newest reviews of one seller."""
+    return (
+        Review.query.filter_by(seller_id=seller_id)
+        .order_by(Review.created_at.desc(), Review.id.desc())
+        .limit(limit)
+        .all()
+    )
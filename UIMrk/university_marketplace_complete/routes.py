@@ -1,51 +1,58 @@
-import os
 from flask import render_template, request, redirect, url_for, flash, session, jsonify
-from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
 from app import app, db
 from models import Seller, Product, PurchaseRequest, Admin, University, init_database
-
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_profile_image(file):
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        import time
-        timestamp = str(int(time.time()))
-        name, ext = os.path.splitext(filename)
-        filename = f"profile_{timestamp}_{name}{ext}"
-        file_path = os.path.join('static/uploads', filename)
-        file.save(file_path)
-        return f"/static/uploads/{filename}"
-    return None
+from catalog import (product_cards, admin_products, admin_sellers, admin_stats, seller_products,
+                     keyset_page, product_page, ranked_page, SORT_OPTIONS, PROFILE_PAGE_SIZE, ADMIN_PAGE_SIZE)
+from search import supported as search_supported, search_product_ids, rank_order, suggest
+from cache import university_branding, category_facets, refresh_university, refresh_facets
+from images import store_upload, is_immutable
+from inbox import STATUSES, TRANSITIONS, record_new_request, transition, inbox_query
+from reviews import review_token, load_review_token, has_review, add_review, recent_reviews
+from catalog_import import import_upload
+from fragments import forget_seller
 
 @app.route('/')
 def index():
     search_query = request.args.get('search', '')
     category_filter = request.args.get('category', '')
-    university = University.query.first()
-    query = db.session.query(Product).join(Seller).filter(Seller.is_active == True, Product.is_available == True)
-    if search_query:
-        search_term = f"%{search_query}%"
-        query = query.filter(
-            db.or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term),
-                Product.category.ilike(search_term),
-                Seller.name.ilike(search_term),
-                Seller.department.ilike(search_term)
-            )
-        )
+    sort = request.args.get('sort', '')
+    cursor = request.args.get('cursor')
+    university = university_branding()
+    query = product_cards()
     if category_filter:
         query = query.filter(Product.category == category_filter)
-    products = query.all()
-    categories = db.session.query(Product.category).distinct().order_by(Product.category).all()
-    categories = [cat[0] for cat in categories]
-    return render_template('index.html', products=products, categories=categories, search_query=search_query, category_filter=category_filter, university=university)
+    if search_query and search_supported():
+        ids = search_product_ids(search_query, category=category_filter or None)
+        if sort not in SORT_OPTIONS:
+            sort = 'relevance'
+            products, next_cursor = ranked_page(query, ids, cursor)
+        else:
+            products, next_cursor = product_page(query.filter(Product.id.in_(ids)), sort, cursor)
+    else:
+        if search_query:
+            search_term = f"%{search_query}%"
+            query = query.filter(
+                db.or_(
+                    Product.name.ilike(search_term),
+                    Product.description.ilike(search_term),
+                    Product.category.ilike(search_term),
+                    Seller.name.ilike(search_term),
+                    Seller.department.ilike(search_term)
+                )
+            )
+        if sort not in SORT_OPTIONS:
+            sort = 'newest'
+        products, next_cursor = product_page(query, sort, cursor)
+    categories = [category for category, _ in category_facets()]
+    return render_template('index.html', products=products, categories=categories, search_query=search_query, category_filter=category_filter, sort=sort, next_cursor=next_cursor, university=university)
+
+@app.route('/api/search/suggest')
+def search_suggest():
+    search_query = request.args.get('q', '').strip()
+    if len(search_query) < 2 or not search_supported():
+        return jsonify({'query': search_query, 'suggestions': []})
+    return jsonify({'query': search_query, 'suggestions': suggest(search_query)})
 
 @app.route('/seller/<int:seller_id>')
 def seller_profile(seller_id):
@@ -54,9 +61,12 @@ def seller_profile(seller_id):
     if not seller:
         flash('Seller not found or inactive.', 'error')
         return redirect(url_for('index'))
-    products = Product.query.filter_by(seller_id=seller_id, is_available=True).all()
-    university = University.query.first()
-    return render_template('seller_profile.html', seller=seller, is_admin=is_admin, products=products, university=university)
+    products, next_cursor = keyset_page(seller_products(seller_id), Product.created_at, True, Product.id,
+                                        request.args.get('cursor'), PROFILE_PAGE_SIZE)
+    product_count = seller_products(seller_id).count()
+    reviews = recent_reviews(seller_id)
+    university = university_branding()
+    return render_template('seller_profile.html', seller=seller, is_admin=is_admin, products=products, product_count=product_count, next_cursor=next_cursor, reviews=reviews, university=university)
 
 @app.route('/contact_seller/<int:seller_id>')
 def contact_seller(seller_id):
@@ -66,7 +76,7 @@ def contact_seller(seller_id):
         return redirect(url_for('index'))
     product_id = request.args.get('product_id')
     product = Product.query.get(product_id) if product_id else None
-    university = University.query.first()   
+    university = university_branding()
     return render_template('contact_seller.html', seller=seller, product=product, university=university)
 
 @app.route('/submit_contact', methods=['POST'])
@@ -89,19 +99,84 @@ def submit_contact():
         message=message
     )
     db.session.add(purchase_request)
+    record_new_request(purchase_request)
     db.session.commit()
     flash('Your purchase inquiry has been sent!', 'success')
     return redirect(url_for('index'))
 
+@app.route('/review/<token>', methods=['GET', 'POST'])
+def review_purchase(token):
+    purchase_request = load_review_token(token)
+    if not purchase_request:
+        flash('This review link is not valid.', 'error')
+        return redirect(url_for('index'))
+    if purchase_request.status != 'completed':
+        flash('This purchase can be reviewed once it is completed.', 'info')
+        return redirect(url_for('index'))
+    if has_review(purchase_request):
+        flash('You have already reviewed this purchase. Thank you!', 'info')
+        return redirect(url_for('seller_profile', seller_id=purchase_request.seller_id))
+    if request.method == 'POST':
+        try:
+            add_review(purchase_request, request.form.get('rating', type=int) or 0, request.form.get('comment', '').strip())
+            db.session.commit()
+            forget_seller(purchase_request.seller_id)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('review_purchase', token=token))
+        flash('Thank you for your review!', 'success')
+        return redirect(url_for('seller_profile', seller_id=purchase_request.seller_id))
+    university = university_branding()
+    return render_template('review.html', purchase_request=purchase_request, token=token, university=university)
+
 @app.route('/admin')
 def admin():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
-    sellers = Seller.query.all()
-    products = Product.query.all()
-    purchase_requests = PurchaseRequest.query.order_by(PurchaseRequest.created_at.desc()).limit(10).all()
-    university = University.query.first()
-    return render_template('admin.html', sellers=sellers, products=products, purchase_requests=purchase_requests, university=university)
+    sellers, sellers_cursor = keyset_page(admin_sellers(), Seller.created_at, True, Seller.id,
+                                          request.args.get('sellers_cursor'), ADMIN_PAGE_SIZE)
+    products, products_cursor = keyset_page(admin_products(), Product.created_at, True, Product.id,
+                                            request.args.get('products_cursor'), ADMIN_PAGE_SIZE)
+    purchase_requests = inbox_query().order_by(PurchaseRequest.created_at.desc(), PurchaseRequest.id.desc()).limit(10).all()
+    stats = admin_stats()
+    university = university_branding()
+    return render_template('admin.html', sellers=sellers, products=products, purchase_requests=purchase_requests, stats=stats, sellers_cursor=sellers_cursor, products_cursor=products_cursor, university=university)
+
+@app.route('/admin/requests')
+def purchase_inbox():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    seller_id = request.args.get('seller_id', type=int)
+    product_id = request.args.get('product_id', type=int)
+    status = request.args.get('status', 'pending')
+    if status not in STATUSES:
+        status = ''
+    purchase_requests, next_cursor = keyset_page(inbox_query(seller_id, product_id, status), PurchaseRequest.created_at, True,
+                                                 PurchaseRequest.id, request.args.get('cursor'), ADMIN_PAGE_SIZE)
+    seller = db.session.get(Seller, seller_id) if seller_id else None
+    university = university_branding()
+    return render_template('inbox.html', purchase_requests=purchase_requests, next_cursor=next_cursor, seller=seller, seller_id=seller_id, product_id=product_id, status=status, statuses=STATUSES, transitions=TRANSITIONS, university=university)
+
+@app.route('/admin/requests/status', methods=['POST'])
+def update_request_status():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    new_status = request.form.get('status')
+    request_ids = [int(request_id) for request_id in request.form.getlist('request_ids') if request_id.isdigit()]
+    if new_status not in TRANSITIONS or not request_ids:
+        flash('Select at least one request and an action.', 'error')
+    else:
+        changed = transition(request_ids, new_status)
+        db.session.commit()
+        skipped = len(set(request_ids)) - changed
+        message = f'{changed} request(s) marked {new_status}.'
+        if skipped:
+            message += f' {skipped} could not move to {new_status} from their current status.'
+        flash(message, 'success' if changed else 'warning')
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('purchase_inbox')
+    return redirect(next_url)
 
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
@@ -115,7 +190,7 @@ def admin_login():
             return redirect(url_for('admin'))
         else:
             flash('Invalid admin credentials.', 'error')
-    university = University.query.first()
+    university = university_branding()
     return render_template('admin_login.html', university=university)
 
 @app.route('/admin/logout')
@@ -137,7 +212,7 @@ def add_seller():
         profile_image_url = request.form.get('profile_image_url', '')
         profile_image_file = request.files.get('profile_image_file')
         if profile_image_file and profile_image_file.filename:
-            uploaded_image_url = save_profile_image(profile_image_file)
+            uploaded_image_url = store_upload(profile_image_file)
             profile_image_url = uploaded_image_url or profile_image_url
         if not all([name, department, email, phone]):
             flash('Please fill in all required fields.', 'error')
@@ -158,9 +233,28 @@ def add_seller():
         db.session.commit()
         flash(f'Seller "{name}" added successfully!', 'success')
         return redirect(url_for('admin'))
-    university = University.query.first()
+    university = university_branding()
     return render_template('add_seller.html', university=university)
 
+@app.route('/admin/import', methods=['GET', 'POST'])
+def import_catalog():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('catalog_file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV, JSON or JSON Lines file.', 'error')
+            return redirect(url_for('import_catalog'))
+        report = import_upload(upload)
+        if report is None:
+            flash('Unsupported file type. Use .csv, .json, .jsonl or .ndjson.', 'error')
+            return redirect(url_for('import_catalog'))
+        flash(f'Imported {report.sellers_created} sellers and {report.products_created} products '
+              f'({report.error_count} rows skipped).', 'success' if not report.error_count else 'warning')
+    university = university_branding()
+    return render_template('import_catalog.html', report=report, university=university)
+
 @app.route('/admin/toggle_seller_status/<int:seller_id>')
 def toggle_seller_status(seller_id):
     if not session.get('admin_logged_in'):
@@ -168,6 +262,8 @@ def toggle_seller_status(seller_id):
     seller = Seller.query.get_or_404(seller_id)
     seller.is_active = not seller.is_active
     db.session.commit()
+    refresh_facets()
+    forget_seller(seller_id)
     status = "activated" if seller.is_active else "deactivated"
     flash(f'Seller {seller.name} has been {status}.', 'success')
     return redirect(url_for('admin'))
@@ -188,6 +284,9 @@ def admin_create_product(seller_id):
         category = request.form.get('category')
         condition = request.form.get('condition', 'Good')
         image_url = request.form.get('image_url', '')
+        image_file = request.files.get('image_file')
+        if image_file and image_file.filename:
+            image_url = store_upload(image_file) or image_url
         if not all([name, description, price, category]):
             flash('Please fill in all required fields.', 'error')
             return redirect(url_for('admin_create_product', seller_id=seller_id))
@@ -207,9 +306,10 @@ def admin_create_product(seller_id):
         )
         db.session.add(product)
         db.session.commit()
+        refresh_facets()
         flash(f'Product "{name}" added successfully!', 'success')
         return redirect(url_for('seller_profile', seller_id=seller_id))
-    university = University.query.first()
+    university = university_branding()
     return render_template('admin_create_product.html', seller=seller, university=university)
 
 @app.route('/admin/university_settings', methods=['GET', 'POST'])
@@ -221,6 +321,7 @@ def university_settings():
         university = University(name='University Marketplace')
         db.session.add(university)
         db.session.commit()
+        refresh_university()
     if request.method == 'POST':
         university.name = request.form.get('name', university.name)
         university.logo_url = request.form.get('logo_url', university.logo_url)
@@ -228,17 +329,29 @@ def university_settings():
         university.secondary_color = request.form.get('secondary_color', university.secondary_color)
         university.accent_color = request.form.get('accent_color', university.accent_color)
         db.session.commit()
+        refresh_university()
         flash('University settings updated successfully!', 'success')
         return redirect(url_for('admin'))
     return render_template('university_settings.html', university=university)
 
+@app.after_request
+def cache_uploads(response):
+    # Content-addressed uploads never change, so browsers may keep them forever
+    if response.status_code == 200 and is_immutable(request.path):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.template_filter('review_link')
+def review_link_filter(purchase_request):
+    return url_for('review_purchase', token=review_token(purchase_request), _external=True)
+
 @app.template_filter('currency')
 def currency_filter(value):
     return f"\u20a6{value:,.2f}"
 
 @app.context_processor
 def inject_globals():
-    university = University.query.first()
+    university = university_branding()
     return {
         'admin_logged_in': session.get('admin_logged_in', False),
         'university': university
@@ -0,0 +1,278 @@
+"""
+Full-text product search.
+
+Products are indexed together with their seller's name and department in
+``product_search``: an FTS5 table on SQLite, or a weighted tsvector column
+with a GIN index on PostgreSQL. Database triggers keep the index in sync
+with every write to ``products`` and ``sellers``, including bulk inserts
+that bypass the ORM. Queries are ranked (bm25 / ts_rank_cd), the last term
+is matched as a prefix, and terms that appear nowhere in the index are
+widened to the closest indexed words to tolerate typos.
+"""
+
+import difflib
+import re
+import threading
+import time
+from sqlalchemy import case, text
+from app import db
+from models import Product
+
+# Results considered for one listing page
+SEARCH_LIMIT = 200
+SUGGEST_LIMIT = 8
+
+# Relative weight of name, description, category, seller name, department
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 3.0, 2.0)
+
+# Similarity needed for a typo correction, and how many to try per term
+TYPO_CUTOFF = 0.75
+TYPO_CANDIDATES = 3
+
+SQLITE_SETUP = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, description, category, seller_name, department,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_search_vocab USING fts5vocab(product_search, 'row')",
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products BEGIN
+        INSERT INTO product_search (rowid, name, description, category, seller_name, department)
+        SELECT new.id, new.name, new.description, new.category, s.name, s.department
+        FROM sellers s WHERE s.id = new.seller_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_search_au AFTER UPDATE ON products BEGIN
+        DELETE FROM product_search WHERE rowid = old.id;
+        INSERT INTO product_search (rowid, name, description, category, seller_name, department)
+        SELECT new.id, new.name, new.description, new.category, s.name, s.department
+        FROM sellers s WHERE s.id = new.seller_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_search_ad AFTER DELETE ON products BEGIN
+        DELETE FROM product_search WHERE rowid = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS sellers_search_au AFTER UPDATE OF name, department ON sellers BEGIN
+        DELETE FROM product_search WHERE rowid IN (SELECT id FROM products WHERE seller_id = new.id);
+        INSERT INTO product_search (rowid, name, description, category, seller_name, department)
+        SELECT p.id, p.name, p.description, p.category, new.name, new.department
+        FROM products p WHERE p.seller_id = new.id;
+    END
+    ''',
+)
+
+SQLITE_REBUILD = '''
+    INSERT INTO product_search (rowid, name, description, category, seller_name, department)
+    SELECT p.id, p.name, p.description, p.category, s.name, s.department
+    FROM products p JOIN sellers s ON s.id = p.seller_id
+'''
+
+POSTGRES_DOCUMENT = '''
+    setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(p.category, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(s.name, '') || ' ' || coalesce(s.department, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(p.description, '')), 'D')
+'''
+
+POSTGRES_SETUP = (
+    '''
+    CREATE TABLE IF NOT EXISTS product_search (
+        product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_product_search_document ON product_search USING GIN (document)',
+    f'''
+    CREATE OR REPLACE FUNCTION product_search_refresh_product() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO product_search (product_id, document)
+        SELECT p.id, {POSTGRES_DOCUMENT}
+        FROM products p JOIN sellers s ON s.id = p.seller_id WHERE p.id = NEW.id
+        ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    ''',
+    f'''
+    CREATE OR REPLACE FUNCTION product_search_refresh_seller() RETURNS trigger AS $$
+    BEGIN
+        UPDATE product_search ps SET document = {POSTGRES_DOCUMENT}
+        FROM products p JOIN sellers s ON s.id = p.seller_id
+        WHERE p.seller_id = NEW.id AND ps.product_id = p.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    ''',
+    'DROP TRIGGER IF EXISTS products_search_sync ON products',
+    '''
+    CREATE TRIGGER products_search_sync AFTER INSERT OR UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION product_search_refresh_product()
+    ''',
+    'DROP TRIGGER IF EXISTS sellers_search_sync ON sellers',
+    '''
+    CREATE TRIGGER sellers_search_sync AFTER UPDATE OF name, department ON sellers
+    FOR EACH ROW EXECUTE FUNCTION product_search_refresh_seller()
+    ''',
+)
+
+POSTGRES_REBUILD = f'''
+    INSERT INTO product_search (product_id, document)
+    SELECT p.id, {POSTGRES_DOCUMENT}
+    FROM products p JOIN sellers s ON s.id = p.seller_id
+    ON CONFLICT (product_id) DO NOTHING
+'''
+
+
+def dialect():
+    return db.engine.dialect.name
+
+
+def supported():
+    """True if the database has a full-text index this module can maintain."""
+    return dialect() in ('sqlite', 'postgresql')
+
+
+def init_search():
+    """Create the search index and sync triggers, indexing existing products once."""
+    if not supported():
+        return
+    if dialect() == 'sqlite':
+        setup, rebuild = SQLITE_SETUP, SQLITE_REBUILD
+        exists = "SELECT COUNT(*) FROM sqlite_master WHERE name = 'product_search'"
+    else:
+        setup, rebuild = POSTGRES_SETUP, POSTGRES_REBUILD
+        exists = "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'product_search'"
+    created = db.session.execute(text(exists)).scalar() == 0
+    for statement in setup:
+        db.session.execute(text(statement))
+    if created:
+        db.session.execute(text(rebuild))
+    db.session.commit()
+    vocabulary.invalidate()
+
+
+class Vocabulary:
+    """Indexed words grouped by first letter, reloaded every ``ttl`` seconds."""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._words = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._words = None
+
+    def _load(self):
+        if dialect() == 'sqlite':
+            sql = 'SELECT term FROM product_search_vocab'
+        else:
+            sql = "SELECT word FROM ts_stat('SELECT document FROM product_search')"
+        words = {}
+        for (word,) in db.session.execute(text(sql)):
+            words.setdefault(word[0], set()).add(word)
+        return words
+
+    def words(self):
+        with self._lock:
+            if self._words is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._words = self._load()
+                self._loaded_at = time.monotonic()
+            return self._words
+
+    def expand(self, term, prefix=False):
+        """``term`` plus close indexed spellings if the term itself is not indexed."""
+        group = self.words().get(term[0], ())
+        if term in group or (prefix and any(word.startswith(term) for word in group)):
+            return [term]
+        # Typos rarely hit the first letter, so only that group is compared
+        nearby = [word for word in group if abs(len(word) - len(term)) <= 2]
+        return [term] + difflib.get_close_matches(term, nearby, n=TYPO_CANDIDATES, cutoff=TYPO_CUTOFF)
+
+
+vocabulary = Vocabulary()
+
+
+def _terms(query_text):
+    return [term.lower() for term in re.findall(r'\w+', query_text)]
+
+
+def match_expression(query_text):
+    """Safe FTS5 / tsquery expression for free text, or None if there are no words."""
+    terms = _terms(query_text)
+    if not terms:
+        return None
+    groups = []
+    for i, term in enumerate(terms):
+        last = i == len(terms) - 1
+        spellings = vocabulary.expand(term, prefix=last)
+        if dialect() == 'sqlite':
+            options = [f'"{word}"' for word in spellings]
+            if last:
+                options[0] += '*'
+            groups.append('(' + ' OR '.join(options) + ')')
+        else:
+            options = list(spellings)
+            if last:
+                options[0] += ':*'
+            groups.append('(' + ' | '.join(options) + ')')
+    return (' AND ' if dialect() == 'sqlite' else ' & ').join(groups)
+
+
+def _ranked_sql(category):
+    category_clause = ' AND p.category = :category' if category else ''
+    if dialect() == 'sqlite':
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        return f'''
+            SELECT p.id FROM product_search
+            JOIN products p ON p.id = product_search.rowid
+            JOIN sellers s ON s.id = p.seller_id
+            WHERE product_search MATCH :match AND p.is_available = 1 AND s.is_active = 1{category_clause}
+            ORDER BY bm25(product_search, {weights}) LIMIT :limit
+        '''
+    return f'''
+        SELECT p.id FROM product_search ps
+        JOIN products p ON p.id = ps.product_id
+        JOIN sellers s ON s.id = p.seller_id
+        WHERE ps.document @@ to_tsquery('simple', :match)
+          AND p.is_available = TRUE AND s.is_active = TRUE{category_clause}
+        ORDER BY ts_rank_cd(ps.document, to_tsquery('simple', :match)) DESC LIMIT :limit
+    '''
+
+
+def search_product_ids(query_text, category=None, limit=SEARCH_LIMIT):
+    """Ids of available products matching ``query_text``, best match first."""
+    match = match_expression(query_text)
+    if match is None:
+        return []
+    params = {'match': match, 'limit': limit}
+    if category:
+        params['category'] = category
+    return [row[0] for row in db.session.execute(text(_ranked_sql(category)), params)]
+
+
+def rank_order(ids):
+    """ORDER BY clause that keeps products in the order of ``ids``."""
+    return case({product_id: position for position, product_id in enumerate(ids)},
+                value=Product.id)
+
+
+def suggest(query_text, limit=SUGGEST_LIMIT):
+    """Autocomplete entries for the search box."""
+    ids = search_product_ids(query_text, limit=limit)
+    if not ids:
+        return []
+    products = (
+        db.session.query(Product.id, Product.name, Product.category, Product.price)
+        .filter(Product.id.in_(ids))
+        .order_by(rank_order(ids))
+    )
+    return [
+        {'id': product.id, 'name': product.name, 'category': product.category, 'price': product.price}
+        for product in products
+    ]
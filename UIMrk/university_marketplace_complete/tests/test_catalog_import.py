@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from catalog_import import import_catalog
+
+SELLER = {'name': 'Ada', 'department': 'Computer Science', 'email': 'ada@example.edu', 'phone': '08000000000'}
+
+
+def run_import(app, text, fmt='json'):
+    with app.app_context():
+        return import_catalog(io.StringIO(text), fmt).to_dict()
+
+
+@pytest.mark.parametrize('text', ['5', '"sellers"', 'null', '{"sellers": 5}', '{"products": {"name": "x"}}'])
+def test_wrongly_shaped_json_is_reported(app, client, text):
+    report = run_import(app, text)
+    assert report['rows'] == 0
+    assert report['error_count'] == 1
+    assert report['errors'][0]['message'].startswith('Unreadable JSON: ')
+
+
+def test_non_object_entries_are_reported_per_row(app, client):
+    text = '{"sellers": [1, "x", null, %s], "products": [[]]}' % str(SELLER).replace("'", '"')
+    report = run_import(app, text)
+    assert report['rows'] == 5
+    assert report['sellers_created'] == 1
+    assert [error['line'] for error in report['errors']] == [1, 2, 3, 5]
+    assert {error['message'] for error in report['errors']} == {'Row is not an object.'}
+
+
+def test_non_object_json_lines_are_reported(app, client):
+    report = run_import(app, '42\n["a"]\n{broken\n', fmt='jsonl')
+    assert report['rows'] == 3
+    assert [error['line'] for error in report['errors']] == [1, 2, 3]
+    assert report['errors'][2]['message'].startswith('Invalid JSON: ')
@@ -0,0 +1,64 @@
+from app import app, db
+from catalog import product_cards
+from fragments import FragmentCache, cards, forget_seller, product_card
+from models import Product
+
+
+def card(product_id, variant='listing'):
+    """Render one card from freshly loaded rows, as a listing page would."""
+    db.session.expire_all()
+    product = product_cards().filter(Product.id == product_id).one()
+    with app.test_request_context():
+        return str(product_card(product, variant))
+
+
+def test_cards_are_rendered_once_while_unchanged(make_seller):
+    _, (product,) = make_seller()
+    first = card(product.id)
+    hits = cards.hits
+    assert card(product.id) == first
+    assert cards.hits == hits + 1
+
+
+def test_product_and_seller_edits_show_on_the_next_render(make_seller):
+    seller, (product,) = make_seller(name='Tolu Adeyemi')
+    assert product.name in card(product.id)
+    assert 'Tolu Adeyemi' in card(product.id)
+
+    product.name = 'Anglepoise lamp'
+    product.price = 4321
+    db.session.commit()
+    html = card(product.id)
+    assert 'Anglepoise lamp' in html and '4,321' in html
+
+    seller.name = 'Tolu Bakare'
+    db.session.commit()
+    html = card(product.id)
+    assert 'Tolu Bakare' in html and 'Tolu Adeyemi' not in html
+
+
+def test_forget_seller_drops_only_that_sellers_cards(make_seller):
+    seller, (product,) = make_seller()
+    _, (other,) = make_seller()
+    card(product.id)
+    card(product.id, 'profile')
+    card(other.id)
+    size = len(cards)
+    forget_seller(seller.id)
+    assert len(cards) == size - 2
+    hits = cards.hits
+    card(other.id)
+    assert cards.hits == hits + 1
+
+
+def test_the_cache_is_a_bounded_lru():
+    lru = FragmentCache(max_entries=2)
+    lru.set('a', 1, 'v1', '<a>')
+    lru.set('b', 2, 'v1', '<b>')
+    assert lru.get('a', 'v1') == '<a>'
+    lru.set('c', 2, 'v1', '<c>')
+    assert (lru.get('a', 'v1'), lru.get('b', 'v1'), lru.get('c', 'v1')) == ('<a>', None, '<c>')
+    assert lru.get('a', 'v2') is None
+    lru.delete_seller(2)
+    assert len(lru) == 1
+    assert lru._by_seller == {1: {'a'}}
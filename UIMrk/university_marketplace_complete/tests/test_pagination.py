@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from catalog import decode_cursor, product_cards, product_page, ranked_page
+from models import Product
+
+
+def walk(query, sort, limit):
+    """Every page of ``query`` in ``sort`` order, as lists of product ids."""
+    pages, cursor = [], None
+    while True:
+        products, cursor = product_page(query, sort, cursor, limit)
+        pages.append([product.id for product in products])
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def catalogue(make_seller):
+    """Six products with tied prices and creation times; returns (query, products)."""
+    seller, products = make_seller(products=6)
+    created = datetime(2026, 3, 1)
+    for product, price in zip(products, (300, 100, 200, 100, 300, 100)):
+        product.price = price
+        product.created_at = created
+    db.session.commit()
+    return product_cards().filter(Product.seller_id == seller.id), products
+
+
+@pytest.mark.parametrize('sort, key', [
+    ('newest', lambda product: (-product.created_at.timestamp(), -product.id)),
+    ('price_low', lambda product: (product.price, product.id)),
+    ('price_high', lambda product: (-product.price, -product.id)),
+])
+def test_cursors_cover_every_row_once_through_ties(catalogue, sort, key):
+    query, products = catalogue
+    expected = [product.id for product in sorted(products, key=key)]
+    pages = walk(query, sort, limit=4)
+    assert [len(page) for page in pages] == [4, 2]
+    assert sum(pages, []) == expected
+    assert walk(query, sort, limit=1) == [[product_id] for product_id in expected]
+
+
+def test_top_rated_pages_by_seller_rating(make_seller):
+    high, _ = make_seller(products=2, rating=4.5)
+    low, _ = make_seller(products=2, rating=3.0)
+    query = product_cards().filter(Product.seller_id.in_([high.id, low.id]))
+    pages = walk(query, 'top_rated', limit=3)
+    ids = sum(pages, [])
+    sellers = [db.session.get(Product, product_id).seller_id for product_id in ids]
+    assert sellers == [high.id, high.id, low.id, low.id]
+    assert len(set(ids)) == 4
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'WzEsMl0', '!!!', ''])
+def test_malformed_cursors_restart_at_the_first_page(catalogue, cursor):
+    query, _ = catalogue
+    first, _ = product_page(query, 'newest', None, 2)
+    products, _ = product_page(query, 'newest', cursor or None, 2)
+    assert products == first
+    assert decode_cursor('garbage', Product.created_at) is None
+
+
+def test_ranked_pages_keep_relevance_order(catalogue):
+    query, products = catalogue
+    ids = [product.id for product in reversed(products)]
+    first, cursor = ranked_page(query, ids, limit=4)
+    second, last = ranked_page(query, ids, cursor, limit=4)
+    assert [product.id for product in first + second] == ids
+    assert (cursor, last) == ('4', None)
+
@@ -0,0 +1,68 @@
+"""
+A page whose statement count grows with the number of products or sellers
+is lazy loading per row (an N+1 query). Every page is rendered against a
+small and then a much larger catalogue and must run the same statements.
+"""
+
+import pytest
+
+from app import db
+from models import Seller, Product, PurchaseRequest
+from query_budget import StatementCounter
+
+PAGES = (
+    '/',
+    '/?search=book',
+    '/?category=Books',
+    '/seller/1',
+    '/contact_seller/1?product_id=1',
+    '/admin',
+)
+
+
+def seed(sellers, products_per_seller, start=0):
+    """Add sellers numbered from ``start``, each with a few products and one request."""
+    for i in range(start, start + sellers):
+        seller = Seller(name=f'Seller {i}', department='Computer Science',
+                        email=f'seller{i}@example.edu', phone='08000000000')
+        db.session.add(seller)
+        db.session.flush()
+        for j in range(products_per_seller):
+            product = Product(seller_id=seller.id, name=f'Book {i}-{j}',
+                              description='A used textbook in good condition.',
+                              price=1000 + j, category='Books' if j % 2 else 'Electronics')
+            db.session.add(product)
+            db.session.flush()
+        db.session.add(PurchaseRequest(seller_id=seller.id, product_id=product.id,
+                                       buyer_name='Buyer', buyer_email='buyer@example.edu',
+                                       message='Is this still available?'))
+    db.session.commit()
+
+
+def count_statements(client):
+    """Statements run by one GET of every page in ``PAGES``."""
+    counts = {}
+    for path in PAGES:
+        with StatementCounter(db.engine) as counter:
+            response = client.get(path)
+        assert response.status_code == 200, path
+        counts[path] = counter.count
+    return counts
+
+
+@pytest.fixture(scope='module')
+def counts(app, client):
+    with app.app_context():
+        seed(sellers=3, products_per_seller=2)
+        # Load per-process caches (search vocabulary, facets) before measuring
+        count_statements(client)
+        small = count_statements(client)
+        seed(sellers=30, products_per_seller=10, start=3)
+        large = count_statements(client)
+    return small, large
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_statements_do_not_grow_with_catalogue(counts, path):
+    small, large = counts
+    assert large[path] == small[path]
@@ -0,0 +1,72 @@
+from app import db
+from models import Product
+from search import SEARCH_LIMIT, search_product_ids, suggest, vocabulary
+
+
+def add_products(seller, *rows):
+    """Products of ``seller`` from (name, description, category) rows; returns their ids."""
+    products = [Product(seller_id=seller.id, name=name, description=description, price=500, category=category)
+                for name, description, category in rows]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+
+def test_name_matches_outrank_category_and_description(make_seller):
+    seller, _ = make_seller(products=0)
+    in_description, in_category, in_name = add_products(
+        seller,
+        ('Reading lamp', 'Pairs with a quokkafern shade.', 'Furniture'),
+        ('Desk', 'Solid oak.', 'Quokkafern'),
+        ('Quokkafern poster', 'Framed.', 'Art'),
+    )
+    assert search_product_ids('quokkafern') == [in_name, in_category, in_description]
+
+
+def test_hidden_products_and_sellers_are_not_found(make_seller):
+    seller, _ = make_seller(products=0)
+    inactive, _ = make_seller(products=0, is_active=False)
+    shown, sold = add_products(seller, ('Wombatrix kettle', 'Boils.', 'Kitchen'),
+                               ('Wombatrix toaster', 'Toasts.', 'Kitchen'))
+    add_products(inactive, ('Wombatrix mug', 'Holds tea.', 'Kitchen'))
+    db.session.get(Product, sold).is_available = False
+    db.session.commit()
+    assert search_product_ids('wombatrix') == [shown]
+
+
+def test_prefixes_typos_and_seller_fields(make_seller):
+    seller, _ = make_seller(products=0, name='Ngozi Platypodes', department='Zoology')
+    (product_id,) = add_products(seller, ('Binoculars', 'Barely used.', 'Optics'))
+    vocabulary.invalidate()
+    assert search_product_ids('binocu') == [product_id]
+    assert search_product_ids('binoculasr') == [product_id]
+    assert search_product_ids('platypodes zoology') == [product_id]
+
+    # Renaming the seller reindexes their products
+    seller.name = 'Ngozi Echidnaware'
+    db.session.commit()
+    assert search_product_ids('platypodes') == []
+    assert search_product_ids('echidnaware') == [product_id]
+
+
+def test_results_stop_at_search_limit_best_first(make_seller):
+    seller, _ = make_seller(products=0)
+    best = add_products(seller, *[(f'Axolotlite {i}', 'Mint.', 'Games') for i in range(3)])
+    add_products(seller, *[(f'Board game {i}', 'Has axolotlite pieces.', 'Games')
+                           for i in range(SEARCH_LIMIT)])
+
+    ids = search_product_ids('axolotlite')
+    assert len(ids) == SEARCH_LIMIT
+    assert sorted(ids[:3]) == best
+    assert search_product_ids('axolotlite', limit=5)[:3] == ids[:3]
+
+
+def test_suggestions_and_listing_keep_the_ranking(make_seller, client):
+    seller, _ = make_seller(products=0)
+    weak, strong = add_products(seller, ('Lamp', 'Comes with a narwhalux cord.', 'Furniture'),
+                                ('Narwhalux lamp', 'Bright.', 'Furniture'))
+    assert [entry['id'] for entry in suggest('narwhal')] == [strong, weak]
+
+    page = client.get('/?search=narwhalux').data.decode()
+    assert page.index('Narwhalux lamp') < page.index('Comes with a narwhalux cord.')
+    assert client.get('/api/search/suggest?q=n').get_json()['suggestions'] == []
@@ -5,7 +5,8 @@ from flask_socketio import SocketIO
 from flask_login import LoginManager
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from models import db, get_user_by_id, User  # only now importing db
+from models import db, get_user_by_id, User, create_indexes  # only now importing db
+from identity import load_identity
 
 # Logging
 logging.basicConfig(level=logging.DEBUG)
@@ -18,7 +19,7 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 # Config
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Extensions
@@ -31,19 +32,38 @@ login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))  # Updated to avoid importing get_user_by_id
+    return load_identity(int(user_id))  # Cached id/name/role fields, not the whole row (see identity.py)
 
-# SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+# SocketIO; workers sharing MESSAGE_QUEUE_URL (e.g. redis://localhost:6379/0) share rooms
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet',
+                    message_queue=os.environ.get('MESSAGE_QUEUE_URL'))
 
 # Create uploads directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Routes
 from routes import *
+from image_jobs import resume_jobs, shutdown_pool
 
-# Run
-if __name__ == '__main__':
+def init_app():
+    """Create tables and indexes and requeue image jobs a restart left pending.
+
+    Called once at startup, never on import: WSGI workers and spawned image
+    workers import this module too.
+    """
     with app.app_context():
         db.create_all()
+        create_indexes()
+        resume_jobs()
+
+@app.cli.command('init-app')
+def init_app_command():
+    """Create tables and indexes, then finish image jobs a restart left pending."""
+    init_app()
+    shutdown_pool()
+
+# Run; in debug mode the reloader serves from a child process, so start up there
+if __name__ == '__main__':
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_app()
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,192 @@
+"""
+Cached identities for Flask-Login.
+
+``load_user`` runs on every request and every Socket.IO event, but all it
+needs is who the user is and what the navbar shows. Those fields are kept in
+a small in-process LRU for ``IDENTITY_TTL`` seconds instead of loading the
+whole User row each time. If ``CACHE_URL`` points at Redis, identities are
+also shared there, so an edit in one worker reaches the others within
+``LOCAL_TTL`` seconds. Routes that change these fields call ``forget_user``.
+
+Socket.IO connections keep the identity they were opened with, so events
+on a chatty socket do not look the user up at all.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import has_request_context, request
+from flask_login import UserMixin
+from models import db, User
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_TTL = 300       # seconds an identity is served before it is reloaded
+LOCAL_TTL = 5            # with a shared backend, how long a worker trusts its own copy
+MAX_IDENTITIES = 10000   # identities kept per worker, least recently used dropped first
+
+FIELDS = ('id', 'username', 'full_name', 'role', 'department', 'profile_photo', 'is_active')
+
+
+class Identity(UserMixin):
+    """The User fields authentication and the navbar need, detached from the session.
+
+    Code that changes a user loads the User row itself.
+    """
+
+    def __init__(self, fields):
+        self.id = fields['id']
+        self.username = fields['username']
+        self.full_name = fields['full_name']
+        self.role = fields['role']
+        self.department = fields['department']
+        self.profile_photo = fields['profile_photo']
+        self.active = fields['is_active']
+        self.loaded_at = time.monotonic()
+
+    @property
+    def is_active(self):
+        return self.active
+
+
+class IdentityCache:
+    """Thread-safe LRU of identities with per-entry expiry."""
+
+    def __init__(self, size=MAX_IDENTITIES):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, identity, ttl):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+class RedisIdentities:
+    """Shared store for multi-worker deployments; fields are JSON encoded."""
+
+    def __init__(self, url, prefix='connect:identity:'):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, user_id):
+        raw = self.client.get(f'{self.prefix}{user_id}')
+        return None if raw is None else json.loads(raw)
+
+    def set(self, user_id, fields, ttl):
+        self.client.set(f'{self.prefix}{user_id}', json.dumps(fields), ex=ttl)
+
+    def delete(self, user_id):
+        self.client.delete(f'{self.prefix}{user_id}')
+
+
+def _shared_backend():
+    url = os.environ.get('CACHE_URL')
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("CACHE_URL is set but the redis package is not installed; using in-process cache only")
+        return None
+    return RedisIdentities(url)
+
+
+_local = IdentityCache()
+_shared = _shared_backend()
+_local_ttl = min(IDENTITY_TTL, LOCAL_TTL) if _shared else IDENTITY_TTL
+_sockets = {}            # sid -> identity the connection was opened with
+
+
+def _load_fields(user_id):
+    row = (db.session.query(*(getattr(User, field) for field in FIELDS))
+           .filter(User.id == user_id).first())
+    return dict(zip(FIELDS, row)) if row else None
+
+
+def get_identity(user_id):
+    """The cached identity of ``user_id``, or None if there is no such user."""
+    identity = _local.get(user_id)
+    if identity is not None:
+        return identity
+    fields = None
+    if _shared:
+        try:
+            fields = _shared.get(user_id)
+        except Exception as e:
+            logger.warning(f"Shared identity read failed: {str(e)}")
+    if fields is None:
+        # Only these columns, not the whole row (bio, password hash, ...)
+        fields = _load_fields(user_id)
+        if fields is None:
+            return None
+        if _shared:
+            try:
+                _shared.set(user_id, fields, IDENTITY_TTL)
+            except Exception as e:
+                logger.warning(f"Shared identity write failed: {str(e)}")
+    identity = Identity(fields)
+    _local.set(user_id, identity, _local_ttl)
+    return identity
+
+
+def load_identity(user_id):
+    """Flask-Login user loader; Socket.IO events reuse their connection's identity."""
+    sid = getattr(request, 'sid', None) if has_request_context() else None
+    if sid is not None:
+        identity = _sockets.get(sid)
+        if identity is not None and identity.id == user_id \
+                and time.monotonic() - identity.loaded_at < _local_ttl:
+            return identity
+        identity = get_identity(user_id)
+        if sid in _sockets:
+            _sockets[sid] = identity
+        return identity
+    return get_identity(user_id)
+
+
+def remember_socket(identity):
+    """Keep the identity of the Socket.IO connection being opened."""
+    _sockets[request.sid] = identity
+
+
+def forget_socket():
+    _sockets.pop(request.sid, None)
+
+
+def forget_user(user_id):
+    """Drop a user's cached identity after their profile changed."""
+    _local.delete(user_id)
+    if _shared:
+        try:
+            _shared.delete(user_id)
+        except Exception as e:
+            logger.warning(f"Shared identity delete failed: {str(e)}")
+    for sid, identity in list(_sockets.items()):
+        if identity is not None and identity.id == user_id:
+            # Reloaded by the connection's next event
+            _sockets[sid] = None
@@ -0,0 +1,113 @@
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from flask import url_for
+from werkzeug.utils import secure_filename
+from app import app
+from models import db, ImageJob
+from realtime import publish_image
+from utils import allowed_file, render_variants, variant_name
+
+logger = logging.getLogger(__name__)
+
+# Originals keep their metadata, so they are stored outside the served folders
+ORIGINALS_FOLDER = os.path.join('uploads', 'originals')
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Sizes rendered for each kind of upload (see utils.VARIANT_SIZES)
+JOB_SIZES = {
+    'post': ('feed', 'thumbnail'),
+    'avatar': ('avatar',),
+}
+
+_executor = None
+_ready = set()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # Resizing runs in other processes so it never blocks the eventlet hub;
+        # spawned workers do not inherit the hub or open database connections
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def save_upload(file, kind, owner_id):
+    """Store an uploaded image and add its processing job to the session.
+
+    Returns the job, or None if the file is not an allowed image. Call
+    ``submit(job)`` once the job has been committed.
+    """
+    if not file or not file.filename or not allowed_file(file.filename):
+        return None
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    filename = secure_filename(f"{kind}_{owner_id}_{uuid.uuid4().hex[:12]}.{ext}")
+    os.makedirs(ORIGINALS_FOLDER, exist_ok=True)
+    file.save(os.path.join(ORIGINALS_FOLDER, filename))
+    job = ImageJob(kind=kind, filename=filename)
+    db.session.add(job)
+    return job
+
+
+def submit(job):
+    """Queue a committed job on the worker pool."""
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    future = _pool().submit(render_variants, os.path.join(ORIGINALS_FOLDER, job.filename),
+                            app.config['UPLOAD_FOLDER'], job.filename, JOB_SIZES[job.kind])
+    future.add_done_callback(partial(_finish, job.id))
+
+
+def _finish(job_id, future):
+    """Record the outcome of a job; runs on the pool's result thread."""
+    with app.app_context():
+        job = db.session.get(ImageJob, job_id)
+        if job is None:
+            return
+        try:
+            future.result()
+            job.status = 'done'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Image job {job_id} ({job.filename}) failed: {e}")
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if job.status == 'done' and job.kind == 'post':
+            publish_image(job.filename, JOB_SIZES[job.kind])
+
+
+def resume_jobs():
+    """Requeue jobs left pending by a restart."""
+    for job in ImageJob.query.filter_by(status='pending').order_by(ImageJob.id):
+        submit(job)
+
+
+def shutdown_pool():
+    """Wait for queued jobs to finish and stop the worker pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+@app.template_filter('image_variant')
+def image_variant(filename, size):
+    """URL of one processed size of an upload, or None while it is still being processed."""
+    if not filename:
+        return None
+    folder = app.config['UPLOAD_FOLDER']
+    name = variant_name(filename, size)
+    if name not in _ready:
+        if not os.path.exists(os.path.join(folder, name)):
+            # Uploads from before the worker pool were resized in place
+            if os.path.exists(os.path.join(folder, filename)):
+                return url_for('uploaded_file', filename=filename)
+            return None
+        _ready.add(name)
+    return url_for('uploaded_file', filename=name)
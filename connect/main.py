@@ -1,4 +1,7 @@
-from app import app, socketio
+import os
+from app import app, socketio, init_app
 
 if __name__ == '__main__':
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_app()
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
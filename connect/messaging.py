@@ -0,0 +1,165 @@
+from sqlalchemy.orm import joinedload
+from models import db, User, Conversation, ConversationMember, Message, Group
+
+HISTORY_SIZE = 50        # messages per history page
+MAX_MESSAGE_LENGTH = 500
+
+
+def conversation_room(conversation_id):
+    return f'conversation_{conversation_id}'
+
+
+def group_room(group_id):
+    return f'group_{group_id}'
+
+
+def get_member(conversation_id, user_id):
+    if conversation_id is None:
+        return None
+    return db.session.get(ConversationMember, (conversation_id, user_id))
+
+
+def find_direct(user_id, other_id):
+    a, b = sorted((user_id, other_id))
+    return Conversation.query.filter_by(user_a_id=a, user_b_id=b).first()
+
+
+def get_or_create_direct(user, other):
+    """The direct conversation between two users, created on first use."""
+    conversation = find_direct(user.id, other.id)
+    if conversation is None:
+        a, b = sorted((user.id, other.id))
+        conversation = Conversation(user_a_id=a, user_b_id=b)
+        db.session.add(conversation)
+        db.session.flush()
+        db.session.add_all([ConversationMember(conversation_id=conversation.id, user_id=a),
+                            ConversationMember(conversation_id=conversation.id, user_id=b)])
+        db.session.commit()
+    return conversation
+
+
+def other_user_id(conversation, user_id):
+    return conversation.user_b_id if conversation.user_a_id == user_id else conversation.user_a_id
+
+
+def create_group(name, department, creator):
+    conversation = Conversation()
+    db.session.add(conversation)
+    db.session.flush()
+    group = Group(name=name, department=department, creator_id=creator.id,
+                  conversation_id=conversation.id, member_count=1)
+    db.session.add_all([group, ConversationMember(conversation_id=conversation.id, user_id=creator.id)])
+    db.session.commit()
+    return group
+
+
+def can_join(group, user):
+    return not group.department or group.department == user.department
+
+
+def join_group(group, user):
+    """Add ``user`` to the group's members; returns False if already one."""
+    if get_member(group.conversation_id, user.id) is not None:
+        return False
+    db.session.add(ConversationMember(conversation_id=group.conversation_id, user_id=user.id))
+    Group.query.filter_by(id=group.id).update({Group.member_count: Group.member_count + 1},
+                                              synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(group)
+    return True
+
+
+def send_message(conversation_id, sender, content):
+    """Store a message, bump the other members' unread counters and return its payload.
+
+    Costs one insert and two single-statement updates, whatever the
+    length of the conversation. The payload is built before the commit
+    expires the objects, so sending does not read them back.
+    """
+    message = Message(conversation_id=conversation_id, sender_id=sender.id, content=content)
+    db.session.add(message)
+    db.session.flush()
+    Conversation.query.filter_by(id=conversation_id).update(
+        {Conversation.last_message_id: message.id, Conversation.last_activity: message.created_at},
+        synchronize_session=False)
+    ConversationMember.query.filter(ConversationMember.conversation_id == conversation_id,
+                                    ConversationMember.user_id != sender.id).update(
+        {ConversationMember.unread_count: ConversationMember.unread_count + 1},
+        synchronize_session=False)
+    payload = message_payload(message, sender)
+    db.session.commit()
+    return payload
+
+
+def mark_read(member, message_id):
+    """Move the member's read marker forward to ``message_id``."""
+    if message_id <= member.last_read_id:
+        return
+    member.last_read_id = message_id
+    member.delivered_id = max(member.delivered_id, message_id)
+    # Messages that arrived after the one being read stay unread
+    member.unread_count = Message.query.filter(Message.conversation_id == member.conversation_id,
+                                               Message.id > message_id,
+                                               Message.sender_id != member.user_id).count()
+    db.session.commit()
+
+
+def mark_delivered(member, message_id):
+    """Record that the member's client received messages up to ``message_id``."""
+    if message_id <= member.delivered_id:
+        return False
+    member.delivered_id = message_id
+    db.session.commit()
+    return True
+
+
+def history(conversation_id, before=None, limit=HISTORY_SIZE):
+    """Messages older than ``before`` (oldest first) and the cursor of the page before them.
+
+    Pages walk the (conversation_id, id) index backwards from the newest
+    message, so opening a chat never reads the whole conversation.
+    """
+    query = Message.query.options(joinedload(Message.sender)).filter(Message.conversation_id == conversation_id)
+    if before:
+        query = query.filter(Message.id < before)
+    messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    previous_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        previous_cursor = messages[-1].id
+    messages.reverse()
+    return messages, previous_cursor
+
+
+def inbox(user):
+    """The user's direct conversations, most recent first, for the messages page."""
+    rows = (db.session.query(Conversation, ConversationMember.unread_count)
+            .join(ConversationMember, ConversationMember.conversation_id == Conversation.id)
+            .filter(ConversationMember.user_id == user.id, Conversation.user_a_id.isnot(None))
+            .order_by(Conversation.last_activity.desc())
+            .all())
+    other_ids = {other_user_id(conversation, user.id) for conversation, _ in rows}
+    users = {u.id: u for u in User.query.filter(User.id.in_(other_ids))} if other_ids else {}
+    message_ids = [conversation.last_message_id for conversation, _ in rows if conversation.last_message_id]
+    last = {m.id: m for m in Message.query.filter(Message.id.in_(message_ids))} if message_ids else {}
+    return [{
+        'id': conversation.id,
+        'other_user': users[other_user_id(conversation, user.id)],
+        'last_message': last.get(conversation.last_message_id),
+        'last_activity': conversation.last_activity,
+        'unread': unread,
+    } for conversation, unread in rows]
+
+
+def message_payload(message, sender=None):
+    """What clients receive for a message; timestamps are UTC."""
+    payload = {
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'created_at': message.created_at.isoformat() + 'Z',
+    }
+    if sender is not None:
+        payload['sender'] = {'id': sender.id, 'full_name': sender.full_name, 'username': sender.username}
+    return payload
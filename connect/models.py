@@ -47,5 +47,74 @@ class Post(db.Model):
     image = db.Column(db.String(255), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Feed order, newest first (see timeline.py)
+    __table_args__ = (db.Index('ix_post_timestamp_id', 'timestamp', 'id'),)
+
+class ImageJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)       # 'post' or 'avatar'
+    filename = db.Column(db.String(255), nullable=False)  # name the variants are derived from
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done, failed
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_image_job_status', 'status', 'id'),)
+
+class Conversation(db.Model):
+    """A direct chat between two users, or the chat of a group."""
+    id = db.Column(db.Integer, primary_key=True)
+    # Direct chats only, lower user id first; both are NULL for groups
+    user_a_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    user_b_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_activity = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_a_id', 'user_b_id', name='uq_conversation_users'),)
+
+class ConversationMember(db.Model):
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    # Kept up to date on every send and read, never recounted for the inbox
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    delivered_id = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_conversation_member_user', 'user_id'),)
+
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    sender = db.relationship('User')
+
+    # History pages and unread counts (see messaging.py)
+    __table_args__ = (db.Index('ix_message_conversation_id', 'conversation_id', 'id'),)
+
+class Group(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    department = db.Column(db.String(120), nullable=True)  # members must belong to it when set
+    creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False, unique=True)
+    member_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    creator = db.relationship('User')
+    members = db.relationship('User', secondary='conversation_member',
+                              primaryjoin='Group.conversation_id == ConversationMember.conversation_id',
+                              secondaryjoin='ConversationMember.user_id == User.id',
+                              order_by='User.id', viewonly=True)
+
+def create_indexes():
+    """create_all() skips indexes added to tables that already exist."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
 def get_user_by_id(user_id):
     return User.query.get(user_id)
@@ -0,0 +1,273 @@
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from flask import request
+from app import socketio
+from models import User
+from utils import variant_name
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.25    # seconds events are collected before they are sent
+SEND_BUFFER = 100        # events queued per connection before the oldest are dropped
+MAX_IN_FLIGHT = 2        # unacknowledged batches per connection
+ACK_TIMEOUT = 10         # seconds before unacknowledged batches are given up on
+MESSAGE_QUEUE_URL = os.environ.get('MESSAGE_QUEUE_URL')
+
+FEED_ROOM = 'feed'       # every signed-in connection
+MENTION = re.compile(r'@(\w+)')
+
+_seq = itertools.count()
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+class Outbox:
+    """Events published since the last flush, per room.
+
+    Events that share a key replace each other, so only the latest profile
+    of a user is sent however often it changed within one flush.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def put(self, room, key, event):
+        with self._lock:
+            pending = self._rooms.setdefault(room, OrderedDict())
+            pending.pop(key, None)
+            pending[key] = event
+
+    def drain(self):
+        with self._lock:
+            rooms, self._rooms = self._rooms, {}
+        return rooms
+
+
+class Connection:
+    """Send buffer of one socket.
+
+    At most MAX_IN_FLIGHT batches wait for the client's acknowledgement;
+    while a client is that far behind, events stay in the buffer, and once
+    it holds SEND_BUFFER events the oldest are dropped and the client is
+    told to resync instead.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.buffer = OrderedDict()
+        self.in_flight = 0
+        self.sent_at = 0
+        self.overflowed = False
+
+    def queue(self, events):
+        for key, event in events.items():
+            self.buffer.pop(key, None)
+            self.buffer[key] = event
+        while len(self.buffer) > SEND_BUFFER:
+            self.buffer.popitem(last=False)
+            self.overflowed = True
+
+    def ready(self, now):
+        if not self.buffer and not self.overflowed:
+            return False
+        if self.in_flight >= MAX_IN_FLIGHT:
+            if now - self.sent_at < ACK_TIMEOUT:
+                return False
+            # The acknowledgements were lost (or the client never sends them)
+            self.in_flight = 0
+        return True
+
+    def take(self, now):
+        batch = list(self.buffer.values())
+        if self.overflowed:
+            batch.insert(0, {'type': 'resync'})
+        self.buffer.clear()
+        self.overflowed = False
+        self.in_flight += 1
+        self.sent_at = now
+        return batch
+
+
+_outbox = Outbox()
+_connections = {}        # sid -> Connection, sockets of this worker only
+_by_user = {}            # user id -> set of sids
+_started = False
+_start_lock = threading.Lock()
+
+
+# ---------- BROKERS ----------
+class LocalBroker:
+    """Hands events straight to this worker's outbox (single worker)."""
+
+    def publish(self, room, key, event):
+        _outbox.put(room, key, event)
+
+    def start(self):
+        pass
+
+
+class RedisBroker:
+    """Shares events between workers through a Redis channel.
+
+    Every worker receives every event and delivers it to its own sockets,
+    so rooms span workers without any worker knowing the others' sockets.
+    """
+
+    CHANNEL = 'connect:events'
+
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def publish(self, room, key, event):
+        self.redis.publish(self.CHANNEL, json.dumps([room, key, event]))
+
+    def start(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.CHANNEL)
+        socketio.start_background_task(self._listen, pubsub)
+
+    def _listen(self, pubsub):
+        while True:
+            try:
+                # Poll rather than block, which would stall the eventlet hub
+                message = pubsub.get_message()
+                while message:
+                    room, key, event = json.loads(message['data'])
+                    _outbox.put(room, key, event)
+                    message = pubsub.get_message()
+            except Exception as e:
+                logger.error(f"Event channel read failed: {e}")
+            socketio.sleep(FLUSH_INTERVAL)
+
+
+broker = RedisBroker(MESSAGE_QUEUE_URL) if MESSAGE_QUEUE_URL else LocalBroker()
+
+
+def publish(room, event, key=None):
+    """Queue ``event`` for every connection in ``room``.
+
+    Events with the same ``key`` coalesce; keyless events are all sent.
+    """
+    if key is None:
+        key = f'{os.getpid()}:{next(_seq)}'
+    broker.publish(room, key, event)
+
+
+# ---------- DELIVERY ----------
+def _members(room):
+    if room == FEED_ROOM:
+        return list(_connections)
+    if room.startswith('user_'):
+        return list(_by_user.get(int(room[5:]), ()))
+    return []
+
+
+def flush():
+    """Move published events into connection buffers and send what can be sent."""
+    for room, events in _outbox.drain().items():
+        for sid in _members(room):
+            connection = _connections.get(sid)
+            if connection is not None:
+                connection.queue(events)
+
+    now = time.monotonic()
+    for sid, connection in list(_connections.items()):
+        if connection.ready(now):
+            socketio.emit('events', connection.take(now), to=sid, callback=partial(_ack, sid))
+
+
+def _ack(sid, *args):
+    connection = _connections.get(sid)
+    if connection is not None and connection.in_flight:
+        connection.in_flight -= 1
+
+
+def _flush_loop():
+    while True:
+        socketio.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception("Real-time flush failed")
+
+
+def _start():
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    broker.start()
+    socketio.start_background_task(_flush_loop)
+
+
+def track_socket(user_id):
+    """Track the socket of the current Socket.IO request."""
+    _start()
+    _connections[request.sid] = Connection(user_id)
+    _by_user.setdefault(user_id, set()).add(request.sid)
+
+
+def untrack_socket():
+    connection = _connections.pop(request.sid, None)
+    if connection is not None:
+        sids = _by_user.get(connection.user_id, set())
+        sids.discard(request.sid)
+        if not sids:
+            _by_user.pop(connection.user_id, None)
+
+
+# ---------- EVENTS ----------
+def publish_post(post, author):
+    """Announce a just-committed post and notify the users it mentions."""
+    publish(FEED_ROOM, {
+        'type': 'new_post',
+        'post_id': post.id,
+        'user_id': author.id,
+        'username': author.username,
+        'full_name': author.full_name,
+        'department': author.department,
+    })
+
+    names = set(MENTION.findall(post.content)) - {author.username}
+    if not names:
+        return
+    for row in User.query.with_entities(User.id).filter(User.username.in_(names)):
+        publish(user_room(row.id), {
+            'type': 'mention',
+            'post_id': post.id,
+            'username': author.username,
+            'full_name': author.full_name,
+            'excerpt': post.content[:140],
+        })
+
+
+def publish_profile(user):
+    """Tell open pages a user's name or department changed."""
+    publish(FEED_ROOM, {
+        'type': 'profile_updated',
+        'user_id': user.id,
+        'username': user.username,
+        'full_name': user.full_name,
+        'department': user.department,
+    }, key=f'profile:{user.id}')
+
+
+def publish_image(filename, sizes):
+    """Tell open pages the resized versions of an upload are ready."""
+    publish(FEED_ROOM, {
+        'type': 'image_ready',
+        'filename': filename,
+        'variants': {size: variant_name(filename, size) for size in sizes},
+    }, key=f'image:{filename}')
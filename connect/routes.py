@@ -1,16 +1,28 @@
 import os
-from flask import render_template, request, redirect, url_for, flash, session, jsonify
+from flask import render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
 from flask_socketio import emit, join_room, leave_room
-from werkzeug.utils import secure_filename
-from PIL import Image
 from app import app, socketio, db
-from models import User, Post  # Use SQLAlchemy models only
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from models import User, Post, Conversation, Group  # Use SQLAlchemy models only
 from flask_login import login_required, login_user, logout_user, current_user
-from utils import allowed_file, resize_image
+from image_jobs import save_upload, submit
+from timeline import feed_key, feed_page, add_post
+from identity import remember_socket, forget_socket, forget_user
+from realtime import track_socket, untrack_socket, publish_post, publish_profile, user_room
+from messaging import (MAX_MESSAGE_LENGTH, conversation_room, group_room, get_member, find_direct,
+                       get_or_create_direct, other_user_id, create_group, can_join, join_group, send_message,
+                       mark_read, mark_delivered, history, inbox, message_payload)
 
 UPLOAD_FOLDER = os.path.join('static', 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+DEPARTMENTS = (
+    'Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Economics',
+    'Law', 'Medicine', 'Electrical Engineering', 'Mechanical Engineering', 'English',
+    'History', 'Psychology',
+)
+
 # ---------- HOME ----------
 @app.route('/')
 def index():
@@ -78,8 +90,13 @@ def dashboard():
 @app.route('/feed')
 @login_required
 def feed():
-    posts = Post.query.order_by(Post.timestamp.desc()).all()
-    return render_template('feed.html', posts=posts, user=current_user)
+    feed_type = request.args.get('type', 'public')
+    posts, next_cursor, total_posts = feed_page(feed_key(feed_type, current_user), request.args.get('cursor'))
+    if request.args.get('partial'):
+        # Infinite scroll asks for the next page's posts only
+        return render_template('feed_posts.html', posts=posts, next_cursor=next_cursor, feed_type=feed_type)
+    return render_template('feed.html', posts=posts, next_cursor=next_cursor, total_posts=total_posts,
+                           feed_type=feed_type, user=current_user)
 
 # ---------- CREATE POST ----------
 @app.route('/create_post', methods=['GET', 'POST'])
@@ -87,24 +104,26 @@ def feed():
 def create_post():
     if request.method == 'POST':
         content = request.form['content']
-        image = request.files.get('image')
-        image_filename = None
-
-        if image and allowed_file(image.filename):
-            filename = secure_filename(f"post_{current_user.id}_{image.filename}")
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            image.save(filepath)
-            resize_image(filepath, (800, 600))
-            image_filename = filename
+        # Resized off the request by the image worker pool; the feed shows a placeholder until then
+        job = save_upload(request.files.get('post_image'), 'post', current_user.id)
 
-        post = Post(user_id=current_user.id, content=content, image=image_filename)
+        post = Post(user_id=current_user.id, content=content, image=job.filename if job else None)
         db.session.add(post)
         db.session.commit()
+        if job:
+            submit(job)
+        add_post(post, current_user)
+        publish_post(post, current_user)
         flash('Post created!', 'success')
         return redirect(url_for('feed'))
 
     return render_template('create_post.html')
 
+# ---------- UPLOADS ----------
+@app.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
 # ---------- PROFILE ----------
 @app.route('/profile/<username>')
 @login_required
@@ -116,15 +135,242 @@ def profile(username):
     posts = Post.query.filter_by(user_id=user.id).order_by(Post.timestamp.desc()).all()
     return render_template('profile.html', user=user, posts=posts, is_own=current_user.id == user.id)
 
+@app.route('/edit_profile', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    # current_user only carries the cached identity fields
+    user = db.session.get(User, current_user.id)
+    if request.method == 'POST':
+        full_name = request.form.get('full_name', '').strip()
+        department = request.form.get('department') or None
+        if not full_name:
+            flash('Full name is required', 'error')
+            return redirect(url_for('edit_profile'))
+        if department and department not in DEPARTMENTS:
+            flash('Unknown department', 'error')
+            return redirect(url_for('edit_profile'))
+
+        user.full_name = full_name
+        user.department = department
+        user.bio = request.form.get('bio', '').strip()[:500]
+        job = save_upload(request.files.get('profile_photo'), 'avatar', user.id)
+        if job:
+            user.profile_photo = job.filename
+        db.session.commit()
+        forget_user(user.id)
+        if job:
+            submit(job)
+        publish_profile(user)
+        flash('Profile updated!', 'success')
+        return redirect(url_for('profile', username=user.username))
+
+    return render_template('edit_profile.html', user=user, departments=DEPARTMENTS)
+
+# ---------- MESSAGES ----------
+@app.route('/messages')
+@login_required
+def messages():
+    return render_template('messages.html', conversations=inbox(current_user))
+
+@app.route('/start_chat/<username>')
+@login_required
+def start_chat(username):
+    other = User.query.filter_by(username=username).first()
+    if not other or other.id == current_user.id:
+        flash("User not found", 'error')
+        return redirect(url_for('messages'))
+    conversation = get_or_create_direct(current_user, other)
+    return redirect(url_for('chat', conversation_id=conversation.id))
+
+@app.route('/chat/<int:conversation_id>')
+@login_required
+def chat(conversation_id):
+    conversation = db.session.get(Conversation, conversation_id)
+    member = get_member(conversation_id, current_user.id)
+    if conversation is None or member is None or conversation.user_a_id is None:
+        flash("Conversation not found", 'error')
+        return redirect(url_for('messages'))
+    page, previous_cursor = history(conversation_id)
+    if page:
+        mark_read(member, page[-1].id)
+    other_user = db.session.get(User, other_user_id(conversation, current_user.id))
+    return render_template('chat.html', conversation=conversation, messages=page, previous_cursor=previous_cursor,
+                           user=current_user, other_user=other_user,
+                           other_member=get_member(conversation_id, other_user.id))
+
+@app.route('/conversations/<int:conversation_id>/history')
+@login_required
+def conversation_history(conversation_id):
+    # Older messages for the "load earlier" button of chats and group chats
+    if get_member(conversation_id, current_user.id) is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+    page, previous_cursor = history(conversation_id, request.args.get('before', type=int))
+    return jsonify({'messages': [message_payload(m, m.sender) for m in page],
+                    'previous_cursor': previous_cursor})
+
+# ---------- GROUPS ----------
+@app.route('/groups')
+@login_required
+def groups():
+    visible = (Group.query.options(joinedload(Group.creator), selectinload(Group.members))
+               .filter(or_(Group.department.is_(None), Group.department == current_user.department))
+               .order_by(Group.created_at.desc())
+               .all())
+    return render_template('groups.html', groups=visible)
+
+@app.route('/create_group', methods=['GET', 'POST'])
+@login_required
+def create_group_route():
+    if request.method == 'POST':
+        name = request.form.get('group_name', '').strip()
+        department = request.form.get('department') or None
+        if not name or len(name) > 100:
+            flash('Group name must be 1 to 100 characters', 'error')
+            return redirect(url_for('create_group_route'))
+        if department and department not in DEPARTMENTS:
+            flash('Unknown department', 'error')
+            return redirect(url_for('create_group_route'))
+        group = create_group(name, department, current_user)
+        flash('Group created!', 'success')
+        return redirect(url_for('group_chat', group_id=group.id))
+
+    return render_template('create_group.html', departments=DEPARTMENTS)
+
+@app.route('/group/<int:group_id>')
+@login_required
+def group_chat(group_id):
+    group = db.session.get(Group, group_id)
+    if group is None:
+        flash("Group not found", 'error')
+        return redirect(url_for('groups'))
+    if not can_join(group, current_user):
+        flash(f"This group is only open to {group.department}", 'error')
+        return redirect(url_for('groups'))
+    member = get_member(group.conversation_id, current_user.id)
+    if member is None:
+        # Non-members get the group's details and a Join button
+        return render_template('group_chat.html', group=group, messages=[], previous_cursor=None,
+                               user=current_user, is_member=False)
+    page, previous_cursor = history(group.conversation_id)
+    if page:
+        mark_read(member, page[-1].id)
+    return render_template('group_chat.html', group=group, messages=page, previous_cursor=previous_cursor,
+                           user=current_user, is_member=True)
+
+@app.route('/group/<int:group_id>/join', methods=['POST'])
+@login_required
+def join_group_route(group_id):
+    group = db.session.get(Group, group_id)
+    if group is None:
+        flash("Group not found", 'error')
+        return redirect(url_for('groups'))
+    if not can_join(group, current_user):
+        flash(f"This group is only open to {group.department}", 'error')
+        return redirect(url_for('groups'))
+    if join_group(group, current_user):
+        flash(f"You joined {group.name}", 'success')
+    return redirect(url_for('group_chat', group_id=group.id))
+
 # ---------- WEBSOCKET EVENTS ----------
 @socketio.on('connect')
 def on_connect():
     if current_user.is_authenticated:
         join_room(f'user_{current_user.id}')
+        # Later events on this connection reuse this identity (see identity.py)
+        remember_socket(current_user._get_current_object())
+        track_socket(current_user.id)
         print(f"User {current_user.id} connected")
 
 @socketio.on('disconnect')
 def on_disconnect():
+    untrack_socket()
+    forget_socket()
     if current_user.is_authenticated:
         leave_room(f'user_{current_user.id}')
-        print(f"User {current_user.id} disconnected")
\ No newline at end of file
+        print(f"User {current_user.id} disconnected")
+
+def _event_id(data, key):
+    try:
+        return int(data.get(key))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _message_content(data):
+    content = data.get('content') if isinstance(data, dict) else None
+    content = content.strip() if isinstance(content, str) else ''
+    return content if 0 < len(content) <= MAX_MESSAGE_LENGTH else None
+
+@socketio.on('join_conversation')
+def on_join_conversation(data):
+    conversation_id = _event_id(data, 'conversation_id')
+    if current_user.is_authenticated and get_member(conversation_id, current_user.id):
+        # Open chat windows receive delivery and read receipts
+        join_room(conversation_room(conversation_id))
+
+@socketio.on('send_message')
+def on_send_message(data):
+    """Deliver a direct message; the return value is the sender's acknowledgement."""
+    if not current_user.is_authenticated:
+        return {'error': 'Not signed in'}
+    content = _message_content(data)
+    if content is None:
+        return {'error': f'Messages must be 1 to {MAX_MESSAGE_LENGTH} characters'}
+    receiver_id = _event_id(data, 'receiver_id')
+    conversation = None
+    if receiver_id not in (None, current_user.id):
+        conversation = find_direct(current_user.id, receiver_id)
+    if conversation is None:
+        receiver = db.session.get(User, receiver_id or 0)
+        if receiver is None or receiver.id == current_user.id:
+            return {'error': 'Unknown recipient'}
+        conversation = get_or_create_direct(current_user, receiver)
+
+    payload = send_message(conversation.id, current_user, content)
+    emit('message_received', payload, to=user_room(receiver_id))
+    # The sender's other tabs; this one renders the acknowledgement
+    emit('message_sent', payload, to=user_room(payload['sender_id']), include_self=False)
+    return payload
+
+@socketio.on('message_delivered')
+def on_message_delivered(data):
+    conversation_id, message_id = _event_id(data, 'conversation_id'), _event_id(data, 'message_id')
+    if not current_user.is_authenticated or message_id is None:
+        return
+    member = get_member(conversation_id, current_user.id)
+    if member and mark_delivered(member, message_id):
+        emit('message_delivered', {'conversation_id': conversation_id, 'message_id': message_id,
+                                   'user_id': current_user.id}, to=conversation_room(conversation_id))
+
+@socketio.on('mark_read')
+def on_mark_read(data):
+    conversation_id, message_id = _event_id(data, 'conversation_id'), _event_id(data, 'message_id')
+    if not current_user.is_authenticated or message_id is None:
+        return
+    member = get_member(conversation_id, current_user.id)
+    if member and message_id > member.last_read_id:
+        mark_read(member, message_id)
+        emit('message_read', {'conversation_id': conversation_id, 'message_id': message_id,
+                              'user_id': current_user.id}, to=conversation_room(conversation_id))
+
+@socketio.on('join_group')
+def on_join_group(data):
+    group = db.session.get(Group, _event_id(data, 'group_id') or 0)
+    if current_user.is_authenticated and group and get_member(group.conversation_id, current_user.id):
+        join_room(group_room(group.id))
+
+@socketio.on('send_group_message')
+def on_send_group_message(data):
+    if not current_user.is_authenticated:
+        return {'error': 'Not signed in'}
+    content = _message_content(data)
+    if content is None:
+        return {'error': f'Messages must be 1 to {MAX_MESSAGE_LENGTH} characters'}
+    group = db.session.get(Group, _event_id(data, 'group_id') or 0)
+    if group is None or get_member(group.conversation_id, current_user.id) is None:
+        return {'error': 'You are not a member of this group'}
+
+    group_id = group.id
+    payload = send_message(group.conversation_id, current_user, content)
+    payload['group_id'] = group_id
+    emit('group_message_received', payload, to=group_room(group_id), include_self=False)
+    return payload
@@ -552,6 +552,62 @@ document.addEventListener('visibilitychange', function() {
     }
 });
 
+/**
+ * Receive server-pushed events over Socket.IO.
+ * The server sends batches to the 'events' channel and waits for the
+ * acknowledgement before sending more; each event is re-dispatched on the
+ * document as 'ui:<type>' so pages can react to the ones they show.
+ * Chat pages reuse this connection as window.UISocial.socket.
+ */
+function initializeLiveUpdates() {
+    if (!document.body.dataset.userId || typeof io === 'undefined') return;
+
+    const socket = io();
+    window.UISocial.socket = socket;
+
+    socket.on('events', function(events, ack) {
+        events.forEach(event => {
+            document.dispatchEvent(new CustomEvent('ui:' + event.type, {detail: event}));
+        });
+        if (ack) ack();
+    });
+
+    // Direct messages are acknowledged as delivered wherever they arrive
+    socket.on('message_received', function(message) {
+        socket.emit('message_delivered', {conversation_id: message.conversation_id, message_id: message.id});
+        if (window.UISocial.activeConversation !== message.conversation_id) {
+            const text = document.createElement('span');
+            text.textContent = `${message.sender.full_name}: ${message.content}`;
+            showNotification('<i class="fas fa-envelope me-2"></i>' + text.innerHTML, 'info');
+        }
+    });
+
+    document.addEventListener('ui:mention', function(e) {
+        const mention = e.detail;
+        const message = document.createElement('span');
+        message.innerHTML = '<i class="fas fa-at me-2"></i><strong></strong> mentioned you: ';
+        message.querySelector('strong').textContent = mention.full_name;
+        message.appendChild(document.createTextNode(mention.excerpt));
+        showNotification(message.innerHTML, 'info');
+    });
+
+    document.addEventListener('ui:profile_updated', function(e) {
+        document.querySelectorAll(`[data-user-name="${e.detail.user_id}"]`).forEach(element => {
+            element.textContent = e.detail.full_name;
+        });
+    });
+
+    document.addEventListener('ui:image_ready', function(e) {
+        document.querySelectorAll(`[data-pending-image="${CSS.escape(e.detail.filename)}"]`).forEach(placeholder => {
+            const img = document.createElement('img');
+            img.src = '/uploads/' + e.detail.variants.feed;
+            img.alt = 'Post image';
+            img.className = 'img-fluid rounded';
+            placeholder.replaceWith(img);
+        });
+    });
+}
+
 // Global error handler
 window.addEventListener('error', function(e) {
     console.error('JavaScript error:', e.error);
@@ -563,3 +619,6 @@ window.UISocial = {
     showNotification: showNotification,
     formatTimestamp: formatTimestamp
 };
+
+// Opened as soon as the script loads so page scripts can share the connection
+initializeLiveUpdates();
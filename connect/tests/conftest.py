@@ -0,0 +1,56 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Must be set before the app module configures the database
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, init_app
+    init_app()
+    return app
+
+
+@pytest.fixture
+def ctx(app):
+    """An app context on the shared test database."""
+    with app.app_context():
+        yield
+
+
+_users = itertools.count()
+
+
+@pytest.fixture
+def make_user(ctx):
+    """Create and return a student; ``fields`` override the defaults."""
+    from models import db, User
+
+    def make(**fields):
+        n = next(_users)
+        user = User(**{'username': f'student{n}', 'email': f'student{n}@ui.edu.ng', 'password_hash': 'x',
+                       'role': 'student', 'full_name': f'Student {n}', **fields})
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def login(app):
+    """A test client signed in as ``user``."""
+    def client_for(user):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+        return client
+    return client_for
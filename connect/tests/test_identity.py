@@ -0,0 +1,83 @@
+import pytest
+
+import identity
+from identity import IdentityCache, forget_user, get_identity, load_identity
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(identity, '_local', IdentityCache())
+    monkeypatch.setattr(identity, '_sockets', {})
+
+
+def rename(user, full_name):
+    from models import db, User
+    User.query.filter_by(id=user.id).update({User.full_name: full_name})
+    db.session.commit()
+
+
+def test_cache_drops_the_least_recently_used():
+    cache = IdentityCache(size=2)
+    cache.set(1, 'one', 60)
+    cache.set(2, 'two', 60)
+    assert cache.get(1) == 'one'
+    cache.set(3, 'three', 60)
+
+    assert cache.get(2) is None
+    assert (cache.get(1), cache.get(3)) == ('one', 'three')
+
+
+def test_cache_entries_expire():
+    cache = IdentityCache()
+    cache.set(1, 'one', -1)
+    assert cache.get(1) is None
+
+
+def test_identity_is_served_from_the_cache_until_forgotten(make_user):
+    user = make_user()
+    name = user.full_name
+    assert get_identity(user.id).full_name == name
+
+    rename(user, 'Renamed')
+    assert get_identity(user.id).full_name == name
+
+    forget_user(user.id)
+    assert get_identity(user.id).full_name == 'Renamed'
+    assert get_identity(-1) is None
+
+
+def test_sockets_keep_their_identity_until_the_user_is_forgotten(app, make_user):
+    user = make_user()
+    with app.test_request_context():
+        from flask import request
+        request.sid = 'sid'
+        identity.remember_socket(get_identity(user.id))
+        first = load_identity(user.id)
+        assert load_identity(user.id) is first
+
+        rename(user, 'Renamed')
+        forget_user(user.id)
+        assert identity._sockets['sid'] is None
+        assert load_identity(user.id).full_name == 'Renamed'
+        assert identity._sockets['sid'].full_name == 'Renamed'
+
+        identity.forget_socket()
+        assert 'sid' not in identity._sockets
+
+
+def test_profile_edit_takes_effect_on_the_next_request(app, make_user, login):
+    from messaging import create_group
+    user = make_user(department='Law')
+    group_id = create_group('Ward round', 'Medicine', make_user(department='Medicine')).id
+    client = login(user)
+
+    def request(method, url, **kwargs):
+        # A fresh app context each time, so nothing is carried over in ``g``
+        with app.app_context():
+            return client.open(url, method=method, **kwargs)
+
+    assert request('GET', f'/group/{group_id}').location.endswith('/groups')
+    request('POST', '/edit_profile', data={'full_name': 'Renamed', 'department': 'Medicine'})
+
+    assert request('GET', f'/group/{group_id}').status_code == 200
+    assert get_identity(user.id).full_name == 'Renamed'
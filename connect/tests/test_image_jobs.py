@@ -0,0 +1,104 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def folders(app, tmp_path, monkeypatch):
+    import image_jobs
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(image_jobs, 'ORIGINALS_FOLDER', str(tmp_path / 'originals'))
+    return tmp_path
+
+
+def upload(name='photo.jpg', data=None):
+    if data is None:
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 900), (200, 30, 30)).save(buffer, 'JPEG')
+        data = buffer.getvalue()
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def queue(kind='post', **options):
+    import image_jobs
+    from models import db
+    job = image_jobs.save_upload(upload(**options), kind, 1)
+    db.session.commit()
+    return job
+
+
+def reload(job):
+    from models import db, ImageJob
+    db.session.expire_all()
+    return db.session.get(ImageJob, job.id)
+
+
+def test_import_leaves_pending_jobs_alone(ctx):
+    from models import db, ImageJob
+    job = ImageJob(kind='post', filename='missing.jpg')
+    db.session.add(job)
+    db.session.commit()
+    try:
+        script = ('import app, image_jobs, sys\n'
+                  'sys.exit(0 if image_jobs._executor is None else 1)\n')
+        subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=dict(os.environ), check=True, timeout=60)
+        assert reload(job).status == 'pending'
+    finally:
+        ImageJob.query.filter_by(id=job.id).delete()
+        db.session.commit()
+
+
+def test_processed_upload_writes_its_variants(app, ctx, folders):
+    import image_jobs
+    job = queue()
+    assert job.filename.startswith('post_1_') and job.status == 'pending'
+    assert image_jobs.image_variant(job.filename, 'feed') is None
+
+    image_jobs.submit(job)
+    image_jobs.shutdown_pool()
+
+    job = reload(job)
+    assert job.status == 'done' and job.finished_at is not None
+    for size, limit in (('feed', (800, 600)), ('thumbnail', (300, 300))):
+        with Image.open(folders / 'uploads' / image_jobs.variant_name(job.filename, size)) as img:
+            assert img.width <= limit[0] and img.height <= limit[1]
+    with app.test_request_context():
+        assert image_jobs.image_variant(job.filename, 'thumbnail').endswith(
+            image_jobs.variant_name(job.filename, 'thumbnail'))
+
+
+def test_unreadable_upload_fails_its_job(ctx, folders):
+    import image_jobs
+    job = queue(kind='avatar', name='broken.png', data=b'not an image')
+    image_jobs.submit(job)
+    image_jobs.shutdown_pool()
+
+    job = reload(job)
+    assert job.status == 'failed'
+    assert job.error
+    assert not (folders / 'uploads' / image_jobs.variant_name(job.filename, 'avatar')).exists()
+
+
+def test_disallowed_upload_is_not_queued(ctx, folders):
+    import image_jobs
+    assert image_jobs.save_upload(upload(name='notes.txt', data=b'hello'), 'post', 1) is None
+    assert not (folders / 'originals').exists()
+
+
+def test_init_app_command_finishes_pending_jobs(app, ctx, folders):
+    import image_jobs
+    job = queue(kind='avatar')
+
+    result = app.test_cli_runner().invoke(args=['init-app'])
+
+    assert result.exit_code == 0, result.output
+    assert image_jobs._executor is None
+    assert reload(job).status == 'done'
+    assert (folders / 'uploads' / image_jobs.variant_name(job.filename, 'avatar')).exists()
@@ -0,0 +1,95 @@
+from messaging import (create_group, get_member, get_or_create_direct, history, inbox, mark_delivered,
+                       mark_read, send_message)
+
+
+def member(conversation_id, user):
+    from models import db
+    db.session.expire_all()
+    return get_member(conversation_id, user.id)
+
+
+def test_sending_counts_unread_for_the_other_member(make_user):
+    ada, ben = make_user(), make_user()
+    conversation = get_or_create_direct(ada, ben)
+    assert get_or_create_direct(ben, ada).id == conversation.id
+
+    first = send_message(conversation.id, ada, 'Hi')
+    send_message(conversation.id, ada, 'Are you there?')
+    reply = send_message(conversation.id, ben, 'Yes')
+
+    assert first['sender'] == {'id': ada.id, 'full_name': ada.full_name, 'username': ada.username}
+    assert member(conversation.id, ben).unread_count == 2
+    assert member(conversation.id, ada).unread_count == 1
+
+    (row,) = inbox(ben)
+    assert row['other_user'].id == ada.id
+    assert row['last_message'].id == reply['id']
+    assert row['unread'] == 2
+
+
+def test_reading_keeps_later_messages_unread(make_user):
+    ada, ben = make_user(), make_user()
+    conversation = get_or_create_direct(ada, ben)
+    ids = [send_message(conversation.id, ada, f'Message {i}')['id'] for i in range(3)]
+
+    mark_read(member(conversation.id, ben), ids[0])
+    row = member(conversation.id, ben)
+    assert (row.unread_count, row.last_read_id, row.delivered_id) == (2, ids[0], ids[0])
+
+    # The marker never moves back
+    mark_read(row, ids[0] - 1)
+    assert member(conversation.id, ben).last_read_id == ids[0]
+
+    assert mark_delivered(member(conversation.id, ben), ids[2])
+    assert not mark_delivered(member(conversation.id, ben), ids[1])
+    mark_read(member(conversation.id, ben), ids[2])
+    assert member(conversation.id, ben).unread_count == 0
+
+
+def test_history_pages_backwards(make_user):
+    ada, ben = make_user(), make_user()
+    conversation = get_or_create_direct(ada, ben)
+    ids = [send_message(conversation.id, ada, f'Message {i}')['id'] for i in range(5)]
+
+    page, cursor = history(conversation.id, limit=2)
+    assert [message.id for message in page] == ids[3:]
+    page, cursor = history(conversation.id, before=cursor, limit=2)
+    assert [message.id for message in page] == ids[1:3]
+    page, cursor = history(conversation.id, before=cursor, limit=2)
+    assert [message.id for message in page] == ids[:1]
+    assert cursor is None
+
+
+def test_opening_a_group_does_not_join_it(make_user, login):
+    from models import db, Group
+    creator, visitor = make_user(department='Law'), make_user(department='Law')
+    group = create_group('Moot court', 'Law', creator)
+    send_message(group.conversation_id, creator, 'Welcome')
+    client = login(visitor)
+
+    page = client.get(f'/group/{group.id}').data.decode()
+    assert f'action="/group/{group.id}/join"' in page
+    assert 'Welcome' not in page
+    assert member(group.conversation_id, visitor) is None
+
+    response = client.post(f'/group/{group.id}/join')
+    assert response.location.endswith(f'/group/{group.id}')
+    client.post(f'/group/{group.id}/join')
+    assert member(group.conversation_id, visitor) is not None
+    assert db.session.get(Group, group.id).member_count == 2
+
+    page = client.get(f'/group/{group.id}').data.decode()
+    assert 'Welcome' in page
+    assert member(group.conversation_id, visitor).unread_count == 0
+
+
+def test_department_groups_turn_away_other_departments(make_user, login):
+    from models import db, Group
+    creator, outsider = make_user(department='Law'), make_user(department='Medicine')
+    group = create_group('Moot court', 'Law', creator)
+    client = login(outsider)
+
+    assert client.get(f'/group/{group.id}').location.endswith('/groups')
+    assert client.post(f'/group/{group.id}/join').location.endswith('/groups')
+    assert member(group.conversation_id, outsider) is None
+    assert db.session.get(Group, group.id).member_count == 1
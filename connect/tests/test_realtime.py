@@ -0,0 +1,103 @@
+import pytest
+
+
+@pytest.fixture
+def realtime(app, monkeypatch):
+    import realtime
+    realtime._outbox.drain()
+    monkeypatch.setattr(realtime, '_connections', {})
+    monkeypatch.setattr(realtime, '_by_user', {})
+    return realtime
+
+
+@pytest.fixture
+def sent(realtime, monkeypatch):
+    """Batches flush() emits, as (sid, events)."""
+    batches = []
+    monkeypatch.setattr(realtime.socketio, 'emit',
+                        lambda name, events, to, callback: batches.append((to, events)))
+    return batches
+
+
+def connect(realtime, sid, user_id):
+    realtime._connections[sid] = realtime.Connection(user_id)
+    realtime._by_user.setdefault(user_id, set()).add(sid)
+    return realtime._connections[sid]
+
+
+def test_outbox_coalesces_events_by_key(realtime):
+    outbox = realtime.Outbox()
+    outbox.put('feed', 'profile:1', {'name': 'old'})
+    outbox.put('feed', 'a', {'n': 1})
+    outbox.put('feed', 'profile:1', {'name': 'new'})
+
+    rooms = outbox.drain()
+    assert list(rooms['feed'].items()) == [('a', {'n': 1}), ('profile:1', {'name': 'new'})]
+    assert outbox.drain() == {}
+
+
+def test_connection_waits_for_acknowledgements(realtime, monkeypatch):
+    monkeypatch.setattr(realtime, 'MAX_IN_FLIGHT', 1)
+    connection = realtime.Connection(1)
+    assert not connection.ready(0)
+
+    connection.queue({'a': 1})
+    assert connection.ready(0)
+    assert connection.take(0) == [1]
+
+    connection.queue({'b': 2})
+    assert not connection.ready(1)
+    # Acknowledgements that never come are given up on
+    assert connection.ready(realtime.ACK_TIMEOUT)
+    assert connection.take(realtime.ACK_TIMEOUT) == [2]
+
+
+def test_full_buffer_drops_the_oldest_and_asks_for_a_resync(realtime, monkeypatch):
+    monkeypatch.setattr(realtime, 'SEND_BUFFER', 2)
+    connection = realtime.Connection(1)
+    connection.queue({'a': 1, 'b': 2, 'c': 3})
+
+    assert connection.take(0) == [{'type': 'resync'}, 2, 3]
+    assert not connection.overflowed
+
+
+def test_flush_delivers_rooms_to_their_sockets(realtime, sent):
+    connect(realtime, 'sid-1', 1)
+    connect(realtime, 'sid-2', 2)
+    realtime.publish(realtime.FEED_ROOM, {'type': 'hello'})
+    realtime.publish(realtime.user_room(2), {'type': 'just-you'})
+
+    realtime.flush()
+
+    assert sorted(sent) == [('sid-1', [{'type': 'hello'}]), ('sid-2', [{'type': 'hello'}, {'type': 'just-you'}])]
+    realtime._ack('sid-1')
+    assert realtime._connections['sid-1'].in_flight == 0
+
+
+def test_profile_changes_coalesce_within_a_flush(realtime, sent, make_user):
+    connect(realtime, 'sid', 1)
+    user = make_user()
+    realtime.publish_profile(user)
+    user.full_name = 'Renamed'
+    realtime.publish_profile(user)
+
+    realtime.flush()
+
+    (_, events), = sent
+    assert [event['full_name'] for event in events] == ['Renamed']
+
+
+def test_post_notifies_the_users_it_mentions(realtime, make_user):
+    from models import db, Post
+    author, mentioned = make_user(), make_user()
+    post = Post(user_id=author.id, content=f'Thanks @{mentioned.username} and @{author.username} @nobody')
+    db.session.add(post)
+    db.session.commit()
+
+    realtime.publish_post(post, author)
+
+    rooms = realtime._outbox.drain()
+    assert [event['type'] for event in rooms[realtime.FEED_ROOM].values()] == ['new_post']
+    assert set(rooms) == {realtime.FEED_ROOM, realtime.user_room(mentioned.id)}
+    (mention,) = rooms[realtime.user_room(mentioned.id)].values()
+    assert mention['post_id'] == post.id and mention['username'] == author.username
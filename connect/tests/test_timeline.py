@@ -0,0 +1,112 @@
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+import timeline
+from models import db, Post
+from timeline import add_post, decode_cursor, encode_cursor, feed_page
+
+START = datetime(2026, 5, 1, 8, 0)
+
+_departments = itertools.count()
+
+
+@pytest.fixture
+def department(make_user):
+    """A department feed of its own with one author; returns (key, author)."""
+    author = make_user(department=f'Dept {next(_departments)}')
+    timeline._timelines.clear()
+    return f'department:{author.department}', author
+
+
+def write(author, count, start=START, fan_out=True):
+    """``count`` posts one minute apart from ``start``; only ``fan_out`` ones reach this worker's rings."""
+    posts = [Post(user_id=author.id, content=f'post {i}', timestamp=start + timedelta(minutes=i))
+             for i in range(count)]
+    db.session.add_all(posts)
+    db.session.commit()
+    if fan_out:
+        for post in posts:
+            add_post(post, author)
+    return [post.id for post in reversed(posts)]
+
+
+def walk(key, limit):
+    pages, cursor = [], None
+    while True:
+        posts, cursor, count = feed_page(key, cursor, limit)
+        pages.append([post.id for post in posts])
+        if cursor is None:
+            return pages, count
+
+
+def test_cursor_round_trip():
+    post = Post(id=7, timestamp=START)
+    assert decode_cursor(encode_cursor(post)) == (START, 7)
+    assert decode_cursor('garbage') is None
+
+
+def test_pages_walk_the_feed_newest_first(department):
+    key, author = department
+    ids = write(author, 7)
+    pages, count = walk(key, limit=3)
+    assert pages == [ids[:3], ids[3:6], ids[6:]]
+    assert count == 7
+
+
+def test_deeper_pages_inside_the_ring_skip_the_keyset_query(department, monkeypatch):
+    key, author = department
+    ids = write(author, 6)
+    _, cursor, _ = feed_page(key, limit=2)
+
+    def keyset(*args):
+        raise AssertionError('keyset query used inside the ring')
+    monkeypatch.setattr(timeline, '_keyset_page', keyset)
+    posts, _, _ = feed_page(key, cursor, limit=2)
+    assert [post.id for post in posts] == ids[2:4]
+
+
+def test_pages_past_the_ring_fall_back_to_the_keyset_query(department, monkeypatch):
+    monkeypatch.setattr(timeline, 'TIMELINE_SIZE', 4)
+    key, author = department
+    ids = write(author, 9)
+    pages, count = walk(key, limit=3)
+    assert sum(pages, []) == ids
+    assert len(timeline._timelines[key].ids) == 4
+    assert count == 9
+
+
+def test_posts_from_other_workers_show_on_the_first_page(department):
+    key, author = department
+    ids = write(author, 4)
+    feed_page(key, limit=3)
+    # Written through another worker: this worker's add_post never ran
+    newer = write(author, 2, start=START + timedelta(hours=1), fan_out=False)
+
+    posts, cursor, count = feed_page(key, limit=3)
+    assert [post.id for post in posts] == newer + ids[:1]
+    assert count == 6
+    assert list(timeline._timelines[key].ids) == newer + ids
+    assert [post.id for post in feed_page(key, cursor, limit=3)[0]] == ids[1:4]
+
+
+def test_a_ring_more_than_a_page_behind_is_reloaded(department):
+    key, author = department
+    ids = write(author, 2)
+    feed_page(key, limit=2)
+    stale = timeline._timelines[key]
+    newer = write(author, 5, start=START + timedelta(hours=1), fan_out=False)
+
+    posts, _, count = feed_page(key, limit=2)
+    assert [post.id for post in posts] == newer[:2]
+    assert timeline._timelines[key] is not stale
+    assert (list(timeline._timelines[key].ids), count) == (newer + ids, 7)
+
+
+def test_department_feeds_only_show_their_department(department, make_user):
+    key, author = department
+    outsider = make_user(department='Somewhere else')
+    mine = write(author, 2)
+    write(outsider, 2)
+    assert walk(key, limit=5) == ([mine], 2)
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+from models import db, User, Post
+
+TIMELINE_SIZE = 500      # newest post ids kept per feed
+PAGE_SIZE = 20           # posts per feed page / scroll step
+TIMELINE_TTL = 300       # seconds before a ring is rebuilt from the database
+
+
+class Timeline:
+    """Newest post ids of one feed (newest first) plus its post count."""
+
+    def __init__(self, ids, count):
+        self.ids = deque(ids, maxlen=TIMELINE_SIZE)
+        self.count = count
+        self.loaded_at = time.monotonic()
+
+    def expired(self):
+        return time.monotonic() - self.loaded_at > TIMELINE_TTL
+
+
+_timelines = {}
+_lock = threading.Lock()
+
+
+def feed_key(feed_type, user):
+    """Timelines are shared by everyone reading the same feed."""
+    if feed_type == 'department' and user.department:
+        return f'department:{user.department}'
+    return 'public'
+
+
+def _feed_query(key):
+    query = Post.query
+    if key.startswith('department:'):
+        query = query.join(User, Post.user_id == User.id).filter(User.department == key.split(':', 1)[1])
+    return query
+
+
+def _newest_first(query):
+    return query.order_by(Post.timestamp.desc(), Post.id.desc())
+
+
+def get_timeline(key):
+    """The cached ring for a feed, loading it on first use or after TIMELINE_TTL."""
+    with _lock:
+        timeline = _timelines.get(key)
+    if timeline is None or timeline.expired():
+        query = _feed_query(key)
+        ids = [row.id for row in _newest_first(query.with_entities(Post.id)).limit(TIMELINE_SIZE)]
+        timeline = Timeline(ids, query.count())
+        with _lock:
+            _timelines[key] = timeline
+    return timeline
+
+
+def add_post(post, author):
+    """Fan a just-committed post out to the rings of the feeds it appears in."""
+    keys = ['public']
+    if author.department:
+        keys.append(f'department:{author.department}')
+    with _lock:
+        for key in keys:
+            timeline = _timelines.get(key)
+            if timeline is not None:
+                timeline.ids.appendleft(post.id)
+                timeline.count += 1
+
+
+def encode_cursor(post):
+    return f"{post.timestamp.isoformat()}_{post.id}"
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, post_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _load_posts(ids):
+    """Posts with their authors, in the order of ``ids``."""
+    posts = Post.query.options(joinedload(Post.user)).filter(Post.id.in_(ids)).all()
+    by_id = {post.id: post for post in posts}
+    return [by_id[post_id] for post_id in ids if post_id in by_id]
+
+
+def _keyset_page(key, after, limit):
+    query = _feed_query(key).options(joinedload(Post.user))
+    if after is not None:
+        query = query.filter(tuple_(Post.timestamp, Post.id) < tuple_(*after))
+    return _newest_first(query).limit(limit + 1).all()
+
+
+def _catch_up(key, timeline, newest, complete):
+    """Put posts other workers wrote since the ring was loaded in front of it.
+
+    ``newest`` are the ids of the feed's first page, read from the database;
+    ``complete`` says they are the whole feed. A ring more than a page behind
+    is reloaded.
+    """
+    with _lock:
+        head = timeline.ids[0] if timeline.ids else None
+        if head in newest or (head is None and complete):
+            missing = newest[:newest.index(head)] if head is not None else newest
+            timeline.ids.extendleft(reversed(missing))
+            timeline.count += len(missing)
+            return timeline
+        if _timelines.get(key) is timeline:
+            del _timelines[key]
+    return get_timeline(key)
+
+
+def feed_page(key, cursor=None, limit=PAGE_SIZE):
+    """One page of a feed after ``cursor`` and the cursor of the next page.
+
+    The first page is always a keyset query, so posts made through another
+    worker show up at once and are added to this worker's ring. Deeper pages
+    inside the ring cost one primary-key lookup; older pages fall back to the
+    keyset query on the (timestamp, id) index.
+    """
+    timeline = get_timeline(key)
+    after = decode_cursor(cursor) if cursor else None
+    if after is None:
+        posts = _keyset_page(key, None, limit)
+        timeline = _catch_up(key, timeline, [post.id for post in posts], len(posts) <= limit)
+    else:
+        ids = list(timeline.ids)
+        start = ids.index(after[1]) + 1 if after[1] in ids else None
+        if start is not None and start + limit < len(ids):
+            posts = _load_posts(ids[start:start + limit + 1])
+        elif start is not None and len(ids) < TIMELINE_SIZE:
+            # The ring holds the whole feed
+            posts = _load_posts(ids[start:])
+        else:
+            posts = _keyset_page(key, after, limit)
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1])
+    return posts, next_cursor, timeline.count
@@ -1,28 +1,59 @@
 import os
-from PIL import Image
+import tempfile
+from PIL import Image, ImageOps
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# name -> (width, height, crop). Cropped sizes fill the box; the rest fit inside it.
+VARIANT_SIZES = {
+    'feed': (800, 600, False),
+    'thumbnail': (300, 300, True),
+    'avatar': (150, 150, True),
+}
+VARIANT_QUALITY = 85
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def resize_image(image_path, max_size):
-    """Resize image to fit within max_size while maintaining aspect ratio."""
-    try:
-        with Image.open(image_path) as img:
-            # Convert RGBA to RGB if necessary
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'RGBA':
-                    background.paste(img, mask=img.split()[-1])
-                else:
-                    background.paste(img)
-                img = background
-            
-            # Resize image
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            img.save(image_path, 'JPEG', quality=85, optimize=True)
-    except Exception as e:
-        print(f"Error resizing image {image_path}: {e}")
+def variant_name(filename, size):
+    """File name of one size of a processed upload, e.g. post_1_ab12_feed.jpg."""
+    return f"{filename.rsplit('.', 1)[0]}_{size}.jpg"
+
+def render_variants(source_path, dest_folder, filename, sizes):
+    """Write a JPEG of every size in ``sizes`` and return their file names.
+
+    Runs in a worker process, so it only touches the file system. The image
+    is decoded once (JPEGs at reduced scale via draft), rotated upright and
+    re-encoded without EXIF or other metadata.
+    """
+    with Image.open(source_path) as img:
+        largest = max((VARIANT_SIZES[size] for size in sizes), key=lambda s: s[0] * s[1])
+        img.draft('RGB', (largest[0], largest[1]))
+        img = ImageOps.exif_transpose(img)
+        # Convert RGBA to RGB if necessary
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert('RGB')
+
+        written = []
+        for size in sizes:
+            width, height, crop = VARIANT_SIZES[size]
+            if crop:
+                resized = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+            else:
+                resized = img.copy()
+                resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+            name = variant_name(filename, size)
+            # Write under a temporary name so readers never see half a file
+            fd, temp_path = tempfile.mkstemp(dir=dest_folder, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as out:
+                resized.save(out, 'JPEG', quality=VARIANT_QUALITY, optimize=True)
+            os.replace(temp_path, os.path.join(dest_folder, name))
+            written.append(name)
+    return written
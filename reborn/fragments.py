@@ -0,0 +1,110 @@
+"""
+Rendered-HTML cache for product cards.
+
+A listing page renders the same product cards over and over, and once the
+listing query is cheap the Jinja work for those cards is most of the
+request. Each card is therefore rendered once and kept as HTML, keyed by
+card template, product id and the image URLs the card shows (which differ
+for WebP clients and change once thumbnails exist). The entry stores the
+product's and seller's ``updated_at``, and a hit is only used while both
+still match, so a change made through any worker shows up on the next
+render even though each worker has its own cache. Routes that change a
+seller also drop that seller's cards straight away.
+
+The cache is an LRU bounded by ``FRAGMENT_CACHE_SIZE`` entries.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from markupsafe import Markup
+from app import app
+from images import thumbnail_filter
+
+# Card templates: the listing card (home page and search results) and the seller profile card
+CARD_TEMPLATES = {
+    'listing': 'product_card.html',
+    'profile': 'profile_product_card.html',
+}
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 2000))
+
+
+class FragmentCache:
+    """Thread-safe LRU of ``key -> (seller id, version, html)``, indexed by seller."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._by_seller = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, seller_id, version, html):
+        with self._lock:
+            self._entries[key] = (seller_id, version, html)
+            self._entries.move_to_end(key)
+            self._by_seller.setdefault(seller_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (old_seller, _, _) = self._entries.popitem(last=False)
+                self._discard_index(old_seller, old_key)
+
+    def _discard_index(self, seller_id, key):
+        keys = self._by_seller.get(seller_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_seller[seller_id]
+
+    def delete_seller(self, seller_id):
+        with self._lock:
+            for key in self._by_seller.pop(seller_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_seller.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cards = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+
+def _version(product, seller):
+    # Rows from before updated_at existed fall back to created_at
+    return (product.updated_at or product.created_at, seller.updated_at or seller.created_at)
+
+
+@app.template_global('product_card')
+def product_card(product, variant='listing'):
+    """The HTML of one product card, from the cache when it is still current."""
+    seller = product.seller
+    image = thumbnail_filter(product.image_url, 'card')
+    avatar = thumbnail_filter(seller.profile_image_url, 'avatar')
+    key = (variant, product.id, image, avatar)
+    version = _version(product, seller)
+    html = cards.get(key, version)
+    if html is None:
+        # Cards only need the Jinja globals and filters, not the page's context processors
+        html = app.jinja_env.get_template(CARD_TEMPLATES[variant]).render(product=product, seller=seller)
+        cards.set(key, product.seller_id, version, html)
+    return Markup(html)
+
+
+def forget_seller(seller_id):
+    """Drop the cached cards of every product of one seller."""
+    cards.delete_seller(seller_id)
@@ -1,5 +1,7 @@
 from app import app, db
 from models import init_database
+from search import init_search
+from inbox import init_inbox
 import routes
 
 @app.before_request
@@ -10,6 +12,8 @@ def before_first_request():
            # db.drop_all()
             #db.create_all()
             init_database()  # This will create your admin user and university settings
+            init_search()
+            init_inbox()
         app._database_initialized = True
 
 if __name__ == '__main__':
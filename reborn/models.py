@@ -1,7 +1,8 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Index, inspect, text
+from sqlalchemy.orm import query_expression, relationship
+from sqlalchemy.schema import CreateColumn
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class Seller(db.Model):
@@ -15,11 +16,24 @@ class Seller(db.Model):
     profile_image_url = Column(String(500))
     bio = Column(Text)
     rating = Column(Float, default=0.0)
+    # Running review totals; rating is kept equal to their average (see reviews.py)
+    rating_sum = Column(Integer, nullable=False, default=0, server_default='0')
+    rating_count = Column(Integer, nullable=False, default=0, server_default='0')
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every change; part of the cached product card key (see fragments.py)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship with products
     products = relationship("Product", back_populates="seller", cascade="all, delete-orphan")
+    request_stats = relationship("SellerRequestStats", uselist=False, cascade="all, delete-orphan")
+    # Filled in by queries that count the seller's products (see catalog.admin_sellers)
+    product_count = query_expression()
+
+    # Admin seller table, newest first
+    __table_args__ = (
+        Index('ix_sellers_created', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -31,6 +45,7 @@ class Seller(db.Model):
             'profile_image': self.profile_image_url or f'https://via.placeholder.com/150x150/007bff/ffffff?text={self.name[0].upper()}',
             'bio': self.bio,
             'rating': self.rating,
+            'rating_count': self.rating_count,
             'is_active': self.is_active,
             'created_at': self.created_at
         }
@@ -48,9 +63,20 @@ class Product(db.Model):
     image_url = Column(String(500))
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship with seller
     seller = relationship("Seller", back_populates="products")
+
+    # One index per listing sort order (see catalog.SORT_OPTIONS)
+    __table_args__ = (
+        Index('ix_products_available_created', 'is_available', 'created_at', 'id'),
+        Index('ix_products_available_price', 'is_available', 'price', 'id'),
+        Index('ix_products_category_created', 'category', 'is_available', 'created_at', 'id'),
+        Index('ix_products_category_price', 'category', 'is_available', 'price', 'id'),
+        Index('ix_products_seller_created', 'seller_id', 'is_available', 'created_at', 'id'),
+        Index('ix_products_created', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -78,10 +104,19 @@ class PurchaseRequest(db.Model):
     message = Column(Text, nullable=False)
     status = Column(String(20), default='pending')
     created_at = Column(DateTime, default=datetime.utcnow)
+    responded_at = Column(DateTime)
     
     # Relationships
     seller = relationship("Seller")
     product = relationship("Product")
+
+    # Inbox filters (see inbox.py), newest first
+    __table_args__ = (
+        Index('ix_purchase_requests_seller_status_created', 'seller_id', 'status', 'created_at', 'id'),
+        Index('ix_purchase_requests_status_created', 'status', 'created_at', 'id'),
+        Index('ix_purchase_requests_product_created', 'product_id', 'created_at', 'id'),
+        Index('ix_purchase_requests_created', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -93,6 +128,77 @@ class PurchaseRequest(db.Model):
             'buyer_phone': self.buyer_phone,
             'message': self.message,
             'status': self.status,
+            'created_at': self.created_at,
+            'responded_at': self.responded_at
+        }
+
+class SellerRequestStats(db.Model):
+    __tablename__ = 'seller_request_stats'
+    
+    # Running totals per seller, kept up to date by inbox.py
+    seller_id = Column(Integer, ForeignKey('sellers.id'), primary_key=True)
+    pending_count = Column(Integer, nullable=False, default=0)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    declined_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    response_count = Column(Integer, nullable=False, default=0)
+    response_seconds = Column(Float, nullable=False, default=0.0)
+    
+    @property
+    def total_count(self):
+        return (self.pending_count + self.accepted_count + self.declined_count
+                + self.completed_count + self.cancelled_count)
+    
+    @property
+    def average_response_hours(self):
+        if not self.response_count:
+            return None
+        return self.response_seconds / self.response_count / 3600
+    
+    def to_dict(self):
+        return {
+            'seller_id': self.seller_id,
+            'pending': self.pending_count,
+            'accepted': self.accepted_count,
+            'declined': self.declined_count,
+            'completed': self.completed_count,
+            'cancelled': self.cancelled_count,
+            'total': self.total_count,
+            'average_response_hours': self.average_response_hours
+        }
+
+class Review(db.Model):
+    __tablename__ = 'reviews'
+    
+    id = Column(Integer, primary_key=True)
+    purchase_request_id = Column(Integer, ForeignKey('purchase_requests.id'), unique=True, nullable=False)
+    seller_id = Column(Integer, ForeignKey('sellers.id'), nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id'))
+    reviewer_name = Column(String(100), nullable=False)
+    rating = Column(Integer, nullable=False)
+    comment = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    seller = relationship("Seller")
+    product = relationship("Product")
+    purchase_request = relationship("PurchaseRequest")
+    
+    # Seller profile review list, newest first
+    __table_args__ = (
+        Index('ix_reviews_seller_created', 'seller_id', 'created_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'purchase_request_id': self.purchase_request_id,
+            'seller_id': self.seller_id,
+            'product_id': self.product_id,
+            'reviewer_name': self.reviewer_name,
+            'rating': self.rating,
+            'comment': self.comment,
             'created_at': self.created_at
         }
 
@@ -122,10 +228,31 @@ class University(db.Model):
     updated_at = Column(DateTime, default=datetime.utcnow)
 
 
+def add_missing_columns():
+    """Add columns declared on the models but missing from existing tables"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+    db.session.commit()
+
+
 def init_database():
     """Initialize database with tables and sample data"""
     # Create all tables
     db.create_all()
+
+    # create_all() skips new columns and indexes of tables that already exist
+    add_missing_columns()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    # Could not serve the top_rated sort, which orders products by a joined column
+    db.session.execute(text('DROP INDEX IF EXISTS ix_sellers_active_rating'))
+    db.session.commit()
     
     # Check if admin exists, if not create one
     if not Admin.query.filter_by(username='admin').first():
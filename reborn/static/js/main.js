@@ -91,6 +91,7 @@ function initializeSearchFunctionality() {
                 } else {
                     this.classList.remove('searching');
                 }
+                loadSearchSuggestions(this.value.trim());
             }, 300);
         });
     }
@@ -107,6 +108,26 @@ function initializeSearchFunctionality() {
     }
 }
 
+// Autocomplete suggestions from the search index
+function loadSearchSuggestions(query) {
+    const datalist = document.getElementById('searchHistory');
+    if (!datalist || query.length < 2) return;
+
+    fetch(`/api/search/suggest?q=${encodeURIComponent(query)}`)
+        .then(response => response.json())
+        .then(data => {
+            const history = LocalStorageManager.get('searchHistory') || [];
+            const names = data.suggestions.map(item => item.name);
+            datalist.innerHTML = '';
+            [...new Set([...names, ...history])].forEach(term => {
+                const option = document.createElement('option');
+                option.value = term;
+                datalist.appendChild(option);
+            });
+        })
+        .catch(error => console.warn('Search suggestions unavailable:', error));
+}
+
 // Smooth Animations
 function initializeAnimations() {
     // Intersection Observer for fade-in animations
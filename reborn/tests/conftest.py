@@ -0,0 +1,58 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Must be set before the app module creates its engine
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app
+    return app
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    client = app.test_client()
+    # The first request runs init_database() and creates the tables
+    client.get('/')
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    return client
+
+
+@pytest.fixture
+def ctx(app, client):
+    """An app context on the shared test database, with its tables created."""
+    with app.app_context():
+        yield
+
+
+_sellers = itertools.count()
+
+
+@pytest.fixture
+def make_seller(ctx):
+    """Create a seller with ``products`` available products; returns (seller, products)."""
+    from app import db
+    from models import Seller, Product
+
+    def make(products=1, **fields):
+        n = next(_sellers)
+        seller = Seller(**{'name': f'Seller {n}', 'department': 'Law', 'email': f'seller-{n}@test.example.edu',
+                           'phone': '08000000000', **fields})
+        db.session.add(seller)
+        db.session.flush()
+        rows = [Product(seller_id=seller.id, name=f'Desk lamp {n}-{i}', description='Works fine.',
+                        price=1000 + i, category='Furniture') for i in range(products)]
+        db.session.add_all(rows)
+        db.session.commit()
+        return seller, rows
+    return make
@@ -0,0 +1,91 @@
+
+import cache as cache_module
+from cache import MISSING, TieredCache, category_facets, university_branding
+
+
+class FakeShared:
+    """Dict-backed stand-in for RedisCache that can be made to fail."""
+
+    def __init__(self):
+        self.values = {}
+        self.broken = False
+
+    def _check(self):
+        if self.broken:
+            raise ConnectionError('backend down')
+
+    def get(self, key):
+        self._check()
+        return self.values.get(key, MISSING)
+
+    def set(self, key, value, ttl):
+        self._check()
+        self.values[key] = value
+
+    def delete(self, key):
+        self._check()
+        self.values.pop(key, None)
+
+
+def counting_loader(value):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return value
+    return load, calls
+
+
+def test_values_are_loaded_once_until_they_expire(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: clock[0])
+    tiered = TieredCache()
+    load, calls = counting_loader(['Books', 3])
+    assert tiered.get_or_load('facets', load, ttl=60) == ['Books', 3]
+    assert tiered.get_or_load('facets', load, ttl=60) == ['Books', 3]
+    clock[0] += 61
+    tiered.get_or_load('facets', load, ttl=60)
+    assert len(calls) == 2
+
+
+def test_shared_entries_reach_other_workers_within_local_ttl(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: clock[0])
+    shared = FakeShared()
+    worker_a, worker_b = TieredCache(shared), TieredCache(shared)
+    worker_b.get_or_load('university', lambda: {'name': 'Old'}, ttl=300)
+
+    worker_a.set('university', {'name': 'New'}, ttl=300)
+    assert worker_b.get_or_load('university', None, ttl=300) == {'name': 'Old'}
+    clock[0] += cache_module.LOCAL_TTL + 1
+    assert worker_b.get_or_load('university', None, ttl=300) == {'name': 'New'}
+
+
+def test_a_broken_backend_falls_back_to_the_loader():
+    shared = FakeShared()
+    shared.broken = True
+    tiered = TieredCache(shared)
+    load, calls = counting_loader({'name': 'U'})
+    assert tiered.get_or_load('university', load, ttl=300) == {'name': 'U'}
+    tiered.delete('university')
+    assert len(calls) == 1
+
+
+def test_settings_are_written_through(client, ctx):
+    university_branding()
+    response = client.post('/admin/university_settings', data={'name': 'Ibadan Exchange', 'primary_color': '#123456'})
+    assert response.status_code == 302
+    assert university_branding()['name'] == 'Ibadan Exchange'
+    assert 'Ibadan Exchange' in client.get('/').data.decode()
+
+
+def test_facets_follow_products_and_sellers(client, make_seller):
+    seller, _ = make_seller(products=0)
+    client.post(f'/admin/seller/{seller.id}/add_product',
+                data={'name': 'Theodolite', 'description': 'Calibrated.', 'price': '9000', 'category': 'Surveying'})
+    assert dict(category_facets())['Surveying'] == 1
+
+    client.get(f'/admin/toggle_seller_status/{seller.id}')
+    assert 'Surveying' not in dict(category_facets())
+    client.get(f'/admin/toggle_seller_status/{seller.id}')
+    assert dict(category_facets())['Surveying'] == 1
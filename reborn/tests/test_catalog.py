@@ -0,0 +1,18 @@
+from app import db
+from catalog import admin_sellers
+from models import Seller
+from query_budget import StatementCounter
+
+
+def test_admin_sellers_count_products_without_loading_them(make_seller):
+    busy, _ = make_seller(products=3)
+    idle, _ = make_seller(products=0)
+    ids = [busy.id, idle.id]
+    db.session.expunge_all()
+
+    with StatementCounter(db.engine) as counter:
+        sellers = admin_sellers().filter(Seller.id.in_(ids)).order_by(Seller.id).all()
+        counts = [seller.product_count for seller in sellers]
+    assert counts == [3, 0]
+    assert counter.count == 1
+    assert 'products' not in sellers[0].__dict__
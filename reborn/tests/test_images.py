@@ -0,0 +1,84 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+import images
+from images import SIZES, is_immutable, store_upload, thumbnail_filter, thumbnail_url
+
+
+class InlineExecutor:
+    """Runs thumbnail jobs on the calling thread so tests can inspect them."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class IdleExecutor:
+    """Drops thumbnail jobs, as if the workers had not got to them yet."""
+
+    def submit(self, fn, *args):
+        pass
+
+
+@pytest.fixture
+def uploads(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(images, 'executor', InlineExecutor())
+    return tmp_path
+
+
+def photo(name='photo.jpg', size=(800, 600), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return FileStorage(io.BytesIO(buffer.getvalue()), filename=name), buffer.getvalue()
+
+
+def test_uploads_are_stored_once_under_their_content_hash(uploads):
+    upload, data = photo()
+    url = store_upload(upload)
+    assert url == f'/static/uploads/{hashlib.sha256(data).hexdigest()}.jpg'
+    again, _ = photo(name='copy.JPG')
+    assert store_upload(again) == url
+    assert len([name for name in os.listdir(uploads) if not name.count('-')]) == 1
+    assert not [name for name in os.listdir(uploads) if name.startswith('.')]
+
+
+def test_only_images_are_accepted(uploads):
+    assert store_upload(FileStorage(io.BytesIO(b'MZ'), filename='setup.exe')) is None
+    assert store_upload(None) is None
+
+
+def test_thumbnails_are_rendered_at_every_display_size(uploads):
+    url = store_upload(photo(size=(1200, 900))[0])
+    for size, dimensions in SIZES.items():
+        for fmt in ('jpg', 'webp'):
+            thumb = thumbnail_url(url, size, fmt)
+            assert thumb != url and thumb.endswith(f'.{fmt}')
+            with Image.open(uploads / thumb.rsplit('/', 1)[1]) as image:
+                assert image.size == dimensions
+
+
+def test_originals_are_served_until_thumbnails_exist(uploads, app, monkeypatch):
+    monkeypatch.setattr(images, 'executor', IdleExecutor())
+    url = store_upload(photo(color='blue')[0])
+    assert thumbnail_url(url, 'card') == url
+    assert thumbnail_url('https://example.edu/logo.png', 'card') == 'https://example.edu/logo.png'
+
+    name = url.rsplit('/', 1)[1]
+    images.generate_thumbnails(str(uploads / name), name.split('.')[0])
+    with app.test_request_context(headers={'Accept': 'image/avif,image/webp,*/*'}):
+        assert thumbnail_filter(url, 'avatar').endswith('-40x40.webp')
+    with app.test_request_context():
+        assert thumbnail_filter(url, 'avatar').endswith('-40x40.jpg')
+
+
+def test_only_hashed_uploads_are_immutable():
+    digest = 'a' * 64
+    assert is_immutable(f'/static/uploads/{digest}.png')
+    assert is_immutable(f'/static/uploads/{digest}-300x200.webp')
+    assert not is_immutable('/static/uploads/logo.png')
+    assert not is_immutable(f'/static/css/{digest}.css')
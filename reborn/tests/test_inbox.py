@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from inbox import record_new_request, transition
+from models import PurchaseRequest, SellerRequestStats
+
+
+def new_request(seller, product, created_at=None):
+    purchase_request = PurchaseRequest(seller_id=seller.id, product_id=product.id, buyer_name='Buyer',
+                                       buyer_email='buyer@example.edu', message='Still available?',
+                                       created_at=created_at or datetime.utcnow())
+    db.session.add(purchase_request)
+    record_new_request(purchase_request)
+    db.session.commit()
+    return purchase_request.id
+
+
+def stats(seller):
+    db.session.expire_all()
+    return db.session.get(SellerRequestStats, seller.id)
+
+
+def counts(seller):
+    row = stats(seller)
+    return {status: getattr(row, f'{status}_count')
+            for status in ('pending', 'accepted', 'declined', 'completed', 'cancelled')}
+
+
+def test_counters_follow_transitions(make_seller):
+    seller, (product,) = make_seller()
+    ids = [new_request(seller, product) for _ in range(4)]
+    assert counts(seller)['pending'] == 4
+
+    assert transition(ids[:2], 'accepted') == 2
+    assert transition(ids[2:3], 'declined') == 1
+    assert transition(ids[:1], 'completed') == 1
+    db.session.commit()
+
+    assert counts(seller) == {'pending': 1, 'accepted': 1, 'declined': 1, 'completed': 1, 'cancelled': 0}
+
+
+def test_disallowed_transitions_are_skipped(make_seller):
+    seller, (product,) = make_seller()
+    request_id = new_request(seller, product)
+
+    assert transition([request_id], 'completed') == 0
+    assert transition([request_id], 'declined') == 1
+    assert transition([request_id], 'accepted') == 0
+    db.session.commit()
+    assert counts(seller)['declined'] == 1
+    with pytest.raises(ValueError):
+        transition([request_id], 'archived')
+
+
+def test_only_answers_count_as_responses(make_seller):
+    seller, (product,) = make_seller()
+    now = datetime.utcnow()
+    answered = new_request(seller, product, created_at=now - timedelta(hours=2))
+    cancelled = new_request(seller, product, created_at=now - timedelta(hours=5))
+
+    transition([answered], 'accepted', now=now)
+    transition([cancelled], 'cancelled', now=now)
+    db.session.commit()
+
+    row = stats(seller)
+    assert row.response_count == 1
+    assert row.average_response_hours == pytest.approx(2)
+    assert db.session.get(PurchaseRequest, cancelled).responded_at is None
+
+    # Completing an accepted request is not a second response
+    transition([answered], 'completed', now=now + timedelta(hours=1))
+    db.session.commit()
+    assert stats(seller).response_count == 1
+
+
+def test_missing_counters_row_is_counted_from_requests(make_seller):
+    seller, (product,) = make_seller()
+    ids = [new_request(seller, product) for _ in range(3)]
+    SellerRequestStats.query.filter_by(seller_id=seller.id).delete()
+    db.session.commit()
+
+    transition(ids[:1], 'declined')
+    db.session.commit()
+    assert counts(seller) == {'pending': 2, 'accepted': 0, 'declined': 1, 'completed': 0, 'cancelled': 0}
+    assert stats(seller).response_count == 1
+
+    SellerRequestStats.query.filter_by(seller_id=seller.id).delete()
+    db.session.commit()
+    new_request(seller, product)
+    assert counts(seller)['pending'] == 3
+
+
+def test_inbox_routes_keep_the_counters(client, make_seller):
+    seller, (product,) = make_seller()
+    for buyer in ('Ada', 'Ben'):
+        client.post('/submit_contact', data={'seller_id': seller.id, 'product_id': product.id, 'buyer_name': buyer,
+                                             'buyer_email': f'{buyer.lower()}@example.edu', 'message': 'Hi'})
+    assert counts(seller)['pending'] == 2
+    ids = [row.id for row in PurchaseRequest.query.filter_by(seller_id=seller.id).order_by(PurchaseRequest.id)]
+
+    page = client.get(f'/admin/requests?seller_id={seller.id}&status=pending').data.decode()
+    assert 'ada@example.edu' in page and 'ben@example.edu' in page
+
+    response = client.post('/admin/requests/status', data={'status': 'accepted', 'request_ids': ids[:1]})
+    assert response.location.endswith('/admin/requests')
+    response = client.post('/admin/requests/status', follow_redirects=True,
+                           data={'status': 'completed', 'request_ids': ids, 'next': '//evil.example'})
+    assert '1 request(s) marked completed. 1 could not move to completed' in response.data.decode()
+    assert counts(seller) == {'pending': 1, 'accepted': 0, 'declined': 0, 'completed': 1, 'cancelled': 0}
+
+    page = client.get(f'/admin/requests?seller_id={seller.id}&status=pending').data.decode()
+    assert 'ben@example.edu' in page and 'ada@example.edu' not in page
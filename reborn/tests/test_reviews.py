@@ -0,0 +1,80 @@
+import pytest
+
+from app import db
+from inbox import record_new_request, transition
+from models import PurchaseRequest, Seller
+from reviews import add_review, load_review_token, review_token
+
+
+@pytest.fixture
+def purchase(make_seller):
+    """Make a purchase request of a new seller in ``status``; returns (seller id, request)."""
+    seller, (product,) = make_seller()
+
+    def make(status='completed', buyer='buyer@example.edu'):
+        purchase_request = PurchaseRequest(seller_id=seller.id, product_id=product.id, buyer_name='Buyer',
+                                           buyer_email=buyer, message='Interested')
+        db.session.add(purchase_request)
+        record_new_request(purchase_request)
+        db.session.commit()
+        for step in {'pending': [], 'accepted': ['accepted'], 'completed': ['accepted', 'completed']}[status]:
+            transition([purchase_request.id], step)
+        db.session.commit()
+        return purchase_request
+    return seller.id, make
+
+
+def rating(seller_id):
+    db.session.expire_all()
+    seller = db.session.get(Seller, seller_id)
+    return seller.rating, seller.rating_sum, seller.rating_count
+
+
+def test_tokens_only_load_their_own_request(purchase):
+    _, make = purchase
+    purchase_request = make()
+    token = review_token(purchase_request)
+    assert load_review_token(token) == purchase_request
+    assert load_review_token(token[:-2] + 'xx') is None
+
+    purchase_request.buyer_email = 'someone-else@example.edu'
+    db.session.commit()
+    assert load_review_token(token) is None
+
+
+def test_reviews_keep_a_running_average(purchase):
+    seller_id, make = purchase
+    add_review(make(), 5)
+    add_review(make(), 2, 'Late delivery')
+    db.session.commit()
+    assert rating(seller_id) == (pytest.approx(3.5), 7, 2)
+
+
+@pytest.mark.parametrize('status, score, message', [
+    ('accepted', 4, 'Only completed purchases'),
+    ('completed', 0, 'Rating must be between'),
+    ('completed', 6, 'Rating must be between'),
+])
+def test_invalid_reviews_are_refused(purchase, status, score, message):
+    seller_id, make = purchase
+    with pytest.raises(ValueError, match=message):
+        add_review(make(status), score)
+    db.session.rollback()
+    assert rating(seller_id)[2] == 0
+
+
+def test_review_link_rates_the_seller_once(purchase, client):
+    seller_id, make = purchase
+    pending = make('pending')
+    response = client.get(f'/review/{review_token(pending)}')
+    assert response.status_code == 302 and response.location == '/'
+
+    completed = make()
+    url = f'/review/{review_token(completed)}'
+    assert client.post(url, data={'rating': '4', 'comment': 'Great lamp'}).status_code == 302
+    assert rating(seller_id) == (pytest.approx(4), 4, 1)
+    assert 'Great lamp' in client.get(f'/seller/{seller_id}').data.decode()
+
+    client.post(url, data={'rating': '1'})
+    assert rating(seller_id) == (pytest.approx(4), 4, 1)
+    assert client.get('/review/not-a-token').location == '/'